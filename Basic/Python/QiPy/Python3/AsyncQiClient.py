@@ -0,0 +1,260 @@
+import asyncio
+import concurrent.futures
+import functools
+
+from QiBoundaryType import QiBoundaryType
+from QiClient import QiClient
+from QiFollower import QiFollower, keyProperty
+
+
+class AsyncQiClient(object):
+    """Exposes the QiClient calls as coroutines, running at most 'maxConcurrency' requests at once"""
+
+    def __init__(self, tenant, url, resource, authority, clientId, clientSecret, maxConcurrency=16, **clientOptions):
+        # size the connection pool to the concurrency so no call waits on a connection
+        clientOptions.setdefault("poolMaxSize", maxConcurrency)
+        client = QiClient(tenant, url, resource, authority, clientId, clientSecret, **clientOptions)
+        self.__setup(client, maxConcurrency, True)
+
+    @staticmethod
+    def fromClient(client, maxConcurrency=16):
+        """Wraps an existing QiClient; the caller remains responsible for closing it"""
+        if client is None or not isinstance(client, QiClient):
+            raise TypeError
+        asyncClient = AsyncQiClient.__new__(AsyncQiClient)
+        asyncClient.__setup(client, maxConcurrency, False)
+        return asyncClient
+
+    def __setup(self, client, maxConcurrency, ownsClient):
+        if maxConcurrency is None or maxConcurrency < 1:
+            raise ValueError("maxConcurrency must be at least 1")
+        self.__client = client
+        self.__ownsClient = ownsClient
+        self.__maxConcurrency = maxConcurrency
+        self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=maxConcurrency,
+                                                                thread_name_prefix="AsyncQiClient")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def Uri(self):
+        return self.__client.Uri
+
+    @property
+    def Client(self):
+        return self.__client
+
+    @property
+    def MaxConcurrency(self):
+        return self.__maxConcurrency
+
+    async def close(self):
+        """Waits for running calls to finish and releases the worker threads and connections"""
+        await asyncio.get_running_loop().run_in_executor(None, self.__executor.shutdown)
+        if self.__ownsClient:
+            self.__client.close()
+
+    async def __call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, functools.partial(method, *args, **kwargs))
+
+    # Types
+
+    async def getType(self, namespace_id, type_id):
+        return await self.__call(self.__client.getType, namespace_id, type_id)
+
+    async def getTypeReferenceCount(self, namespace_id, type_id):
+        return await self.__call(self.__client.getTypeReferenceCount, namespace_id, type_id)
+
+    async def getTypes(self, namespace_id, skip=0, count=100):
+        return await self.__call(self.__client.getTypes, namespace_id, skip, count)
+
+    async def getOrCreateType(self, namespace_id, type):
+        return await self.__call(self.__client.getOrCreateType, namespace_id, type)
+
+    async def createOrUpdateType(self, namespace_id, type):
+        return await self.__call(self.__client.createOrUpdateType, namespace_id, type)
+
+    async def deleteType(self, namespace_id, type_id):
+        return await self.__call(self.__client.deleteType, namespace_id, type_id)
+
+    # Behaviors
+
+    async def getBehavior(self, namespace_id, behavior_id):
+        return await self.__call(self.__client.getBehavior, namespace_id, behavior_id)
+
+    async def getBehaviorReferenceCount(self, namespace_id, behavior_id):
+        return await self.__call(self.__client.getBehaviorReferenceCount, namespace_id, behavior_id)
+
+    async def getBehaviors(self, namespace_id, skip=0, count=100):
+        return await self.__call(self.__client.getBehaviors, namespace_id, skip, count)
+
+    async def getOrCreateBehavior(self, namespace_id, behavior):
+        return await self.__call(self.__client.getOrCreateBehavior, namespace_id, behavior)
+
+    async def createOrUpdateBehavior(self, namespace_id, behavior):
+        return await self.__call(self.__client.createOrUpdateBehavior, namespace_id, behavior)
+
+    async def deleteBehavior(self, namespace_id, behavior_id):
+        return await self.__call(self.__client.deleteBehavior, namespace_id, behavior_id)
+
+    # Views
+
+    async def getView(self, namespace_id, view_id):
+        return await self.__call(self.__client.getView, namespace_id, view_id)
+
+    async def getViewMap(self, namespace_id, view_id):
+        return await self.__call(self.__client.getViewMap, namespace_id, view_id)
+
+    async def getViews(self, namespace_id, skip=0, count=100):
+        return await self.__call(self.__client.getViews, namespace_id, skip, count)
+
+    async def getOrCreateView(self, namespace_id, view):
+        return await self.__call(self.__client.getOrCreateView, namespace_id, view)
+
+    async def createOrUpdateView(self, namespace_id, view):
+        return await self.__call(self.__client.createOrUpdateView, namespace_id, view)
+
+    async def deleteView(self, namespace_id, view_id):
+        return await self.__call(self.__client.deleteView, namespace_id, view_id)
+
+    # Streams
+
+    async def getStream(self, namespace_id, stream_id):
+        return await self.__call(self.__client.getStream, namespace_id, stream_id)
+
+    async def getStreamType(self, namespace_id, stream_id):
+        return await self.__call(self.__client.getStreamType, namespace_id, stream_id)
+
+    async def getStreams(self, namespace_id, query="", skip=0, count=100):
+        return await self.__call(self.__client.getStreams, namespace_id, query, skip, count)
+
+    async def getOrCreateStream(self, namespace_id, stream):
+        return await self.__call(self.__client.getOrCreateStream, namespace_id, stream)
+
+    async def createOrUpdateStream(self, namespace_id, stream):
+        return await self.__call(self.__client.createOrUpdateStream, namespace_id, stream)
+
+    async def deleteStream(self, namespace_id, stream_id):
+        return await self.__call(self.__client.deleteStream, namespace_id, stream_id)
+
+    # Data
+
+    async def getValue(self, namespace_id, stream_id, index, value_class, view_id=""):
+        return await self.__call(self.__client.getValue, namespace_id, stream_id, index, value_class, view_id)
+
+    async def getFirstValue(self, namespace_id, stream_id, value_class, view_id=""):
+        return await self.__call(self.__client.getFirstValue, namespace_id, stream_id, value_class, view_id)
+
+    async def getLastValue(self, namespace_id, stream_id, value_class, view_id=""):
+        return await self.__call(self.__client.getLastValue, namespace_id, stream_id, value_class, view_id)
+
+    async def getWindowValues(self, namespace_id, stream_id, value_class, start, end, view_id=""):
+        return await self.__call(self.__client.getWindowValues, namespace_id, stream_id, value_class, start, end, view_id)
+
+    async def getRangeValues(self, namespace_id, stream_id, value_class, start, skip, count, reverse, boundary_type, view_id=""):
+        return await self.__call(self.__client.getRangeValues, namespace_id, stream_id, value_class, start, skip, count,
+                                 reverse, boundary_type, view_id)
+
+    async def getWindowColumns(self, namespace_id, stream_id, start, end, view_id="", type=None):
+        return await self.__call(self.__client.getWindowColumns, namespace_id, stream_id, start, end, view_id, type)
+
+    async def getRangeColumns(self, namespace_id, stream_id, start, skip, count, reverse, boundary_type, view_id="", type=None):
+        return await self.__call(self.__client.getRangeColumns, namespace_id, stream_id, start, skip, count,
+                                 reverse, boundary_type, view_id, type)
+
+    async def getInterpolatedColumns(self, namespace_id, stream_id, indexes, view_id="", type=None, behavior=None):
+        return await self.__call(self.__client.getInterpolatedColumns, namespace_id, stream_id, indexes, view_id,
+                                 type, behavior)
+
+    async def getResampledColumns(self, namespace_id, stream_id, start, end, interval, view_id="", type=None,
+                                  behavior=None):
+        return await self.__call(self.__client.getResampledColumns, namespace_id, stream_id, start, end, interval,
+                                 view_id, type, behavior)
+
+    async def getWindowValuesForStreams(self, namespace_id, stream_ids, value_class, start, end, view_id="", workers=8):
+        return await self.__call(self.__client.getWindowValuesForStreams, namespace_id, stream_ids, value_class,
+                                 start, end, view_id, workers)
+
+    async def mergeWindowValues(self, namespace_id, stream_ids, value_class, start, end, view_id="", workers=8, key=None):
+        return await self.__call(self.__client.mergeWindowValues, namespace_id, stream_ids, value_class,
+                                 start, end, view_id, workers, key)
+
+    async def follow(self, namespace_id, stream_id, value_class, from_index=None, view_id="", pageSize=1000,
+                     minInterval=0.5, maxInterval=30.0, positionFile=None, idleTimeout=None):
+        """Asynchronous iterator over the values of the stream from 'from_index' on, waiting for new ones;
+        see QiClient.follow"""
+        if namespace_id is None:
+            raise TypeError
+        if stream_id is None:
+            raise TypeError
+        if value_class is None:
+            raise TypeError
+        if pageSize < 2:
+            raise ValueError("pageSize must be at least 2")
+
+        if view_id:
+            type = await self.getType(namespace_id, (await self.getView(namespace_id, view_id)).TargetTypeId)
+        else:
+            type = await self.getStreamType(namespace_id, stream_id)
+        follower = QiFollower(keyProperty(type), from_index, positionFile, minInterval, maxInterval)
+        idle = 0
+        try:
+            while True:
+                page = await self.getRangeValues(namespace_id, stream_id, value_class, follower.Start, 0, pageSize,
+                                                 False, QiBoundaryType.Outside, view_id)
+                values = follower.newValues(page)
+                for value in values:
+                    follower.yielded(value)
+                    yield value
+                follower.save()
+
+                if len(values) > 0:
+                    idle = 0
+                elif idleTimeout is not None and idle >= idleTimeout:
+                    return
+                wait = follower.wait(len(values), len(page) >= pageSize)
+                if idleTimeout is not None:
+                    wait = min(wait, idleTimeout - idle)
+                idle += wait
+                if wait > 0:
+                    await asyncio.sleep(wait)
+        finally:
+            follower.save()
+
+    async def insertValue(self, namespace_id, stream_id, value):
+        return await self.__call(self.__client.insertValue, namespace_id, stream_id, value)
+
+    async def insertValues(self, namespace_id, stream_id, values):
+        return await self.__call(self.__client.insertValues, namespace_id, stream_id, values)
+
+    async def updateValue(self, namespace_id, stream_id, value):
+        return await self.__call(self.__client.updateValue, namespace_id, stream_id, value)
+
+    async def updateValues(self, namespace_id, stream_id, values):
+        return await self.__call(self.__client.updateValues, namespace_id, stream_id, values)
+
+    async def replaceValue(self, namespace_id, stream_id, value):
+        return await self.__call(self.__client.replaceValue, namespace_id, stream_id, value)
+
+    async def replaceValues(self, namespace_id, stream_id, values):
+        return await self.__call(self.__client.replaceValues, namespace_id, stream_id, values)
+
+    async def insertValuesBulk(self, namespace_id, stream_id, values, maxCount=5000, maxBytes=4*1024*1024, workers=4):
+        return await self.__call(self.__client.insertValuesBulk, namespace_id, stream_id, values, maxCount, maxBytes, workers)
+
+    async def updateValuesBulk(self, namespace_id, stream_id, values, maxCount=5000, maxBytes=4*1024*1024, workers=4):
+        return await self.__call(self.__client.updateValuesBulk, namespace_id, stream_id, values, maxCount, maxBytes, workers)
+
+    async def replaceValuesBulk(self, namespace_id, stream_id, values, maxCount=5000, maxBytes=4*1024*1024, workers=4):
+        return await self.__call(self.__client.replaceValuesBulk, namespace_id, stream_id, values, maxCount, maxBytes, workers)
+
+    async def removeValue(self, namespace_id, stream_id, key):
+        return await self.__call(self.__client.removeValue, namespace_id, stream_id, key)
+
+    async def removeWindowValues(self, namespace_id, stream_id, start, end):
+        return await self.__call(self.__client.removeWindowValues, namespace_id, stream_id, start, end)
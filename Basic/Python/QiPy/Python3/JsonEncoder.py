@@ -1,30 +1,32 @@
 from json import JSONEncoder
-import inspect
-import collections
+import collections.abc
+from QiCodec import QiCodec
 
 def isprop(v):
   return isinstance(v, property)
 
+def serializable(obj):
+    """Returns what 'obj' is encoded as: iterables as lists, value classes as the dictionary of their
+    properties that are not None, other objects as their attributes; usable as the 'default' of any
+    QiJson backend"""
+    if isinstance(obj, collections.abc.Iterable):
+        # Contend with objects that can be iterated over, the encoder calls back for each item it cannot encode
+        return list(obj)
+    else:
+        objJson = {}
+        codec = QiCodec.forClass(type(obj))
+        if len(codec.Names) > 0:
+            for name, value in codec.toDictionary(obj).items():
+                if value is not None:
+                    objJson[name] = value
+        else:
+            # If we fail to find properties, we simply serialize the attributes
+            objAttribs = obj.__dict__
+            for attrib in objAttribs:
+                if objAttribs[attrib] is not None:
+                    objJson[attrib] = objAttribs[attrib]
+        return objJson
+
 class Encoder(JSONEncoder):
     def default(self,obj):
-        if isinstance(obj, collections.Iterable):
-            # Contend with objects that can be iterated over
-            objJson = []
-            for o in obj:
-                objJson.append(default(o))
-            return objJson
-        else:
-            objJson = {}
-            properties = inspect.getmembers(type(obj), isprop)
-            if len(properties) > 0:
-                for property in properties:
-                    value = property[1].fget(obj)
-                    if value is not None:
-                        objJson[property[0]] = value
-            else:
-                # If we fail to find properties, we simply serialize the attributes
-                objAttribs = obj.__dict__
-                for attrib in objAttribs:
-                    if objAttribs[attrib] is not None:
-                        objJson[attrib] = objAttribs[attrib]
-            return objJson
\ No newline at end of file
+        return serializable(obj)
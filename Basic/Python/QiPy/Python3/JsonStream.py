@@ -0,0 +1,104 @@
+import codecs
+import json
+import re
+
+_whitespace = re.compile(r"[ \t\n\r]*")
+_delimiters = frozenset(" \t\n\r,]")
+_numberParts = frozenset("0123456789.eE+-")
+_literals = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+def _truncated(buffer, error):
+    # whether decoding failed only because the element continues in the next chunk, as with an
+    # unterminated string, "tru" or "1."; anything else is malformed however much more arrives
+    position = getattr(error, "pos", None)
+    if position is None or position >= len(buffer) or error.msg.startswith("Unterminated string"):
+        return True
+    rest = buffer[position:]
+    if all(char in _numberParts for char in rest):
+        # a number split inside, as in "1." or "1e", within an object or array
+        return True
+    if error.msg.startswith("Invalid \\uXXXX escape"):
+        return len(rest) <= 5
+    return any(literal.startswith(rest) for literal in _literals)
+
+def iterJsonArray(chunks, decoder=json.JSONDecoder()):
+    """Yields the elements of a JSON array as they are parsed from 'chunks', an iterable of bytes or text,
+    keeping only the unparsed remainder in memory. Malformed JSON raises a ValueError giving the offset
+    of the text in the stream as soon as it is read"""
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    # the offset of the start of 'buffer' in the stream
+    offset = 0
+    started = False
+    finished = False
+    # whether the next token is a separator rather than an element, and whether no element came yet
+    separator = False
+    empty = True
+
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk)
+        if finished or len(chunk) == 0:
+            continue
+        buffer += chunk
+
+        position = 0
+        while True:
+            position = _whitespace.match(buffer, position).end()
+            if position >= len(buffer):
+                break
+
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array, found {char!r} at offset {offset}".
+                                     format(char=buffer[position], offset=offset + position))
+                started = True
+                position += 1
+                continue
+
+            if separator:
+                # after an element only a comma or the end of the array may follow
+                if buffer[position] == "]":
+                    finished = True
+                    break
+                if buffer[position] != ",":
+                    raise ValueError("Expected ',' or ']' in JSON array, found {char!r} at offset {offset}".
+                                     format(char=buffer[position], offset=offset + position))
+                separator = False
+                empty = False
+                position += 1
+                continue
+
+            if buffer[position] == "]":
+                if not empty:
+                    raise ValueError("Expected an element after ',' in JSON array at offset {offset}".
+                                     format(offset=offset + position))
+                finished = True
+                break
+
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except ValueError as e:
+                if _truncated(buffer, e):
+                    # the element is not complete yet
+                    break
+                raise ValueError("Invalid element in JSON array at offset {offset}: {error}".
+                                 format(offset=offset + getattr(e, "pos", position), error=getattr(e, "msg", e)))
+            if end >= len(buffer):
+                # the element is only known to be complete once a delimiter follows it
+                break
+            if buffer[end] not in _delimiters:
+                if isinstance(element, (int, float)) and not isinstance(element, bool) and buffer[end] in _numberParts:
+                    # a number split inside, as in "1." or "1e", continues in the next chunk
+                    break
+                raise ValueError("Expected ',' or ']' in JSON array, found {char!r} at offset {offset}".
+                                 format(char=buffer[end], offset=offset + end))
+            yield element
+            separator = True
+            position = end
+
+        buffer = buffer[position:]
+        offset += position
+
+    if started and not finished:
+        raise ValueError("Incomplete JSON array")
@@ -0,0 +1,232 @@
+import concurrent.futures
+import threading
+import time
+
+import QiJson
+from QiError import QiError
+
+
+class _QiStreamBuffer(object):
+
+    def __init__(self):
+        self.texts = []
+        self.size = 0
+        self.since = None
+
+
+class QiBufferedWriter(object):
+    """Collects single events per stream and inserts them with insertValues from a background thread.
+    A stream's events are sent once 'maxEvents' of them or 'maxBytes' of JSON are waiting, or when the
+    oldest has waited 'maxDelay' seconds. Events are encoded as they are written, so later changes to
+    a value are not sent. At most 'maxBufferedBytes' are held; write blocks while the buffer is full.
+    Batches that fail are passed to 'onError(stream_id, payload, error)' and dropped; without a
+    callback the first failure is raised by the next flush or close. 'client' may be anything with
+    QiClient's insertValues(namespace_id, stream_id, values)."""
+
+    def __init__(self, client, namespace_id, maxEvents=1000, maxBytes=1024*1024, maxDelay=1.0,
+                 maxBufferedBytes=64*1024*1024, workers=1, onError=None):
+        if client is None:
+            raise TypeError
+        if namespace_id is None:
+            raise TypeError
+        if maxEvents < 1 or maxBytes < 1 or maxBufferedBytes < 1:
+            raise ValueError("maxEvents, maxBytes and maxBufferedBytes must be at least 1")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.__client = client
+        self.__namespace = namespace_id
+        self.__maxEvents = maxEvents
+        self.__maxBytes = maxBytes
+        self.__maxDelay = maxDelay
+        self.__maxBufferedBytes = maxBufferedBytes
+        self.__onError = onError
+
+        self.__lock = threading.Lock()
+        self.__changed = threading.Condition(self.__lock)
+        self.__buffers = {}
+        self.__inFlight = set()
+        self.__bufferedEvents = 0
+        self.__bufferedBytes = 0
+        self.__sentEvents = 0
+        self.__failedEvents = 0
+        self.__errors = []
+        self.__flushing = 0
+        self.__closed = False
+
+        self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.__thread = threading.Thread(target=self.__run, name="QiBufferedWriter")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @property
+    def NamespaceId(self):
+        return self.__namespace
+
+    @property
+    def BufferedEvents(self):
+        """Events written but not yet acknowledged, those being sent included"""
+        return self.__bufferedEvents
+
+    @property
+    def BufferedBytes(self):
+        return self.__bufferedBytes
+
+    @property
+    def SentEvents(self):
+        return self.__sentEvents
+
+    @property
+    def FailedEvents(self):
+        return self.__failedEvents
+
+    def write(self, stream_id, value, timeout=None):
+        """Queues 'value' for the stream specified by 'stream_id'; waits at most 'timeout' seconds
+        for room in the buffer"""
+        if stream_id is None:
+            raise TypeError
+        if value is None:
+            raise TypeError
+
+        text = self.__encode(value)
+        size = len(text) + 1
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__changed:
+            if self.__closed:
+                raise QiError("QiBufferedWriter is closed")
+            # a single event larger than the whole buffer is let through once the buffer is empty
+            while self.__bufferedBytes > 0 and self.__bufferedBytes + size > self.__maxBufferedBytes:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise QiError("Timed out waiting for room in the buffer of QiStream, {stream_id}".
+                                  format(stream_id=stream_id))
+                self.__changed.wait(remaining)
+                if self.__closed:
+                    raise QiError("QiBufferedWriter is closed")
+
+            buffer = self.__buffers.get(stream_id)
+            if buffer is None:
+                buffer = self.__buffers[stream_id] = _QiStreamBuffer()
+            if buffer.since is None:
+                buffer.since = time.monotonic()
+            buffer.texts.append(text)
+            buffer.size += size
+            self.__bufferedEvents += 1
+            self.__bufferedBytes += size
+            if len(buffer.texts) >= self.__maxEvents or buffer.size >= self.__maxBytes or len(buffer.texts) == 1:
+                self.__changed.notify_all()
+
+    def writeMany(self, stream_id, values, timeout=None):
+        """Queues each of 'values' for the stream specified by 'stream_id'"""
+        if values is None:
+            raise TypeError
+        for value in values:
+            self.write(stream_id, value, timeout)
+
+    def flush(self, timeout=None):
+        """Sends everything written so far and waits until it is acknowledged"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__changed:
+            self.__flushing += 1
+            self.__changed.notify_all()
+            try:
+                while self.__bufferedEvents > 0:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise QiError("Timed out flushing {count} events".format(count=self.__bufferedEvents))
+                    self.__changed.wait(remaining)
+            finally:
+                self.__flushing -= 1
+            errors = self.__errors
+            self.__errors = []
+        if len(errors) > 0:
+            raise errors[0]
+
+    def close(self, timeout=None):
+        """Flushes the buffer and stops the background thread"""
+        with self.__changed:
+            if self.__closed:
+                return
+        try:
+            self.flush(timeout)
+        finally:
+            with self.__changed:
+                self.__closed = True
+                self.__changed.notify_all()
+            self.__thread.join()
+            self.__executor.shutdown(wait=True)
+
+    def __encode(self, value):
+        if callable(getattr(value, "toJson", None)):
+            return value.toJson()
+        if isinstance(value, str):
+            return value
+        return QiJson.dumps(value)
+
+    def __run(self):
+        with self.__changed:
+            while True:
+                now = time.monotonic()
+                wait = None
+                for stream_id, buffer in list(self.__buffers.items()):
+                    if len(buffer.texts) == 0 or stream_id in self.__inFlight:
+                        continue
+                    if (self.__flushing > 0 or self.__closed or len(buffer.texts) >= self.__maxEvents or
+                            buffer.size >= self.__maxBytes or now - buffer.since >= self.__maxDelay):
+                        self.__submit(stream_id, buffer)
+                    else:
+                        remaining = buffer.since + self.__maxDelay - now
+                        wait = remaining if wait is None else min(wait, remaining)
+
+                if self.__closed and self.__bufferedEvents == 0:
+                    return
+                self.__changed.wait(wait)
+
+    def __submit(self, stream_id, buffer):
+        # called with the lock held; one batch per stream is in flight at a time so the order is kept
+        texts = buffer.texts
+        count = 0
+        size = 0
+        while count < len(texts) and count < self.__maxEvents and (count == 0 or size + len(texts[count]) + 1 <= self.__maxBytes):
+            size += len(texts[count]) + 1
+            count += 1
+        batch = texts[:count]
+        del texts[:count]
+        buffer.size -= size
+        if len(texts) == 0:
+            buffer.since = None
+            del self.__buffers[stream_id]
+        self.__inFlight.add(stream_id)
+        self.__executor.submit(self.__send, stream_id, batch, size)
+
+    def __send(self, stream_id, batch, size):
+        payload = "[" + ",".join(batch) + "]"
+        error = None
+        try:
+            self.__client.insertValues(self.__namespace, stream_id, payload)
+        except Exception as e:
+            error = e
+            if self.__onError is not None:
+                try:
+                    self.__onError(stream_id, payload, e)
+                except Exception:
+                    pass
+
+        with self.__changed:
+            self.__inFlight.discard(stream_id)
+            self.__bufferedEvents -= len(batch)
+            self.__bufferedBytes -= size
+            if error is None:
+                self.__sentEvents += len(batch)
+            else:
+                self.__failedEvents += len(batch)
+                if self.__onError is None:
+                    self.__errors.append(error)
+            self.__changed.notify_all()
@@ -0,0 +1,46 @@
+class QiChunkResult(object):
+    """Outcome of sending one chunk of a bulk insert, update or replace"""
+
+    def __init__(self, index, offset, values):
+        self.__index = index
+        self.__offset = offset
+        self.__values = values
+        self.__statusCode = None
+        self.__error = None
+
+    @property
+    def Index(self):
+        """Position of the chunk in the order the values were given"""
+        return self.__index
+
+    @property
+    def Offset(self):
+        """Position of the chunk's first value in the values given"""
+        return self.__offset
+
+    @property
+    def Count(self):
+        return len(self.__values)
+
+    @property
+    def Values(self):
+        """The values sent in this chunk, so a failed chunk can be sent again on its own"""
+        return self.__values
+
+    @property
+    def StatusCode(self):
+        return self.__statusCode
+    @StatusCode.setter
+    def StatusCode(self, statusCode):
+        self.__statusCode = statusCode
+
+    @property
+    def Error(self):
+        return self.__error
+    @Error.setter
+    def Error(self, error):
+        self.__error = error
+
+    @property
+    def Succeeded(self):
+        return self.__error is None
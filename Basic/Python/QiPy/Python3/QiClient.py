@@ -1,9 +1,7 @@
 ﻿from urllib.parse import urlparse
 import urllib.request, urllib.parse, urllib.error
 import http.client as http
-import json
-
-import adal as adal
+import QiJson
 
 from QiError import QiError
 from QiType import QiType
@@ -13,14 +11,68 @@ from QiViewMap import QiViewMap
 from QiStreamBehavior import QiStreamBehavior
 from QiBoundaryType import QiBoundaryType
 from JsonEncoder import Encoder
+from QiChunkResult import QiChunkResult
+from JsonStream import iterJsonArray
+from QiColumns import toColumns
+from QiCodec import QiCodec
+from QiInterpolator import QiInterpolator, formatIndex, regularIndexes
+from QiTokenProvider import QiTokenProvider
+from QiRetryPolicy import QiRetryPolicy
+from QiMetrics import currentSample, attachSample
+from QiWindowCache import indexKey
+from QiFollower import QiFollower, keyProperty
 import requests
 import time
+import collections
+import concurrent.futures
+import functools
+import gzip
+import heapq
+import itertools
+import operator
+
+
+def _measured(method):
+    # records the call in the client's QiMetrics, when it has one; the iter* methods are not measured
+    # since their requests are made while the caller iterates
+    @functools.wraps(method)
+    def measured(self, *args, **kwargs):
+        metrics = self.Metrics
+        if metrics is None:
+            return method(self, *args, **kwargs)
+        with metrics.measure(method.__name__):
+            return method(self, *args, **kwargs)
+    return measured
+
+
+def _counted(chunks, sample):
+    # passes on the chunks of a streamed response, adding what is read of it to the sample
+    for chunk in chunks:
+        sample.addReceived(len(chunk))
+        yield chunk
+
+
+def _invalidatesWindows(method):
+    # drops the stream's events from the client's QiWindowCache once a write to it is done, failed or not,
+    # since a failed request may still have been applied
+    @functools.wraps(method)
+    def invalidating(self, namespace_id, stream_id, *args, **kwargs):
+        try:
+            return method(self, namespace_id, stream_id, *args, **kwargs)
+        finally:
+            windowCache = self.WindowCache
+            if windowCache is not None:
+                windowCache.invalidate(namespace_id, stream_id)
+    return invalidating
 
 
 class QiClient(object):
     """Handles communication with Qi Service"""
 
-    def __init__(self, tenant, url, resource, authority, clientId, clientSecret):
+    def __init__(self, tenant, url, resource, authority, clientId, clientSecret,
+                 session=None, poolConnections=10, poolMaxSize=10, poolBlock=False, keepAlive=True,
+                 metadataCache=None, tokenProvider=None, retryPolicy=None, metrics=None,
+                 compressionThreshold=None, compressionLevel=6, windowCache=None):
         self.__tenant = tenant
         self.__url = url
         self.__resource = resource
@@ -29,16 +81,83 @@ class QiClient(object):
 
         self.__authority = authority
 
-        self.__token = ""
-        self.__expiration = 0
-        self.__getToken()
+        # all calls share one session so connections (and their TLS handshakes) are reused;
+        # 'poolConnections' is the number of per-host pools kept, 'poolMaxSize' the connections per host
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=poolConnections,
+                                                    pool_maxsize=poolMaxSize, pool_block=poolBlock)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self.__ownsSession = True
+        else:
+            self.__ownsSession = False
+        self.__session = session
+        self.__keepAlive = keepAlive
+
+        # every request goes through __request, which retries transient failures as the policy allows
+        self.__retryPolicy = retryPolicy if retryPolicy is not None else QiRetryPolicy()
+
+        # optional QiMetadataCache for types, behaviors, views and streams
+        self.__metadataCache = metadataCache
+
+        # optional QiWindowCache holding the events read by getWindowValues and getRangeValues
+        self.__windowCache = windowCache
+
+        # optional QiMetrics recording each call's latency by phase, payload sizes and errors
+        self.__metrics = metrics
+
+        # request bodies of at least 'compressionThreshold' bytes are sent gzip-compressed, None sends
+        # them as they are; responses are always accepted compressed and decompressed by requests
+        self.__compressionThreshold = compressionThreshold
+        self.__compressionLevel = compressionLevel
+
+        # tokens come from a QiTokenProvider, which may be shared with other clients of the tenant
+        if tokenProvider is None:
+            tokenProvider = QiTokenProvider(resource, authority, clientId, clientSecret)
+            self.__ownsTokenProvider = True
+        else:
+            self.__ownsTokenProvider = False
+        self.__tokenProvider = tokenProvider
+        self.__headers = (None, None)
+        self.__qiHeaders()
 
         self.__setPathAndQueryTemplates()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     @property
     def Uri(self):
         return self.__url
 
+    @property
+    def Session(self):
+        return self.__session
+
+    @property
+    def MetadataCache(self):
+        return self.__metadataCache
+
+    @property
+    def WindowCache(self):
+        return self.__windowCache
+
+    @property
+    def Metrics(self):
+        return self.__metrics
+
+    def close(self):
+        """Releases the pooled connections; an injected session or token provider is left for its owner to close"""
+        if self.__ownsSession:
+            self.__session.close()
+        if self.__ownsTokenProvider:
+            self.__tokenProvider.close()
+
+    @_measured
     def getType(self, namespace_id, type_id):
         """Retrieves the type specified by 'type_id' from Qi Service"""
         if namespace_id is None:
@@ -46,18 +165,23 @@ class QiClient(object):
         if type_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__typesPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, type_id=type_id),
-            headers=self.__qiHeaders())
+        cached = self.__cacheGet("Type", namespace_id, type_id)
+        if cached is not None:
+            return cached
+
+        response = self.__request("GET",
+            self.__uri(self.__typesPath, namespace_id=namespace_id, type_id=type_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get QiType, {type_id}. {status}:{reason}".
-                          format(type_id=type_id, status=response.status_code, reason=response.text))
+                          format(type_id=type_id, status=response.status_code, reason=response.text), response.status_code)
         
-        type = QiType.fromJson(json.loads(response.content))
+        type = QiType.fromJson(QiJson.loads(response.content))
         response.close()
+        self.__cachePut("Type", namespace_id, type_id, type)
         return type
 
+    @_measured
     def getTypeReferenceCount(self, namespace_id, type_id):
         """Retrieves the number of times the type is referenced"""
         if namespace_id is None:
@@ -65,38 +189,38 @@ class QiClient(object):
         if type_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__typesPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, type_id=type_id) + "/ReferenceCount",
-            headers=self.__qiHeaders())
+        response = self.__request("GET",
+            self.__uri(self.__typesPath, namespace_id=namespace_id, type_id=type_id) + "/ReferenceCount")
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get QiType reference count, {type_id}. {status}:{reason}".
-                          format(type_id=type_id, status=response.status_code, reason=response.text))
+                          format(type_id=type_id, status=response.status_code, reason=response.text), response.status_code)
         
-        count = json.loads(response.content)
+        count = QiJson.loads(response.content)
         response.close()
         return int(count)
 
+    @_measured
     def getTypes(self, namespace_id, skip=0, count=100):
         """Retrieves a list of types associated with the specified 'namespace_id' under the current tenant"""
         if namespace_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__getTypesPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, skip=skip, count=count),
-            headers=self.__qiHeaders())
+        response = self.__request("GET",
+            self.__uri(self.__getTypesPath, namespace_id=namespace_id, skip=skip, count=count))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get all QiTypes. {status}:{reason}".
-                          format(status=response.status_code, reason=response.text))
+                          format(status=response.status_code, reason=response.text), response.status_code)
 
-        types = json.loads(response.content)
+        types = QiJson.loads(response.content)
         results = []
         for t in types:
             results.append(QiType.fromJson(t))
         response.close()
         return results
 
+    @_measured
     def getOrCreateType(self, namespace_id, type):
         """Tells Qi Service to create a type based on local 'type' or get if existing type matches"""
         if namespace_id is None:
@@ -104,19 +228,20 @@ class QiClient(object):
         if type is None or not isinstance(type, QiType):
             raise TypeError
 
-        response = requests.post(
-            self.__url + self.__typesPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, type_id=type.Id),
-            data=type.toJson(), 
-            headers=self.__qiHeaders())
+        response = self.__request("POST",
+            self.__uri(self.__typesPath, namespace_id=namespace_id, type_id=type.Id),
+            data=type.toJson(), idempotent=True)
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError(
-                "Failed to create type, {type_id}. {status}:{reason}".format(type_id=type.Id, status=response.status_code, reason=response.text))
+                "Failed to create type, {type_id}. {status}:{reason}".format(type_id=type.Id, status=response.status_code, reason=response.text), response.status_code)
         
-        type = QiType.fromJson(json.loads(response.content))
+        type = QiType.fromJson(QiJson.loads(response.content))
+        self.__cachePut("Type", namespace_id, type.Id, type)
         response.close()
         return type
 
+    @_measured
     def createOrUpdateType(self, namespace_id, type):
         """Tells Qi Service to create a type based on local 'type' object"""
         if namespace_id is None:
@@ -124,16 +249,19 @@ class QiClient(object):
         if type is None or not isinstance(type, QiType):
             raise TypeError
 
-        response = requests.put(
-            self.__url + self.__typesPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, type_id=type.Id),
-            data=type.toJson(), headers=self.__qiHeaders())
+        response = self.__request("PUT",
+            self.__uri(self.__typesPath, namespace_id=namespace_id, type_id=type.Id),
+            data=type.toJson())
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError(
-                "Failed to create type, {type_id}. {status}:{reason}".format(type_id=type.Id, status=response.status_code, reason=response.text))
+                "Failed to create type, {type_id}. {status}:{reason}".format(type_id=type.Id, status=response.status_code, reason=response.text), response.status_code)
         
+        self.__cacheInvalidate("Type", namespace_id, type.Id)
+        self.__cacheInvalidate("StreamType", namespace_id)
         response.close()
 
+    @_measured
     def deleteType(self, namespace_id, type_id):
         """Tells Qi Service to delete the type specified by 'type_id'"""
         if namespace_id is None:
@@ -141,17 +269,19 @@ class QiClient(object):
         if type_id is None:
             raise TypeError
 
-        response = requests.delete(
-            self.__url + self.__typesPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, type_id=type_id),
-            headers=self.__qiHeaders())
+        response = self.__request("DELETE",
+            self.__uri(self.__typesPath, namespace_id=namespace_id, type_id=type_id))
 
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to delete QiType, {type_id}. {status}:{reason}".
-                          format(type_id=type_id, status=response.status_code, reason=response.text))
+                          format(type_id=type_id, status=response.status_code, reason=response.text), response.status_code)
 
+        self.__cacheInvalidate("Type", namespace_id, type_id)
+        self.__cacheInvalidate("StreamType", namespace_id)
         response.close()
 
+    @_measured
     def getBehavior(self, namespace_id, behavior_id):
         """Retrieves the behavior specified by 'behavior_id' from Qi Service"""
         if namespace_id is None:
@@ -159,19 +289,24 @@ class QiClient(object):
         if behavior_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__behaviorsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id,
-            behavior_id=behavior_id), 
-            headers=self.__qiHeaders())
+        cached = self.__cacheGet("Behavior", namespace_id, behavior_id)
+        if cached is not None:
+            return cached
+
+        response = self.__request("GET",
+            self.__uri(self.__behaviorsPath, namespace_id=namespace_id,
+            behavior_id=behavior_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get QiBehavior, {behavior_id}. {status}:{reason}".
-                          format(behavior_id=behavior_id, status=response.status_code, reason=response.text))
+                          format(behavior_id=behavior_id, status=response.status_code, reason=response.text), response.status_code)
 
-        behavior = QiStreamBehavior.fromJson(json.loads(response.content))
+        behavior = QiStreamBehavior.fromJson(QiJson.loads(response.content))
         response.close()
+        self.__cachePut("Behavior", namespace_id, behavior_id, behavior)
         return behavior
 
+    @_measured
     def getBehaviorReferenceCount(self, namespace_id, behavior_id):
         """Retrieves the behavior reference count"""
         if namespace_id is None:
@@ -179,38 +314,38 @@ class QiClient(object):
         if behavior_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__behaviorsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, behavior_id=behavior_id) + "/ReferenceCount", 
-            headers=self.__qiHeaders())
+        response = self.__request("GET",
+            self.__uri(self.__behaviorsPath, namespace_id=namespace_id, behavior_id=behavior_id) + "/ReferenceCount")
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get QiBehavior reference count, {behavior_id}. {status}:{reason}".
-                          format(behavior_id=behavior_id, status=response.status_code, reason=response.text))
+                          format(behavior_id=behavior_id, status=response.status_code, reason=response.text), response.status_code)
 
-        behavior = QiStreamBehavior.fromJson(json.loads(response.content))
+        behavior = QiStreamBehavior.fromJson(QiJson.loads(response.content))
         response.close()
         return behavior
 
+    @_measured
     def getBehaviors(self, namespace_id, skip=0, count=100):
         """Retrieves a list of behaviors associated with the specified 'namespace_id' under the current tenant"""
         if namespace_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__behaviorsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, skip=skip, count=count),
-            headers=self.__qiHeaders())
+        response = self.__request("GET",
+            self.__uri(self.__behaviorsPath, namespace_id=namespace_id, skip=skip, count=count))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get all QiBehaviors. {status}:{reason}".
-                          format(status=response.status_code, reason=response.text))
+                          format(status=response.status_code, reason=response.text), response.status_code)
 
-        content = json.loads(response.content)
+        content = QiJson.loads(response.content)
         results = []
         for item in content:
             results.append(QiStreamBehavior.fromJson(item))
         response.close()
         return results
 
+    @_measured
     def getOrCreateBehavior(self, namespace_id, behavior):
         """Tells Qi Service to create a behavior based on a local QiBehavior object"""
         if namespace_id is None:
@@ -218,19 +353,20 @@ class QiClient(object):
         if behavior is None or not isinstance(behavior, QiStreamBehavior):
             raise TypeError
 
-        response = requests.post(
-            self.__url + self.__behaviorsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, behavior_id=behavior.Id),
-            data=behavior.toJson(), 
-            headers=self.__qiHeaders())
+        response = self.__request("POST",
+            self.__uri(self.__behaviorsPath, namespace_id=namespace_id, behavior_id=behavior.Id),
+            data=behavior.toJson(), idempotent=True)
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to create QiBehavior, {behavior_id}. {status}:{reason}".
-                          format(behavior_id=behavior.Id, status=response.status_code, reason=response.text))
+                          format(behavior_id=behavior.Id, status=response.status_code, reason=response.text), response.status_code)
 
-        behavior = QiStreamBehavior.fromJson(json.loads(response.content))
+        behavior = QiStreamBehavior.fromJson(QiJson.loads(response.content))
+        self.__cachePut("Behavior", namespace_id, behavior.Id, behavior)
         response.close()
         return behavior
 
+    @_measured
     def createOrUpdateBehavior(self, namespace_id, behavior):
         """Tells Qi Service to create a behavior based on a local QiBehavior object"""
         if namespace_id is None:
@@ -238,17 +374,18 @@ class QiClient(object):
         if behavior is None or not isinstance(behavior, QiStreamBehavior):
             raise TypeError
 
-        response = requests.put(
-            self.__url + self.__behaviorsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, behavior_id=behavior.Id),
-            data=behavior.toJson(), 
-            headers=self.__qiHeaders())
+        response = self.__request("PUT",
+            self.__uri(self.__behaviorsPath, namespace_id=namespace_id, behavior_id=behavior.Id),
+            data=behavior.toJson())
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to create QiBehavior, {behavior_id}. {status}:{reason}".
-                          format(behavior_id=behavior.Id, status=response.status_code, reason=response.text))
+                          format(behavior_id=behavior.Id, status=response.status_code, reason=response.text), response.status_code)
 
+        self.__cacheInvalidate("Behavior", namespace_id, behavior.Id)
         response.close()
 
+    @_measured
     def deleteBehavior(self, namespace_id, behavior_id):
         """Tells Qi Service to delete the behavior with the specified 'behavior_id'"""
         if namespace_id is None:
@@ -256,16 +393,17 @@ class QiClient(object):
         if behavior_id is None:
             raise TypeError
 
-        response = requests.delete(
-            self.__url + self.__behaviorsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, behavior_id=behavior_id), 
-            headers=self.__qiHeaders())
+        response = self.__request("DELETE",
+            self.__uri(self.__behaviorsPath, namespace_id=namespace_id, behavior_id=behavior_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to delete QiBehavior, {behavior_id}. {status}:{reason}".
-                          format(behavior_id=behavior_id, status=response.status_code, reason=response.text))
+                          format(behavior_id=behavior_id, status=response.status_code, reason=response.text), response.status_code)
 
+        self.__cacheInvalidate("Behavior", namespace_id, behavior_id)
         response.close()
 
+    @_measured
     def getView(self, namespace_id, view_id):
         """Retrieves the view specified by 'view_id' from Qi Service"""
         if namespace_id is None:
@@ -273,19 +411,24 @@ class QiClient(object):
         if view_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__viewsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id,
-            view_id=view_id), 
-            headers=self.__qiHeaders())
+        cached = self.__cacheGet("View", namespace_id, view_id)
+        if cached is not None:
+            return cached
+
+        response = self.__request("GET",
+            self.__uri(self.__viewsPath, namespace_id=namespace_id,
+            view_id=view_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get QiView, {view_id}. {status}:{reason}".
-                          format(view_id=view_id, status=response.status_code, reason=response.text))
+                          format(view_id=view_id, status=response.status_code, reason=response.text), response.status_code)
 
-        view = QiView.fromJson(json.loads(response.content))
+        view = QiView.fromJson(QiJson.loads(response.content))
         response.close()
+        self.__cachePut("View", namespace_id, view_id, view)
         return view
 
+    @_measured
     def getViewMap(self, namespace_id, view_id):
         """Retrieves the view map specified by 'view_id' from Qi Service"""
         if namespace_id is None:
@@ -293,38 +436,43 @@ class QiClient(object):
         if view_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__viewsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, view_id=view_id) + "/Map", 
-            headers=self.__qiHeaders())
+        cached = self.__cacheGet("ViewMap", namespace_id, view_id)
+        if cached is not None:
+            return cached
+
+        response = self.__request("GET",
+            self.__uri(self.__viewsPath, namespace_id=namespace_id, view_id=view_id) + "/Map")
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get QiView, {view_id}. {status}:{reason}".
-                          format(view_id=view_id, status=response.status_code, reason=response.text))
+                          format(view_id=view_id, status=response.status_code, reason=response.text), response.status_code)
 
-        viewMap = QiViewMap.fromJson(json.loads(response.content))
+        viewMap = QiViewMap.fromJson(QiJson.loads(response.content))
         response.close()
+        self.__cachePut("ViewMap", namespace_id, view_id, viewMap)
         return viewMap
 
+    @_measured
     def getViews(self, namespace_id, skip=0, count=100):
         """Retrieves a list of views associated with the specified 'namespace_id' under the current tenant"""
         if namespace_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__viewsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, skip=skip, count=count),
-            headers=self.__qiHeaders())
+        response = self.__request("GET",
+            self.__uri(self.__viewsPath, namespace_id=namespace_id, skip=skip, count=count))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get all QiViews. {status}:{reason}".
-                          format(status=response.status_code, reason=response.text))
+                          format(status=response.status_code, reason=response.text), response.status_code)
 
-        content = json.loads(response.content)
+        content = QiJson.loads(response.content)
         results = []
         for item in content:
             results.append(QiView.fromJson(item))
         response.close()
         return results
 
+    @_measured
     def getOrCreateView(self, namespace_id, view):
         """Tells Qi Service to create a view based on a local QiView object"""
         if namespace_id is None:
@@ -332,19 +480,21 @@ class QiClient(object):
         if view is None or not isinstance(view, QiView):
             raise TypeError
 
-        response = requests.post(
-            self.__url + self.__viewsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, view_id=view.Id),
-            data=view.toJson(), 
-            headers=self.__qiHeaders())
+        response = self.__request("POST",
+            self.__uri(self.__viewsPath, namespace_id=namespace_id, view_id=view.Id),
+            data=view.toJson(), idempotent=True)
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to create QiView, {view_id}. {status}:{reason}".
-                          format(view_id=view.Id, status=response.status_code, reason=response.text))
+                          format(view_id=view.Id, status=response.status_code, reason=response.text), response.status_code)
 
-        view = QiView.fromJson(json.loads(response.content))
+        view = QiView.fromJson(QiJson.loads(response.content))
+        self.__cachePut("View", namespace_id, view.Id, view)
+        self.__cacheInvalidate("ViewMap", namespace_id, view.Id)
         response.close()
         return view
 
+    @_measured
     def createOrUpdateView(self, namespace_id, view):
         """Tells Qi Service to create a view based on a local QiView object"""
         if namespace_id is None:
@@ -352,17 +502,21 @@ class QiClient(object):
         if view is None or not isinstance(view, QiView):
             raise TypeError
 
-        response = requests.put(
-            self.__url + self.__viewsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, view_id=view.Id),
-            data=view.toJson(), 
-            headers=self.__qiHeaders())
+        response = self.__request("PUT",
+            self.__uri(self.__viewsPath, namespace_id=namespace_id, view_id=view.Id),
+            data=view.toJson())
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to create QiView, {view_id}. {status}:{reason}".
-                          format(view_id=view.Id, status=response.status_code, reason=response.text))
+                          format(view_id=view.Id, status=response.status_code, reason=response.text), response.status_code)
 
+        self.__cacheInvalidate("View", namespace_id, view.Id)
+        self.__cacheInvalidate("ViewMap", namespace_id, view.Id)
+        if self.__windowCache is not None:
+            self.__windowCache.invalidateView(namespace_id, view.Id)
         response.close()
 
+    @_measured
     def deleteView(self, namespace_id, view_id):
         """Tells Qi Service to delete the view with the specified 'view_id'"""
         if namespace_id is None:
@@ -370,16 +524,20 @@ class QiClient(object):
         if view_id is None:
             raise TypeError
 
-        response = requests.delete(
-            self.__url + self.__viewsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, view_id=view_id), 
-            headers=self.__qiHeaders())
+        response = self.__request("DELETE",
+            self.__uri(self.__viewsPath, namespace_id=namespace_id, view_id=view_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to delete QiView, {view_id}. {status}:{reason}".
-                          format(view_id=view_id, status=response.status_code, reason=response.text))
+                          format(view_id=view_id, status=response.status_code, reason=response.text), response.status_code)
 
+        self.__cacheInvalidate("View", namespace_id, view_id)
+        self.__cacheInvalidate("ViewMap", namespace_id, view_id)
+        if self.__windowCache is not None:
+            self.__windowCache.invalidateView(namespace_id, view_id)
         response.close()
 
+    @_measured
     def getStream(self, namespace_id, stream_id):
         """Retrieves a stream specified by 'stream_id' from the Qi Service"""
         if namespace_id is None:
@@ -387,18 +545,23 @@ class QiClient(object):
         if stream_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__streamsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id), 
-            headers=self.__qiHeaders())
+        cached = self.__cacheGet("Stream", namespace_id, stream_id)
+        if cached is not None:
+            return cached
+
+        response = self.__request("GET",
+            self.__uri(self.__streamsPath, namespace_id=namespace_id, stream_id=stream_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
-        stream = QiStream.fromJson(json.loads(response.content))
+        stream = QiStream.fromJson(QiJson.loads(response.content))
         response.close()
+        self.__cachePut("Stream", namespace_id, stream_id, stream)
         return stream
 
+    @_measured
     def getStreamType(self, namespace_id, stream_id):
         """Retrieves a stream specified by 'stream_id' from the Qi Service"""
         if namespace_id is None:
@@ -406,18 +569,23 @@ class QiClient(object):
         if stream_id is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__streamsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id) + "/Type", 
-            headers=self.__qiHeaders())
+        cached = self.__cacheGet("StreamType", namespace_id, stream_id)
+        if cached is not None:
+            return cached
+
+        response = self.__request("GET",
+            self.__uri(self.__streamsPath, namespace_id=namespace_id, stream_id=stream_id) + "/Type")
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
-        type = QiType.fromJson(json.loads(response.content))
+        type = QiType.fromJson(QiJson.loads(response.content))
         response.close()
+        self.__cachePut("StreamType", namespace_id, stream_id, type)
         return type
 
+    @_measured
     def getStreams(self, namespace_id, query="", skip=0, count=100):
         """Retrieves a list of streams associated with 'namespace_id' under the current tenant"""
         if namespace_id is None:
@@ -425,41 +593,43 @@ class QiClient(object):
         if query is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__getStreamsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, query=query, skip=skip, count=count),
-            headers=self.__qiHeaders())
+        response = self.__request("GET",
+            self.__uri(self.__getStreamsPath, namespace_id=namespace_id, query=query, skip=skip, count=count))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get all QiStreams. {status}:{reason}".
-                          format(status=response.status_code, reason=response.text))
+                          format(status=response.status_code, reason=response.text), response.status_code)
 
-        content = json.loads(response.content)
+        content = QiJson.loads(response.content)
         results = []
         for item in content:
             results.append(QiStream.fromJson(item))
         response.close()
         return results
 
+    @_measured
     def getOrCreateStream(self, namespace_id, stream):
         """Tells Qi Service to create a stream based on the local 'stream' QiStream object"""
         if namespace_id is None:
             raise TypeError
         if stream is None or not isinstance(stream, QiStream):
             raise TypeError
-        response = requests.post(
-            self.__url + self.__streamsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream.Id),
-            data=stream.toJson(), 
-            headers=self.__qiHeaders())
+        response = self.__request("POST",
+            self.__uri(self.__streamsPath, namespace_id=namespace_id, stream_id=stream.Id),
+            data=stream.toJson(), idempotent=True)
 
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to create QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream.Id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream.Id, status=response.status_code, reason=response.text), response.status_code)
 
-        stream = QiStream.fromJson(json.loads(response.content))
+        stream = QiStream.fromJson(QiJson.loads(response.content))
+        self.__cachePut("Stream", namespace_id, stream.Id, stream)
+        self.__cacheInvalidate("StreamType", namespace_id, stream.Id)
         response.close()
         return stream
 
+    @_measured
     def createOrUpdateStream(self, namespace_id, stream):
         """Tells Qi Service to create a stream based on the local 'stream' QiStream object"""
         if namespace_id is None:
@@ -467,17 +637,20 @@ class QiClient(object):
         if stream is None or not isinstance(stream, QiStream):
             raise TypeError
 
-        response = requests.put(
-            self.__url + self.__streamsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream.Id),
-            data=stream.toJson(), 
-            headers=self.__qiHeaders())
+        response = self.__request("PUT",
+            self.__uri(self.__streamsPath, namespace_id=namespace_id, stream_id=stream.Id),
+            data=stream.toJson())
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to create QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream.Id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream.Id, status=response.status_code, reason=response.text), response.status_code)
 
+        self.__cacheInvalidate("Stream", namespace_id, stream.Id)
+        self.__cacheInvalidate("StreamType", namespace_id, stream.Id)
+        self.__windowCacheInvalidate(namespace_id, stream.Id)
         response.close()
 
+    @_measured
     def deleteStream(self, namespace_id, stream_id):
         """Tells Qi Service to delete the stream speficied by 'stream_id'"""
         if namespace_id is None:
@@ -485,20 +658,23 @@ class QiClient(object):
         if stream_id is None:
             raise TypeError
 
-        response = requests.delete(
-            self.__url + self.__streamsPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id), 
-            headers=self.__qiHeaders())
+        response = self.__request("DELETE",
+            self.__uri(self.__streamsPath, namespace_id=namespace_id, stream_id=stream_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to delete QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
+        self.__cacheInvalidate("Stream", namespace_id, stream_id)
+        self.__cacheInvalidate("StreamType", namespace_id, stream_id)
+        self.__windowCacheInvalidate(namespace_id, stream_id)
         response.close()
 
 
     # The following section provides functionality to interact with Data
     #    We assume the value(s) passed follow the Qi object patterns supporting fromJson and toJson method
 
+    @_measured
     def getValue(self, namespace_id, stream_id, index, value_class, view_id=""):
         """Retrieves JSON object from Qi Service for value specified by 'index' from Qi Service """
         if namespace_id is None:
@@ -510,17 +686,17 @@ class QiClient(object):
         if value_class is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__getValueQuery.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id, index=index, view_id=view_id), 
-            headers=self.__qiHeaders())
+        response = self.__request("GET",
+            self.__uri(self.__getValueQuery, namespace_id=namespace_id, stream_id=stream_id, index=index, view_id=view_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
-            raise QiError("Failed to get value for QiStream, {stream_id}. {status}:{reason}".format(stream_id=stream_id, status=response.status_code, reason=response.text))
+            raise QiError("Failed to get value for QiStream, {stream_id}. {status}:{reason}".format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
-        content = json.loads(response.content)
+        content = QiJson.loads(response.content)
         response.close()
         return value_class.fromJson(content)
 
+    @_measured
     def getFirstValue(self, namespace_id, stream_id, value_class, view_id=""):
         """Retrieves JSON object from Qi Service the first value to be added to the stream specified by 'stream_id'"""
         if namespace_id is None:
@@ -530,18 +706,18 @@ class QiClient(object):
         if value_class is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__getFirstValue.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id, view_id=view_id), 
-            headers=self.__qiHeaders())
+        response = self.__request("GET",
+            self.__uri(self.__getFirstValue, namespace_id=namespace_id, stream_id=stream_id, view_id=view_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get first value for QiStream {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
-        content = json.loads(response.content)
+        content = QiJson.loads(response.content)
         response.close()
         return value_class.fromJson(content)
 
+    @_measured
     def getLastValue(self, namespace_id, stream_id, value_class, view_id=""):
         """Retrieves JSON object from Qi Service the last value to be added to the stream specified by 'stream_id'"""
         if namespace_id is None:
@@ -551,18 +727,18 @@ class QiClient(object):
         if value_class is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__getLastValue.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id, view_id=view_id), 
-            headers=self.__qiHeaders())
+        response = self.__request("GET",
+            self.__uri(self.__getLastValue, namespace_id=namespace_id, stream_id=stream_id, view_id=view_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get last value for QiStream {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
-        content = json.loads(response.content)
+        content = QiJson.loads(response.content)
         response.close()
         return value_class.fromJson(content)
 
+    @_measured
     def getWindowValues(self, namespace_id, stream_id, value_class, start, end, view_id=""):
         """Retrieves JSON object representing a window of values from the stream specified by 'stream_id'"""
         if namespace_id is None:
@@ -576,23 +752,16 @@ class QiClient(object):
         if end is None:
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__getWindowValues.format(tenant_id=self.__tenant, namespace_id=namespace_id,
-                                                       stream_id=stream_id, start=start, end=end, view_id=view_id),
-            headers=self.__qiHeaders())
-        if response.status_code < 200 or response.status_code >= 300:
-            response.close()
-            raise QiError("Failed to get window values for QiStream {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
-
-        content = json.loads(response.content)
-        response.close()
+        content = None
+        if self.__windowCache is not None:
+            content = self.__cachedWindow(namespace_id, stream_id, start, end, view_id)
+        if content is None:
+            content, size = self.__getWindow(namespace_id, stream_id, start, end, view_id)
 
-        values = []
-        for c in content:
-            values.append(value_class.fromDictionary(c))
-        return values
+        fromDictionary = self.__decoder(value_class, "fromDictionary")
+        return [fromDictionary(c) for c in content]
 
+    @_measured
     def getRangeValues(self, namespace_id, stream_id, value_class, start, skip, count, reverse, boundary_type, view_id=""):
         """Retrieves JSON object representing a range of values from the stream specified by 'stream_id'"""
         if namespace_id is None:
@@ -612,24 +781,234 @@ class QiClient(object):
         if boundary_type is None or not isinstance(boundary_type, QiBoundaryType):
             raise TypeError
 
-        response = requests.get(
-            self.__url + self.__getRangeValuesQuery.format(tenant_id=self.__tenant, namespace_id=namespace_id,
-                                                           stream_id=stream_id, start=start, skip=skip, count=count,
-                                                           reverse=reverse, boundary_type=boundary_type.value,
-                                                           view_id=view_id),
-           headers=self.__qiHeaders())
+        # the Exact and Inside boundaries of a range start at 'start', so the cache can answer them
+        if self.__windowCache is not None and boundary_type in (QiBoundaryType.Exact, QiBoundaryType.Inside):
+            content = self.__cachedRange(namespace_id, stream_id, start, skip, count, reverse, boundary_type, view_id)
+        else:
+            content, size = self.__getRange(namespace_id, stream_id, start, skip, count, reverse, boundary_type, view_id)
+
+        fromJson = self.__decoder(value_class, "fromJson")
+        return [fromJson(c) for c in content]
+
+    @_measured
+    def getWindowColumns(self, namespace_id, stream_id, start, end, view_id="", type=None):
+        """Retrieves a window of values from the stream specified by 'stream_id' as a dictionary of numpy arrays
+        keyed by property id; the QiType of the stream (or view target) is retrieved when 'type' is not given"""
+        if namespace_id is None:
+            raise TypeError
+        if stream_id is None:
+            raise TypeError
+        if start is None:
+            raise TypeError
+        if end is None:
+            raise TypeError
+        if type is None:
+            type = self.__resolveValueType(namespace_id, stream_id, view_id)
+
+        response = self.__request("GET",
+            self.__uri(self.__getWindowValues, namespace_id=namespace_id,
+                       stream_id=stream_id, start=start, end=end, view_id=view_id))
+        if response.status_code < 200 or response.status_code >= 300:
+            response.close()
+            raise QiError("Failed to get window values for QiStream {stream_id}. {status}:{reason}".
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
+
+        content = QiJson.loads(response.content)
+        response.close()
+        return toColumns(content, type)
+
+    @_measured
+    def getRangeColumns(self, namespace_id, stream_id, start, skip, count, reverse, boundary_type, view_id="", type=None):
+        """Retrieves a range of values from the stream specified by 'stream_id' as a dictionary of numpy arrays
+        keyed by property id; the QiType of the stream (or view target) is retrieved when 'type' is not given"""
+        if namespace_id is None:
+            raise TypeError
+        if stream_id is None:
+            raise TypeError
+        if start is None:
+            raise TypeError
+        if skip is None:
+            raise TypeError
+        if count is None:
+            raise TypeError
+        if reverse is None or not isinstance(reverse, bool):
+            raise TypeError
+        if boundary_type is None or not isinstance(boundary_type, QiBoundaryType):
+            raise TypeError
+        if type is None:
+            type = self.__resolveValueType(namespace_id, stream_id, view_id)
+
+        response = self.__request("GET",
+            self.__uri(self.__getRangeValuesQuery, namespace_id=namespace_id,
+                       stream_id=stream_id, start=start, skip=skip, count=count,
+                       reverse=reverse, boundary_type=boundary_type.value,
+                       view_id=view_id))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to get range of values from QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
-        content = json.loads(response.content)
+        content = QiJson.loads(response.content)
         response.close()
-        values = []
-        for c in content:
-            values.append(value_class.fromJson(c))
-        return values
+        return toColumns(content, type)
+
+    @_measured
+    def getInterpolatedColumns(self, namespace_id, stream_id, indexes, view_id="", type=None, behavior=None):
+        """Calculates the values of the stream specified by 'stream_id' at each of 'indexes', as the ExactOrCalculated
+        boundary does, and returns them as a dictionary of numpy arrays keyed by property id. Only the events from the
+        first index to the last, and the one either side, are read, through the window cache when the client has one;
+        the values are calculated locally by QiInterpolator. The QiType and the stream's QiStreamBehavior are retrieved
+        when 'type' and 'behavior' are not given"""
+        if namespace_id is None:
+            raise TypeError
+        if stream_id is None:
+            raise TypeError
+        if indexes is None:
+            raise TypeError
+        if type is None:
+            type = self.__resolveValueType(namespace_id, stream_id, view_id)
+        if behavior is None:
+            behavior = self.__streamBehavior(namespace_id, stream_id)
+
+        interpolator = QiInterpolator(type, behavior)
+        indexes = interpolator.indexArray(indexes)
+        content = []
+        if len(indexes) > 0:
+            content = self.__eventsAround(namespace_id, stream_id, formatIndex(indexes.min()), formatIndex(indexes.max()),
+                                          view_id)
+        return interpolator.interpolate(toColumns(content, type), indexes)
 
+    def getResampledColumns(self, namespace_id, stream_id, start, end, interval, view_id="", type=None, behavior=None):
+        """Calculates the values of the stream specified by 'stream_id' from 'start' to 'end' every 'interval';
+        see getInterpolatedColumns and QiInterpolator.regularIndexes"""
+        if start is None:
+            raise TypeError
+        if end is None:
+            raise TypeError
+        if interval is None:
+            raise TypeError
+        return self.getInterpolatedColumns(namespace_id, stream_id, regularIndexes(start, end, interval), view_id,
+                                           type, behavior)
+
+    @_measured
+    def getWindowValuesForStreams(self, namespace_id, stream_ids, value_class, start, end, view_id="", workers=8):
+        """Retrieves the same window of values from each stream in 'stream_ids', 'workers' streams at a time,
+        and returns the values keyed by stream id"""
+        if namespace_id is None:
+            raise TypeError
+        if stream_ids is None:
+            raise TypeError
+        if value_class is None:
+            raise TypeError
+        if start is None:
+            raise TypeError
+        if end is None:
+            raise TypeError
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        stream_ids = list(stream_ids)
+        if len(stream_ids) <= 1 or workers == 1:
+            return collections.OrderedDict((stream_id, self.getWindowValues(namespace_id, stream_id, value_class, start, end, view_id))
+                                           for stream_id in stream_ids)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(stream_ids))) as executor:
+            futures = [executor.submit(self.getWindowValues, namespace_id, stream_id, value_class, start, end, view_id)
+                       for stream_id in stream_ids]
+            try:
+                return collections.OrderedDict((stream_id, future.result()) for stream_id, future in zip(stream_ids, futures))
+            except Exception:
+                # the first failure is raised, the streams not yet requested are skipped
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def mergeWindowValues(self, namespace_id, stream_ids, value_class, start, end, view_id="", workers=8, key=None):
+        """Retrieves the same window of values from each stream in 'stream_ids' and returns an iterator over
+        (stream_id, value) pairs in index order; 'key' is the index property name, or a function returning a
+        value's index, and is found from the QiType of the first stream (or the view's target) when omitted.
+        Values with the same index are returned in the order of 'stream_ids'"""
+        values = self.getWindowValuesForStreams(namespace_id, stream_ids, value_class, start, end, view_id, workers)
+        if len(values) == 0:
+            return iter(())
+
+        if key is None:
+            type = self.__resolveValueType(namespace_id, next(iter(values)), view_id)
+            keys = [prop.Id for prop in type.Properties if prop.IsKey]
+            if len(keys) == 0:
+                raise QiError("QiType {type_id} has no key property to merge on".format(type_id=type.Id))
+            key = keys[0]
+        if not callable(key):
+            key = operator.attrgetter(key)
+
+        return heapq.merge(*[[(stream_id, value) for value in streamValues] for stream_id, streamValues in values.items()],
+                           key=lambda item: key(item[1]))
+
+    def iterWindowValues(self, namespace_id, stream_id, value_class, start, end, view_id="", chunkSize=64*1024):
+        """Returns an iterator over a window of values from the stream specified by 'stream_id',
+        parsing the response as it arrives instead of loading it whole"""
+        if namespace_id is None:
+            raise TypeError
+        if stream_id is None:
+            raise TypeError
+        if value_class is None:
+            raise TypeError
+        if start is None:
+            raise TypeError
+        if end is None:
+            raise TypeError
+
+        url = self.__uri(self.__getWindowValues, namespace_id=namespace_id,
+                         stream_id=stream_id, start=start, end=end, view_id=view_id)
+        return self.__iterValues(url, "Failed to get window values for QiStream", stream_id, self.__decoder(value_class, "fromDictionary"), chunkSize)
+
+    def iterRangeValues(self, namespace_id, stream_id, value_class, start, skip, count, reverse, boundary_type, view_id="",
+                        pageSize=1000, chunkSize=64*1024):
+        """Returns an iterator over 'count' values from 'start' in the stream specified by 'stream_id', or over all
+        remaining values when 'count' is None, requesting them 'pageSize' values at a time"""
+        if namespace_id is None:
+            raise TypeError
+        if stream_id is None:
+            raise TypeError
+        if value_class is None:
+            raise TypeError
+        if start is None:
+            raise TypeError
+        if skip is None:
+            raise TypeError
+        if reverse is None or not isinstance(reverse, bool):
+            raise TypeError
+        if boundary_type is None or not isinstance(boundary_type, QiBoundaryType):
+            raise TypeError
+        if pageSize < 1:
+            raise ValueError("pageSize must be at least 1")
+
+        return self.__iterRangePages(namespace_id, stream_id, value_class, start, skip, count, reverse, boundary_type,
+                                     view_id, pageSize, chunkSize)
+
+    def follow(self, namespace_id, stream_id, value_class, from_index=None, view_id="", pageSize=1000,
+               minInterval=0.5, maxInterval=30.0, positionFile=None, idleTimeout=None):
+        """Returns an iterator over the values of the stream specified by 'stream_id' from 'from_index' on,
+        which keeps polling for new values as they are written; the wait between polls that find nothing new
+        doubles from 'minInterval' to 'maxInterval'. The position is kept in 'positionFile', when given, and
+        a saved position is resumed from instead of 'from_index'. The iterator ends after 'idleTimeout' seconds
+        without new values, or never when it is None; close it to stop following and save the position"""
+        if namespace_id is None:
+            raise TypeError
+        if stream_id is None:
+            raise TypeError
+        if value_class is None:
+            raise TypeError
+        if pageSize < 2:
+            # the first value of each page is the last one already seen
+            raise ValueError("pageSize must be at least 2")
+
+        follower = QiFollower(keyProperty(self.__resolveValueType(namespace_id, stream_id, view_id)), from_index,
+                              positionFile, minInterval, maxInterval)
+        return self.__follow(namespace_id, stream_id, value_class, view_id, pageSize, follower, idleTimeout)
+
+    @_measured
+    @_invalidatesWindows
     def insertValue(self, namespace_id, stream_id, value):
         """Tells Qi Service to insert a value, described by the local object 'value', into
         the stream specified by 'stream_id'"""
@@ -645,16 +1024,17 @@ class QiClient(object):
         else:
             payload = value
 
-        response = requests.post(
-            self.__url + self.__insertValuePath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id), 
-            data=payload, 
-            headers=self.__qiHeaders())
+        response = self.__request("POST",
+            self.__uri(self.__insertValuePath, namespace_id=namespace_id, stream_id=stream_id), 
+            data=payload)
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to insert value for QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
         response.close()
 
+    @_measured
+    @_invalidatesWindows
     def insertValues(self, namespace_id, stream_id, values):
         """Tells Qi Service to insert the values, defined by the list 'values', into 
         the stream specified by 'stream_id'"""
@@ -666,21 +1046,23 @@ class QiClient(object):
             raise TypeError
 
         if callable(getattr(values[0], "toJson", None)):
-            events = []
-            for value in values:
-                events.append(value.toDictionary())
-            payload = json.dumps(events)
+            toDictionary = self.__encoder(type(values[0]))
+            payload = QiJson.dumpBytes([toDictionary(value) for value in values])
         else:
             payload = values
 
-        response = requests.post(
-            self.__url + self.__insertValuesPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id), 
-            data=payload, 
-            headers=self.__qiHeaders())
+        response = self.__request("POST",
+            self.__uri(self.__insertValuesPath, namespace_id=namespace_id, stream_id=stream_id), 
+            data=payload)
         if response.status_code < 200 or response.status_code >= 300:
+            response.close()
             raise QiError("Failed to insert multiple values for QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
+        response.close()
+
+    @_measured
+    @_invalidatesWindows
     def updateValue(self, namespace_id, stream_id, value):
         """Tells Qi Service to update the value described by 'value', a local QiValue object"""
         if namespace_id is None:
@@ -695,15 +1077,16 @@ class QiClient(object):
         else:
             payload = value
 
-        response = requests.put(self.__url + self.__updateValuePath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id), 
-                                data=payload, 
-                                headers=self.__qiHeaders())
+        response = self.__request("PUT", self.__uri(self.__updateValuePath, namespace_id=namespace_id, stream_id=stream_id), 
+                                data=payload)
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
-            raise QiError("Failed to update value for QiStream, {stream_id}. {status}:{reason}".format(stream_id=stream_id, status=response.status_code, reason=response.text))
+            raise QiError("Failed to update value for QiStream, {stream_id}. {status}:{reason}".format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
         response.close()
 
+    @_measured
+    @_invalidatesWindows
     def updateValues(self, namespace_id, stream_id, values):
         """Tells Qi Service to update values defined by the QiValue list, 'values'"""
         if namespace_id is None:
@@ -714,22 +1097,21 @@ class QiClient(object):
             raise TypeError
 
         if callable(getattr(values[0], "toJson", None)):
-            events = []
-            for value in values:
-                events.append(value.toDictionary())
-            payload = json.dumps(events)
+            toDictionary = self.__encoder(type(values[0]))
+            payload = QiJson.dumpBytes([toDictionary(value) for value in values])
         else:
             payload = values
 
-        response = requests.put(self.__url + self.__updateValuesPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id), 
-                                data=payload, 
-                                headers=self.__qiHeaders())
+        response = self.__request("PUT", self.__uri(self.__updateValuesPath, namespace_id=namespace_id, stream_id=stream_id), 
+                                data=payload)
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
-            raise QiError("Failed to update all values for QiStream, {stream_id}. {status}:{reason}".format(stream_id=stream_id, status=response.status_code, reason=response.text))
+            raise QiError("Failed to update all values for QiStream, {stream_id}. {status}:{reason}".format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
         response.close()
 
+    @_measured
+    @_invalidatesWindows
     def replaceValue(self, namespace_id, stream_id, value):
         """Tells Qi Service to replace the value specified by 'value'"""
         if namespace_id is None:
@@ -744,17 +1126,18 @@ class QiClient(object):
         else:
             payload = value
 
-        response = requests.put(
-            self.__url + self.__replaceValuePath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id), 
-            data=payload, 
-            headers=self.__qiHeaders())
+        response = self.__request("PUT",
+            self.__uri(self.__replaceValuePath, namespace_id=namespace_id, stream_id=stream_id), 
+            data=payload)
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to replace value for QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
         response.close()
 
+    @_measured
+    @_invalidatesWindows
     def replaceValues(self, namespace_id, stream_id, values):
         """Tells Qi Service to replace the values defined by the list 'values'"""
         if namespace_id is None:
@@ -765,24 +1148,47 @@ class QiClient(object):
             raise TypeError
 
         if callable(getattr(values[0], "toJson", None)):
-            events = []
-            for value in values:
-                events.append(value.toDictionary())
-            payload = json.dumps(events)
+            toDictionary = self.__encoder(type(values[0]))
+            payload = QiJson.dumpBytes([toDictionary(value) for value in values])
         else:
             payload = values
 
-        response = requests.put(
-            self.__url + self.__replaceValuesPath.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id), 
-            data=payload, 
-            headers=self.__qiHeaders())
+        response = self.__request("PUT",
+            self.__uri(self.__replaceValuesPath, namespace_id=namespace_id, stream_id=stream_id), 
+            data=payload)
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to replace value for QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
         response.close()
 
+    # Bulk variants split 'values' into chunks of at most 'maxCount' events and about 'maxBytes' of JSON,
+    #    send them over 'workers' threads and return a QiChunkResult per chunk, in order
+
+    @_measured
+    @_invalidatesWindows
+    def insertValuesBulk(self, namespace_id, stream_id, values, maxCount=5000, maxBytes=4*1024*1024, workers=4):
+        """Inserts 'values' into the stream specified by 'stream_id' in chunks, returning a QiChunkResult per chunk"""
+        return self.__sendChunks("POST", self.__insertValuesPath, "Failed to insert multiple values for QiStream",
+                                 namespace_id, stream_id, values, maxCount, maxBytes, workers)
+
+    @_measured
+    @_invalidatesWindows
+    def updateValuesBulk(self, namespace_id, stream_id, values, maxCount=5000, maxBytes=4*1024*1024, workers=4):
+        """Updates 'values' in the stream specified by 'stream_id' in chunks, returning a QiChunkResult per chunk"""
+        return self.__sendChunks("PUT", self.__updateValuesPath, "Failed to update all values for QiStream",
+                                 namespace_id, stream_id, values, maxCount, maxBytes, workers)
+
+    @_measured
+    @_invalidatesWindows
+    def replaceValuesBulk(self, namespace_id, stream_id, values, maxCount=5000, maxBytes=4*1024*1024, workers=4):
+        """Replaces 'values' in the stream specified by 'stream_id' in chunks, returning a QiChunkResult per chunk"""
+        return self.__sendChunks("PUT", self.__replaceValuesPath, "Failed to replace value for QiStream",
+                                 namespace_id, stream_id, values, maxCount, maxBytes, workers)
+
+    @_measured
+    @_invalidatesWindows
     def removeValue(self, namespace_id, stream_id, key):
         """Tells Qi Service to delete the value with a key property matching 'key'"""
         if namespace_id is None:
@@ -792,16 +1198,17 @@ class QiClient(object):
         if key is None:
             raise TypeError
 
-        response = requests.delete(
-            self.__url + self.__removeValue.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id, index=key), 
-            headers=self.__qiHeaders())
+        response = self.__request("DELETE",
+            self.__uri(self.__removeValue, namespace_id=namespace_id, stream_id=stream_id, index=key))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
             raise QiError("Failed to remove value for QiStream, {stream_id}. {status}:{reason}".
-                          format(stream_id=stream_id, status=response.status_code, reason=response.text))
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
         response.close()
 
+    @_measured
+    @_invalidatesWindows
     def removeWindowValues(self, namespace_id, stream_id, start, end):
         """Tells Qi Service to delete a window of values in the stream specified by 'stream_id'"""
         if namespace_id is None:
@@ -813,36 +1220,399 @@ class QiClient(object):
         if end is None:
             raise TypeError
 
-        response = requests.delete(
-            self.__url + self.__removeWindowValues.format(tenant_id=self.__tenant, namespace_id=namespace_id, stream_id=stream_id, start=start, end=end), 
-            headers=self.__qiHeaders())
+        response = self.__request("DELETE",
+            self.__uri(self.__removeWindowValues, namespace_id=namespace_id, stream_id=stream_id, start=start, end=end))
         if response.status_code < 200 or response.status_code >= 300:
             response.close()
-            raise QiError("Failed to remove all values for QiStream, {stream_id}. {status}:{reason}".format(stream_id=stream_id, status=response.status_code, reason=response.text))
+            raise QiError("Failed to remove all values for QiStream, {stream_id}. {status}:{reason}".format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
         response.close()
 
     # private methods
 
-    def __getToken(self):
-        if ((self.__expiration - time.time()) > 5 * 60):
-            return self.__token
+    def __request(self, method, url, data=None, stream=False, idempotent=None):
+        """Sends a request to the Qi Service, retrying throttled and transient failures per the retry policy.
+        POSTs are only treated as idempotent when the caller says so"""
+        if idempotent is None:
+            idempotent = method != "POST"
+
+        encoding = None
+        saved = 0
+        if self.__compressionThreshold is not None and isinstance(data, (str, bytes)) and \
+                len(data) >= self.__compressionThreshold:
+            # compressed once, retries send the same body
+            size = len(data)
+            data = gzip.compress(data.encode("utf-8") if isinstance(data, str) else data, self.__compressionLevel)
+            encoding = "gzip"
+            saved = size - len(data)
+
+        attempt = 0
+        while True:
+            try:
+                response = self.__send(method, url, data, stream, encoding, saved)
+            except requests.exceptions.RequestException as e:
+                if not self.__retryPolicy.shouldRetry(attempt, idempotent, error=e):
+                    raise
+                time.sleep(self.__retryPolicy.delay(attempt))
+            else:
+                if not self.__retryPolicy.shouldRetry(attempt, idempotent, statusCode=response.status_code):
+                    return response
+                delay = self.__retryPolicy.delay(attempt, response.headers.get("Retry-After"))
+                response.close()
+                time.sleep(delay)
+            attempt += 1
+
+    def __send(self, method, url, data, stream, encoding=None, saved=0):
+        sample = currentSample() if self.__metrics is not None else None
+        if sample is None:
+            headers = self.__qiHeaders()
+            if encoding is not None:
+                headers = dict(headers, **{"Content-Encoding": encoding})
+            return self.__session.request(method, url, data=data, headers=headers, stream=stream)
+
+        started = time.perf_counter()
+        headers = self.__qiHeaders()
+        if encoding is not None:
+            headers = dict(headers, **{"Content-Encoding": encoding})
+        sent = time.perf_counter()
+        sample.addPhase("token", sent - started)
+        response = None
+        try:
+            response = self.__session.request(method, url, data=data, headers=headers, stream=stream)
+            return response
+        finally:
+            ended = time.perf_counter()
+            sample.addPhase("network", ended - sent)
+            # payloads are mostly QiJson.dumpBytes output; text bodies are counted by characters
+            size = len(data) if isinstance(data, (str, bytes)) else 0
+            if response is None:
+                sample.addRequest(started, ended, None, size, 0, saved)
+            elif stream:
+                # the body is counted by __iterValues as it is read, it may be chunked or only partly read
+                sample.addRequest(started, ended, response.status_code, size, 0, saved)
+            else:
+                length = response.headers.get("Content-Length")
+                if length is None:
+                    # chunked responses have no length, but the body was already read
+                    received = len(response.content)
+                else:
+                    received = int(length)
+                    if received > 0 and response.headers.get("Content-Encoding") == "gzip":
+                        # the body was already read and decompressed, so its size is known
+                        saved += len(response.content) - received
+                sample.addRequest(started, ended, response.status_code, size, received, saved)
+
+    def __uri(self, template, **parameters):
+        if self.__metrics is None:
+            return self.__url + template.format(tenant_id=self.__tenant, **parameters)
+        started = time.perf_counter()
+        url = self.__url + template.format(tenant_id=self.__tenant, **parameters)
+        sample = currentSample()
+        if sample is not None:
+            sample.addPhase("url", time.perf_counter() - started)
+        return url
+
+    def __cacheGet(self, kind, namespace_id, id):
+        if self.__metadataCache is None:
+            return None
+        return self.__metadataCache.get(kind, namespace_id, id)
+
+    def __cachePut(self, kind, namespace_id, id, value):
+        if self.__metadataCache is not None:
+            self.__metadataCache.put(kind, namespace_id, id, value)
+
+    def __cacheInvalidate(self, kind, namespace_id, id=None):
+        if self.__metadataCache is not None:
+            self.__metadataCache.invalidate(kind, namespace_id, id)
+
+    def __windowCacheInvalidate(self, namespace_id, stream_id):
+        if self.__windowCache is not None:
+            self.__windowCache.invalidate(namespace_id, stream_id)
+
+    def __getWindow(self, namespace_id, stream_id, start, end, view_id):
+        # returns the event dictionaries of the window and the size of the response
+        response = self.__request("GET",
+            self.__uri(self.__getWindowValues, namespace_id=namespace_id,
+                       stream_id=stream_id, start=start, end=end, view_id=view_id))
+        if response.status_code < 200 or response.status_code >= 300:
+            response.close()
+            raise QiError("Failed to get window values for QiStream {stream_id}. {status}:{reason}".
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
+
+        content = QiJson.loads(response.content)
+        response.close()
+        return content, len(response.content)
+
+    def __getRange(self, namespace_id, stream_id, start, skip, count, reverse, boundary_type, view_id):
+        response = self.__request("GET",
+            self.__uri(self.__getRangeValuesQuery, namespace_id=namespace_id,
+                       stream_id=stream_id, start=start, skip=skip, count=count,
+                       reverse=reverse, boundary_type=boundary_type.value,
+                       view_id=view_id))
+        if response.status_code < 200 or response.status_code >= 300:
+            response.close()
+            raise QiError("Failed to get range of values from QiStream, {stream_id}. {status}:{reason}".
+                          format(stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
 
-        context = adal.AuthenticationContext(self.__authority, validate_authority=True)
-        token = context.acquire_token_with_client_credentials(self.__resource, self.__clientId, self.__clientSecret)
+        content = QiJson.loads(response.content)
+        response.close()
+        return content, len(response.content)
+
+    def __windowKeyId(self, namespace_id, stream_id, view_id):
+        # the cache orders events by the single key property of the stream's type (or the view's target)
+        keyId = self.__windowCache.keyId(namespace_id, stream_id, view_id)
+        if keyId is None:
+            keys = [prop.Id for prop in self.__resolveValueType(namespace_id, stream_id, view_id).Properties if prop.IsKey]
+            keyId = keys[0] if len(keys) == 1 else None
+        return keyId
+
+    def __cachedWindow(self, namespace_id, stream_id, start, end, view_id):
+        # returns None when the window cannot be cached, so it is read as usual
+        cache = self.__windowCache
+        if indexKey(start) is None or indexKey(end) is None:
+            return None
+        content = cache.getWindow(namespace_id, stream_id, view_id, start, end)
+        if content is not None:
+            return content
+
+        generation = cache.generation(namespace_id, stream_id)
+        keyId = self.__windowKeyId(namespace_id, stream_id, view_id)
+        if keyId is None:
+            return None
+        held = cache.held(namespace_id, stream_id, view_id, start, end)
+        parts = []
+        stored = True
+        for missingStart, missingEnd in cache.missing(namespace_id, stream_id, view_id, start, end):
+            part, size = self.__getWindow(namespace_id, stream_id, missingStart, missingEnd, view_id)
+            parts.append(part)
+            stored = stored and cache.putWindow(namespace_id, stream_id, view_id, generation, keyId,
+                                                missingStart, missingEnd, part, size)
+        if stored:
+            content = cache.getWindow(namespace_id, stream_id, view_id, start, end, record=False)
+            if content is not None:
+                return content
+        # the cache refused or has since dropped what was read, so the window is put together from it
+        if len(held) == 0 and len(parts) == 1:
+            return parts[0]
+        return self.__joinWindow(keyId, start, end, held, parts)
+
+    @staticmethod
+    def __joinWindow(keyId, start, end, held, parts):
+        # the parts include the ends of the held events they join, so each index is kept once;
+        # None when an event has no key to place it by, so the window is read whole
+        low, high = indexKey(start), indexKey(end)
+        contents = {}
+        for content in itertools.chain(held, *parts):
+            key = indexKey(content.get(keyId))
+            if key is None:
+                return None
+            if low <= key <= high:
+                contents[key] = content
+        return [contents[key] for key in sorted(contents)]
+
+    def __cachedRange(self, namespace_id, stream_id, start, skip, count, reverse, boundary_type, view_id):
+        cache = self.__windowCache
+        if indexKey(start) is not None:
+            content = cache.getRange(namespace_id, stream_id, view_id, start, skip, count, reverse)
+            if content is not None:
+                return content
+
+        generation = cache.generation(namespace_id, stream_id)
+        content, size = self.__getRange(namespace_id, stream_id, start, skip, count, reverse, boundary_type, view_id)
+        if indexKey(start) is not None:
+            keyId = self.__windowKeyId(namespace_id, stream_id, view_id)
+            if keyId is not None:
+                cache.putRange(namespace_id, stream_id, view_id, generation, keyId, start, skip, reverse, content, size)
+        return content
+
+    def __eventsAround(self, namespace_id, stream_id, start, end, view_id):
+        # the events from 'start' to 'end' and the nearest ones outside, which the values between them depend on;
+        # exact ranges from either end return the event at it or the next one out
+        if self.__windowCache is None:
+            window, size = self.__getWindow(namespace_id, stream_id, start, end, view_id)
+            before, size = self.__getRange(namespace_id, stream_id, start, 0, 1, True, QiBoundaryType.Exact, view_id)
+            after, size = self.__getRange(namespace_id, stream_id, end, 0, 1, False, QiBoundaryType.Exact, view_id)
+            return before + window + after
+
+        window = self.__cachedWindow(namespace_id, stream_id, start, end, view_id)
+        if window is None:
+            window, size = self.__getWindow(namespace_id, stream_id, start, end, view_id)
+        before = self.__cachedRange(namespace_id, stream_id, start, 0, 1, True, QiBoundaryType.Exact, view_id)
+        after = self.__cachedRange(namespace_id, stream_id, end, 0, 1, False, QiBoundaryType.Exact, view_id)
+        return before + window + after
+
+    def __streamBehavior(self, namespace_id, stream_id):
+        stream = self.getStream(namespace_id, stream_id)
+        if getattr(stream, "BehaviorId", None):
+            return self.getBehavior(namespace_id, stream.BehaviorId)
+        return QiStreamBehavior()
+
+    def __resolveValueType(self, namespace_id, stream_id, view_id):
+        if view_id:
+            return self.getType(namespace_id, self.getView(namespace_id, view_id).TargetTypeId)
+        return self.getStreamType(namespace_id, stream_id)
+
+    @staticmethod
+    def __encoder(value_class):
+        # the class's own toDictionary, which may format values its own way, unless QiCodec converts the class
+        if QiCodec.converts(value_class, "toDictionary"):
+            return QiCodec.forClass(value_class).toDictionary
+        return value_class.toDictionary
+
+    @staticmethod
+    def __decoder(value_class, method):
+        # the class's own fromDictionary or fromJson, as 'method' names, unless QiCodec converts the class
+        if QiCodec.converts(value_class, method):
+            return QiCodec.forClass(value_class).fromDictionary
+        return getattr(value_class, method)
+
+    def __iterValues(self, url, message, stream_id, convert, chunkSize):
+        response = self.__request("GET", url, stream=True)
+        sample = currentSample() if self.__metrics is not None else None
+        try:
+            if response.status_code < 200 or response.status_code >= 300:
+                raise QiError("{message} {stream_id}. {status}:{reason}".
+                              format(message=message, stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
+
+            chunks = response.iter_content(chunk_size=chunkSize)
+            if sample is not None:
+                chunks = _counted(chunks, sample)
+            for content in iterJsonArray(chunks):
+                yield convert(content)
+        finally:
+            response.close()
+
+    def __iterRangePages(self, namespace_id, stream_id, value_class, start, skip, count, reverse, boundary_type,
+                         view_id, pageSize, chunkSize):
+        fetched = 0
+        while count is None or fetched < count:
+            pageCount = pageSize if count is None else min(pageSize, count - fetched)
+            url = self.__uri(self.__getRangeValuesQuery, namespace_id=namespace_id,
+                             stream_id=stream_id, start=start, skip=skip + fetched,
+                             count=pageCount, reverse=reverse,
+                             boundary_type=boundary_type.value, view_id=view_id)
+            received = 0
+            for value in self.__iterValues(url, "Failed to get range of values from QiStream,", stream_id,
+                                           self.__decoder(value_class, "fromJson"), chunkSize):
+                received += 1
+                yield value
+
+            fetched += received
+            if received < pageCount:
+                break
+
+    def __follow(self, namespace_id, stream_id, value_class, view_id, pageSize, follower, idleTimeout):
+        # seconds slept since the last new value
+        idle = 0
+        try:
+            while True:
+                page = self.getRangeValues(namespace_id, stream_id, value_class, follower.Start, 0, pageSize, False,
+                                           QiBoundaryType.Outside, view_id)
+                values = follower.newValues(page)
+                for value in values:
+                    follower.yielded(value)
+                    yield value
+                follower.save()
+
+                if len(values) > 0:
+                    idle = 0
+                elif idleTimeout is not None and idle >= idleTimeout:
+                    return
+                wait = follower.wait(len(values), len(page) >= pageSize)
+                if idleTimeout is not None:
+                    wait = min(wait, idleTimeout - idle)
+                idle += wait
+                if wait > 0:
+                    time.sleep(wait)
+        finally:
+            follower.save()
+
+    def __sendChunks(self, method, path, message, namespace_id, stream_id, values, maxCount, maxBytes, workers):
+        if namespace_id is None:
+            raise TypeError
+        if stream_id is None:
+            raise TypeError
+        if values is None:
+            raise TypeError
+        if maxCount < 1 or maxBytes < 1 or workers < 1:
+            raise ValueError("maxCount, maxBytes and workers must be at least 1")
 
-        if token is None:
-            raise Exception("Failed to retrieve AAD Token")
+        url = self.__uri(path, namespace_id=namespace_id, stream_id=stream_id)
+        sample = currentSample() if self.__metrics is not None else None
+        results = []
+        # only a couple of chunks per worker are serialized ahead, so memory stays bounded by the chunk size
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = collections.deque()
+            for chunk, payload in self.__chunkValues(values, maxCount, maxBytes):
+                pending.append(executor.submit(self.__sendChunk, method, url, message, stream_id, chunk, payload, sample))
+                if len(pending) >= 2 * workers:
+                    results.append(pending.popleft().result())
+            while pending:
+                results.append(pending.popleft().result())
+        return results
 
-        self.__expiration = float(token['expiresIn']) + time.time()
-        self.__token = token['accessToken']
-        return self.__token
+    def __chunkValues(self, values, maxCount, maxBytes):
+        index = 0
+        offset = 0
+        chunk = []
+        parts = []
+        size = 2
+        valueClass = None
+        for value in values:
+            if callable(getattr(value, "toDictionary", None)):
+                if type(value) is not valueClass:
+                    valueClass = type(value)
+                    toDictionary = self.__encoder(valueClass)
+                part = QiJson.dumpBytes(toDictionary(value))
+            else:
+                part = QiJson.dumpBytes(value)
+
+            if len(chunk) > 0 and (len(chunk) >= maxCount or size + len(part) + 1 > maxBytes):
+                yield QiChunkResult(index, offset, chunk), b"[" + b",".join(parts) + b"]"
+                index += 1
+                offset += len(chunk)
+                chunk = []
+                parts = []
+                size = 2
+
+            chunk.append(value)
+            parts.append(part)
+            size += len(part) + 1
+
+        if len(chunk) > 0:
+            yield QiChunkResult(index, offset, chunk), b"[" + b",".join(parts) + b"]"
+
+    def __sendChunk(self, method, url, message, stream_id, chunk, payload, sample):
+        try:
+            # the chunks are sent from worker threads, so their requests are attributed to the bulk call here
+            with attachSample(sample):
+                response = self.__request(method, url, data=payload)
+        except requests.exceptions.RequestException as e:
+            chunk.Error = QiError("{message}, {stream_id}. {error}".format(message=message, stream_id=stream_id, error=e))
+            return chunk
+
+        chunk.StatusCode = response.status_code
+        if response.status_code < 200 or response.status_code >= 300:
+            chunk.Error = QiError("{message}, {stream_id}. {status}:{reason}".
+                                  format(message=message, stream_id=stream_id, status=response.status_code, reason=response.text), response.status_code)
+        response.close()
+        return chunk
 
     def __qiHeaders(self):
-        return {"Authorization": "bearer %s" % self.__getToken(),
-                "Content-type": "application/json",
-                "Accept": "*/*; q=1"
-                }
+        # the full header set is rebuilt only when the token provider hands out a new token
+        authorization = self.__tokenProvider.getHeaders()
+        cached = self.__headers
+        if cached[0] is authorization:
+            return cached[1]
+
+        headers = {"Content-type": "application/json",
+                   "Accept": "*/*; q=1",
+                   "Accept-Encoding": "gzip",
+                   "Connection": "keep-alive" if self.__keepAlive else "close"
+                   }
+        headers.update(authorization)
+        self.__headers = (authorization, headers)
+        return headers
 
     def __validateUri(self, url):
         splitUri = urlparse(url)
@@ -0,0 +1,93 @@
+import inspect
+import operator
+import threading
+
+# marks a property missing from the content, which fromDictionary leaves at the class default
+_unset = object()
+
+class QiCodec(object):
+    """Converts instances of a value class to and from dictionaries using a field list that is
+    looked up once per class instead of once per event. The fields are the properties that can be
+    set, so read-only computed properties are neither written nor read"""
+
+    __codecs = {}
+    __lock = threading.Lock()
+
+    def __init__(self, valueClass):
+        self.__valueClass = valueClass
+
+        fields = [(name, prop) for name, prop in inspect.getmembers(valueClass, lambda v: isinstance(v, property))
+                  if prop.fget is not None and prop.fset is not None]
+        if len(fields) > 0:
+            self.__getters = tuple((name, prop.fget) for name, prop in fields)
+            self.__setters = tuple((name, prop.fset) for name, prop in fields)
+        else:
+            # classes without properties, such as those from createEventClass, expose their fields as slots
+            slots = [name for name in getattr(valueClass, "__slots__", ()) if not name.startswith("__")]
+            self.__getters = tuple((name, operator.attrgetter(name)) for name in slots)
+            self.__setters = tuple((name, getattr(valueClass, name).__set__) for name in slots)
+        self.__names = tuple(name for name, _ in self.__getters)
+
+    @staticmethod
+    def forClass(valueClass):
+        """Returns the codec of 'valueClass', compiling it on first use"""
+        codec = QiCodec.__codecs.get(valueClass)
+        if codec is None:
+            with QiCodec.__lock:
+                codec = QiCodec.__codecs.get(valueClass)
+                if codec is None:
+                    codec = QiCodec(valueClass)
+                    QiCodec.__codecs[valueClass] = codec
+        return codec
+
+    @staticmethod
+    def converts(valueClass, method):
+        """Returns whether QiClient converts values of 'valueClass' with the codec rather than the class's
+        own 'method' ("toDictionary", "fromDictionary" or "fromJson"): a class that defines the method
+        keeps it, since it may format values its own way, unless it sets UseQiCodec to True"""
+        return getattr(valueClass, "UseQiCodec", False) is True or not callable(getattr(valueClass, method, None))
+
+    @property
+    def ValueClass(self):
+        return self.__valueClass
+
+    @property
+    def Names(self):
+        return self.__names
+
+    def toDictionary(self, value):
+        """Returns the properties of 'value' that are set, keyed by property name"""
+        dictionary = {}
+        for name, fget in self.__getters:
+            try:
+                dictionary[name] = fget(value)
+            except AttributeError:
+                # the property was never assigned
+                pass
+        return dictionary
+
+    def fromDictionary(self, content, default=_unset):
+        """Returns a new instance with each property set from 'content'; properties missing or null in it
+        keep the class default, or are set to 'default' when one is given"""
+        value = self.__valueClass()
+        for name, fset in self.__setters:
+            item = content.get(name)
+            if item is not None:
+                fset(value, item)
+            elif default is not _unset:
+                fset(value, default)
+        return value
+
+    def toDictionaries(self, values):
+        if len(self.__getters) == 0:
+            # classes the codec finds no fields on convert themselves
+            return [value.toDictionary() for value in values]
+        toDictionary = self.toDictionary
+        return [toDictionary(value) for value in values]
+
+    def fromDictionaries(self, contents, default=_unset):
+        if len(self.__setters) == 0:
+            valueClass = self.__valueClass
+            return [valueClass.fromDictionary(content) for content in contents]
+        fromDictionary = self.fromDictionary
+        return [fromDictionary(content, default) for content in contents]
@@ -0,0 +1,97 @@
+from QiTypeCode import QiTypeCode
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Qi type codes and the numpy dtype their values are decoded into; every other type code is kept as objects
+_dtypes = {
+    QiTypeCode.Boolean: "bool",
+    QiTypeCode.SByte: "int8",
+    QiTypeCode.Byte: "uint8",
+    QiTypeCode.Int16: "int16",
+    QiTypeCode.UInt16: "uint16",
+    QiTypeCode.Int32: "int32",
+    QiTypeCode.UInt32: "uint32",
+    QiTypeCode.Int64: "int64",
+    QiTypeCode.UInt64: "uint64",
+    QiTypeCode.Single: "float32",
+    QiTypeCode.Double: "float64",
+    QiTypeCode.Decimal: "float64",
+    QiTypeCode.DateTime: "datetime64[ns]",
+    QiTypeCode.SByteEnum: "int8",
+    QiTypeCode.ByteEnum: "uint8",
+    QiTypeCode.Int16Enum: "int16",
+    QiTypeCode.UInt16Enum: "uint16",
+    QiTypeCode.Int32Enum: "int32",
+    QiTypeCode.UInt32Enum: "uint32",
+    QiTypeCode.Int64Enum: "int64",
+    QiTypeCode.UInt64Enum: "uint64",
+    # nullable numbers become floats so a missing value can be NaN
+    QiTypeCode.NullableSByte: "float64",
+    QiTypeCode.NullableByte: "float64",
+    QiTypeCode.NullableInt16: "float64",
+    QiTypeCode.NullableUInt16: "float64",
+    QiTypeCode.NullableInt32: "float64",
+    QiTypeCode.NullableUInt32: "float64",
+    QiTypeCode.NullableInt64: "float64",
+    QiTypeCode.NullableUInt64: "float64",
+    QiTypeCode.NullableSingle: "float64",
+    QiTypeCode.NullableDouble: "float64",
+    QiTypeCode.NullableDecimal: "float64",
+    QiTypeCode.NullableDateTime: "datetime64[ns]",
+}
+
+_nullable = set([QiTypeCode.NullableSByte, QiTypeCode.NullableByte, QiTypeCode.NullableInt16, QiTypeCode.NullableUInt16,
+                 QiTypeCode.NullableInt32, QiTypeCode.NullableUInt32, QiTypeCode.NullableInt64, QiTypeCode.NullableUInt64,
+                 QiTypeCode.NullableSingle, QiTypeCode.NullableDouble, QiTypeCode.NullableDecimal,
+                 QiTypeCode.NullableDateTime])
+
+def _requireNumpy():
+    if numpy is None:
+        raise ImportError("numpy is required for columnar reads, install it with 'pip install numpy'")
+
+def dtypeFor(typeCode):
+    """Returns the numpy dtype used for values of the QiTypeCode 'typeCode'"""
+    _requireNumpy()
+    return numpy.dtype(_dtypes.get(typeCode, "object"))
+
+def columnsOf(qiType):
+    """Returns (property id, QiTypeCode) pairs for the properties of 'qiType', in declaration order"""
+    if not hasattr(qiType, "Properties"):
+        raise ValueError("QiType {type_id} has no properties".format(type_id=getattr(qiType, "Id", None)))
+
+    columns = []
+    for prop in qiType.Properties:
+        typeCode = QiTypeCode.Object
+        if hasattr(prop, "QiType"):
+            typeCode = prop.QiType.QiTypeCode
+        columns.append((prop.Id, typeCode))
+    return columns
+
+def toColumns(contents, qiType):
+    """Decodes 'contents', a list of event dictionaries, into a dictionary of numpy arrays keyed by
+    the property ids of 'qiType'"""
+    _requireNumpy()
+    count = len(contents)
+    columns = {}
+    for propertyId, typeCode in columnsOf(qiType):
+        dtype = dtypeFor(typeCode)
+        if dtype.kind == "M":
+            # numpy parses ISO 8601 text, but not the UTC designator Qi appends
+            missing = "NaT"
+            values = [c.get(propertyId) for c in contents]
+            values = [missing if v is None else (v[:-1] if v.endswith("Z") else v) for v in values]
+            columns[propertyId] = numpy.array(values, dtype=dtype)
+        elif dtype.kind == "O":
+            column = numpy.empty(count, dtype=dtype)
+            column[:] = [c.get(propertyId) for c in contents]
+            columns[propertyId] = column
+        else:
+            # Qi leaves default values out of the JSON, so a missing value is zero unless the type is nullable
+            missing = numpy.nan if typeCode in _nullable else 0
+            columns[propertyId] = numpy.fromiter((missing if v is None else v
+                                                  for v in (c.get(propertyId) for c in contents)),
+                                                 dtype=dtype, count=count)
+    return columns
@@ -1,5 +1,7 @@
 class QiError(Exception):
-    def __init__(self, value):
+    def __init__(self, value, statusCode=None):
         self.value = value
+        # the HTTP status the Qi Service answered with, when the error is a failed request
+        self.StatusCode = statusCode
     def __str__(self):
         return repr(self.value)
\ No newline at end of file
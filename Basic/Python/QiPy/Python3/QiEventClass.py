@@ -0,0 +1,107 @@
+import QiJson
+import keyword
+from QiTypeCode import QiTypeCode
+
+# type codes whose missing values are filled with a zero of the right kind, as WaveData does
+_zeros = {
+    QiTypeCode.Boolean: False,
+    QiTypeCode.SByte: 0, QiTypeCode.Byte: 0, QiTypeCode.Int16: 0, QiTypeCode.UInt16: 0,
+    QiTypeCode.Int32: 0, QiTypeCode.UInt32: 0, QiTypeCode.Int64: 0, QiTypeCode.UInt64: 0,
+    QiTypeCode.Single: 0.0, QiTypeCode.Double: 0.0, QiTypeCode.Decimal: 0.0,
+    QiTypeCode.SByteEnum: 0, QiTypeCode.ByteEnum: 0, QiTypeCode.Int16Enum: 0, QiTypeCode.UInt16Enum: 0,
+    QiTypeCode.Int32Enum: 0, QiTypeCode.UInt32Enum: 0, QiTypeCode.Int64Enum: 0, QiTypeCode.UInt64Enum: 0,
+}
+
+_reserved = set(["QiType", "PropertyIds", "KeyIds", "toDictionary", "toJson", "fromDictionary", "fromJson",
+                 "toDictionaries", "fromDictionaries"])
+
+def defaultFor(typeCode):
+    """Returns the value given to a property of 'typeCode' that is missing from the JSON, None for
+    nullable, text and object properties"""
+    return _zeros.get(typeCode)
+
+def createEventClass(qiType, className=None):
+    """Returns a compact event class for 'qiType': one __slots__ attribute per QiTypeProperty, plus
+    toDictionary/fromDictionary (and their batch forms) compiled for exactly those properties"""
+    if qiType is None or not hasattr(qiType, "Properties") or len(qiType.Properties) == 0:
+        raise ValueError("an event class needs a QiType with properties")
+    if className is None:
+        className = qiType.Id if hasattr(qiType, "Id") else qiType.Name
+
+    names = []
+    defaults = []
+    keys = []
+    for prop in qiType.Properties:
+        name = prop.Id
+        # the property ids become attribute names in generated code, so only identifiers are allowed
+        if not isinstance(name, str) or not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_"):
+            raise ValueError("QiTypeProperty id {name!r} cannot be used as an attribute name".format(name=name))
+        if name in _reserved:
+            raise ValueError("QiTypeProperty id {name!r} clashes with a member of the event class".format(name=name))
+        names.append(name)
+        defaults.append(defaultFor(prop.QiType.QiTypeCode) if hasattr(prop, "QiType") else None)
+        if prop.IsKey:
+            keys.append(name)
+
+    namespace = {}
+    for i, default in enumerate(defaults):
+        namespace["_d%d" % i] = default
+
+    source = "def __init__(self, {args}):\n".format(
+        args=", ".join("{name}=_d{i}".format(name=name, i=i) for i, name in enumerate(names)))
+    source += "".join("    self.{name} = {name}\n".format(name=name) for name in names)
+
+    source += "def toDictionary(self):\n"
+    source += "    return {{{items}}}\n".format(items=", ".join("'{name}': self.{name}".format(name=name) for name in names))
+
+    source += "def fromDictionary(cls, content):\n"
+    source += "    event = cls.__new__(cls)\n"
+    source += "    get = content.get\n"
+    for i, name in enumerate(names):
+        source += "    value = get('{name}')\n".format(name=name)
+        source += "    event.{name} = _d{i} if value is None else value\n".format(name=name, i=i)
+    source += "    return event\n"
+
+    exec(source, namespace)
+
+    def toJson(self):
+        return QiJson.dumps(self.toDictionary())
+
+    def fromJson(cls, jsonObj):
+        return cls.fromDictionary(jsonObj)
+
+    def toDictionaries(cls, events):
+        return [event.toDictionary() for event in events]
+
+    def fromDictionaries(cls, contents):
+        fromDictionary = cls.fromDictionary
+        return [fromDictionary(content) for content in contents]
+
+    def __repr__(self):
+        return "{cls}({values})".format(cls=type(self).__name__,
+                                        values=", ".join("{name}={value!r}".format(name=name, value=getattr(self, name))
+                                                         for name in names))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.toDictionary() == other.toDictionary()
+
+    members = {
+        "__slots__": tuple(names),
+        "__doc__": "Event of the QiType {type_id}, generated by createEventClass".format(type_id=className),
+        "__init__": namespace["__init__"],
+        "__repr__": __repr__,
+        "__eq__": __eq__,
+        "__hash__": None,
+        "QiType": qiType,
+        "PropertyIds": tuple(names),
+        "KeyIds": tuple(keys),
+        "toDictionary": namespace["toDictionary"],
+        "toJson": toJson,
+        "fromDictionary": classmethod(namespace["fromDictionary"]),
+        "fromJson": classmethod(fromJson),
+        "toDictionaries": classmethod(toDictionaries),
+        "fromDictionaries": classmethod(fromDictionaries),
+    }
+    return type(str(className), (object,), members)
@@ -0,0 +1,88 @@
+import json
+import os
+
+from QiError import QiError
+from QiWindowCache import indexKey
+
+
+def keyProperty(type):
+    """Returns the id of the key property of the QiType 'type'"""
+    keys = [prop.Id for prop in type.Properties if prop.IsKey]
+    if len(keys) != 1:
+        raise QiError("QiType {type_id} needs a single key property to be followed".format(type_id=type.Id))
+    return keys[0]
+
+
+class QiFollower(object):
+    """The position of a reader following a stream, shared by QiClient.follow and AsyncQiClient.follow.
+    Each poll reads a range from the last index seen with the Outside boundary, so the page starts at
+    that event (or the one before it, if it was removed) and only the events after it are new. The
+    wait between polls starts at 'minInterval' and grows by 'backoff' up to 'maxInterval' while no new
+    events arrive. With 'positionFile', the last index seen is saved there after every page and when
+    following stops, and a saved position is resumed from instead of 'fromIndex'; an event counts as
+    read once it has been yielded."""
+
+    def __init__(self, keyId, fromIndex, positionFile=None, minInterval=0.5, maxInterval=30.0, backoff=2.0):
+        if minInterval <= 0 or maxInterval < minInterval:
+            raise ValueError("intervals must be positive and maxInterval at least minInterval")
+        self.__keyId = keyId
+        self.__positionFile = positionFile
+        self.__minInterval = minInterval
+        self.__maxInterval = maxInterval
+        self.__backoff = backoff
+        self.__interval = minInterval
+        self.__last = None
+        self.__saved = None
+
+        if positionFile is not None and os.path.exists(positionFile):
+            with open(positionFile) as file:
+                self.__last = json.load(file)["index"]
+            self.__saved = self.__last
+        if self.__last is None and fromIndex is None:
+            raise TypeError
+        self.__from = fromIndex
+        if indexKey(self.__last if self.__last is not None else fromIndex) is None:
+            raise ValueError("Only numeric and DateTime indexes can be followed")
+
+    @property
+    def LastIndex(self):
+        """The index of the last event yielded, or None"""
+        return self.__last
+
+    @property
+    def Start(self):
+        """The index the next poll starts from"""
+        return self.__last if self.__last is not None else self.__from
+
+    def newValues(self, values):
+        """Returns the values of a page that were not yielded yet"""
+        if self.__last is not None:
+            last = indexKey(self.__last)
+            return [value for value in values if indexKey(getattr(value, self.__keyId)) > last]
+        start = indexKey(self.__from)
+        return [value for value in values if indexKey(getattr(value, self.__keyId)) >= start]
+
+    def yielded(self, value):
+        self.__last = getattr(value, self.__keyId)
+
+    def wait(self, received, full):
+        """Returns the seconds to wait before the next poll, after one that returned 'received' new events
+        in a page that was 'full'"""
+        if full:
+            # more may be waiting already
+            self.__interval = self.__minInterval
+            return 0
+        if received > 0:
+            self.__interval = self.__minInterval
+        else:
+            self.__interval = min(self.__maxInterval, self.__interval * self.__backoff)
+        return self.__interval
+
+    def save(self):
+        if self.__positionFile is None or self.__last is None or self.__last == self.__saved:
+            return
+        temporary = self.__positionFile + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump({"index": self.__last}, file)
+        os.replace(temporary, self.__positionFile)
+        self.__saved = self.__last
@@ -0,0 +1,205 @@
+import datetime
+
+from QiColumns import columnsOf
+from QiError import QiError
+from QiStreamBehavior import QiStreamBehavior
+from QiStreamExtrapolation import QiStreamExtrapolation
+from QiStreamMode import QiStreamMode
+from QiTypeCode import QiTypeCode
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# enumerations are stored as integers but take the value of an event, like strings, instead of being interpolated
+_enums = set([QiTypeCode.SByteEnum, QiTypeCode.ByteEnum, QiTypeCode.Int16Enum, QiTypeCode.UInt16Enum,
+              QiTypeCode.Int32Enum, QiTypeCode.UInt32Enum, QiTypeCode.Int64Enum, QiTypeCode.UInt64Enum])
+
+def _requireNumpy():
+    if numpy is None:
+        raise ImportError("numpy is required to interpolate locally, install it with 'pip install numpy'")
+
+def _datetimes(indexes):
+    # numpy parses ISO 8601 text without the UTC designator and naive datetimes only
+    values = []
+    for index in indexes:
+        if isinstance(index, str) and index.endswith("Z"):
+            index = index[:-1]
+        elif isinstance(index, datetime.datetime) and index.tzinfo is not None:
+            index = index.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        values.append(index)
+    return numpy.array(values, dtype="datetime64[ns]")
+
+def formatIndex(index):
+    """Returns the element 'index' of an index array in the form Qi takes in a URL"""
+    if isinstance(index, numpy.datetime64):
+        return numpy.datetime_as_string(index, unit="auto", timezone="UTC")
+    return index.item() if isinstance(index, numpy.generic) else index
+
+def regularIndexes(start, end, interval):
+    """Returns the indexes from 'start' to 'end', inclusive, 'interval' apart as a numpy array; for DateTime
+    indexes 'start' and 'end' are datetimes or ISO 8601 text and 'interval' a timedelta or seconds"""
+    _requireNumpy()
+    if isinstance(start, (str, datetime.datetime, numpy.datetime64)):
+        start, end = _datetimes([start, end])
+        if not isinstance(interval, datetime.timedelta):
+            interval = datetime.timedelta(seconds=interval)
+        interval = numpy.timedelta64(interval // datetime.timedelta(microseconds=1), "us").astype("timedelta64[ns]")
+        if interval <= numpy.timedelta64(0, "ns"):
+            raise ValueError("interval must be positive")
+        count = (end - start) // interval + 1 if end >= start else 0
+        return start + numpy.arange(count, dtype="int64") * interval
+    if interval <= 0:
+        raise ValueError("interval must be positive")
+    count = int((end - start) // interval) + 1 if end >= start else 0
+    return start + numpy.arange(count) * interval
+
+
+class QiInterpolator(object):
+    """Calculates the values of a stream at indexes where it may have no event, as Qi does for getValue and
+    the ExactOrCalculated boundary, from events already read. The behavior's Mode applies to every property
+    unless a QiStreamBehaviorOverride gives the property its own:
+
+        Continuous                   numbers and times are interpolated linearly between the events either
+                                     side; other properties take the value of the event before
+        StepwiseContinuousLeading    the value of the event before
+        StepwiseContinuousTrailing   the value of the event after
+        Discrete                     only the value of an event at the index itself
+
+    Before the first event and after the last, values are those of the first and last event where
+    ExtrapolationMode allows. All the indexes are calculated at once with numpy."""
+
+    def __init__(self, type, behavior=None):
+        _requireNumpy()
+        keys = [prop.Id for prop in type.Properties if prop.IsKey]
+        if len(keys) != 1:
+            raise QiError("QiType {type_id} needs a single key property to interpolate".format(type_id=type.Id))
+        if behavior is None:
+            behavior = QiStreamBehavior()
+        self.__keyId = keys[0]
+        self.__columns = [(propertyId, typeCode) for propertyId, typeCode in columnsOf(type) if propertyId != keys[0]]
+        self.__mode = QiStreamMode(behavior.Mode)
+        self.__extrapolation = QiStreamExtrapolation(behavior.ExtrapolationMode)
+        self.__overrides = {}
+        if hasattr(behavior, 'Overrides'):
+            for override in behavior.Overrides:
+                self.__overrides[override.QiTypePropertyId] = QiStreamMode(override.Mode)
+
+    @property
+    def KeyId(self):
+        return self.__keyId
+
+    @property
+    def Mode(self):
+        return self.__mode
+
+    @property
+    def ExtrapolationMode(self):
+        return self.__extrapolation
+
+    def modeOf(self, propertyId):
+        """Returns the QiStreamMode the property 'propertyId' is calculated with"""
+        return self.__overrides.get(propertyId, self.__mode)
+
+    def indexArray(self, indexes, dtype=None):
+        """Returns 'indexes' as a numpy array; numbers stay numbers, anything else is read as DateTime"""
+        _requireNumpy()
+        if isinstance(indexes, numpy.ndarray) and indexes.dtype.kind in "iufM":
+            return indexes.astype("datetime64[ns]") if indexes.dtype.kind == "M" else indexes
+        indexes = list(indexes)
+        if (dtype is not None and numpy.dtype(dtype).kind == "M") or \
+                any(not isinstance(index, (int, float)) or isinstance(index, bool) for index in indexes):
+            return _datetimes(indexes)
+        return numpy.array(indexes)
+
+    def interpolate(self, columns, indexes):
+        """Returns the values at 'indexes' as a dictionary of numpy arrays keyed by property id, given
+        'columns', the events as QiColumns.toColumns decodes them. Indexes the stream has no value at, in
+        Discrete mode or outside the events where ExtrapolationMode does not allow it, are left out.
+        Integer properties that are interpolated become floats, and missing values are NaN, NaT or None"""
+        keys = columns[self.__keyId]
+        indexes = self.indexArray(indexes, keys.dtype)
+        if keys.dtype.kind == "M":
+            keys = keys.astype("datetime64[ns]")
+
+        # the events in index order, each index once
+        keys, order = numpy.unique(keys, return_index=True)
+        count = len(keys)
+        if count == 0:
+            results = {self.__keyId: indexes[:0]}
+            for propertyId, typeCode in self.__columns:
+                results[propertyId] = columns[propertyId][:0]
+            return results
+
+        position = numpy.searchsorted(keys, indexes, side="left")
+        exact = keys[numpy.minimum(position, count - 1)] == indexes
+        before = (position == 0) & ~exact
+        after = position == count
+        if self.__mode == QiStreamMode.Discrete:
+            rows = exact
+        else:
+            rows = (~before & ~after) | exact
+            if self.__extrapolation in (QiStreamExtrapolation.All, QiStreamExtrapolation.Backward):
+                rows |= before
+            if self.__extrapolation in (QiStreamExtrapolation.All, QiStreamExtrapolation.Forward):
+                rows |= after
+        if not rows.all():
+            indexes, position, exact = indexes[rows], position[rows], exact[rows]
+
+        # the events before and after each index; both are the event at the index when there is one,
+        # and the first or last event outside them
+        trailing = numpy.minimum(position, count - 1)
+        leading = numpy.where(exact, position, numpy.maximum(position - 1, 0))
+        between = numpy.flatnonzero(leading != trailing)
+        ratio = None
+
+        results = {self.__keyId: indexes}
+        for propertyId, typeCode in self.__columns:
+            values = columns[propertyId][order]
+            mode = self.modeOf(propertyId)
+            if mode == QiStreamMode.Discrete:
+                results[propertyId] = _withMissing(values[trailing], ~exact)
+            elif mode == QiStreamMode.StepwiseContinuousTrailing:
+                results[propertyId] = values[trailing]
+            elif mode == QiStreamMode.StepwiseContinuousLeading or values.dtype.kind not in "iufM" \
+                    or typeCode in _enums:
+                results[propertyId] = values[leading]
+            else:
+                if ratio is None:
+                    low, high = keys[leading[between]], keys[trailing[between]]
+                    ratio = (indexes[between] - low) / (high - low)
+                results[propertyId] = _interpolated(values, leading, trailing, between, ratio)
+        return results
+
+    def resample(self, columns, start, end, interval):
+        """Returns the values from 'start' to 'end' every 'interval'; see interpolate and regularIndexes"""
+        return self.interpolate(columns, regularIndexes(start, end, interval))
+
+
+def _interpolated(values, leading, trailing, between, ratio):
+    if values.dtype.kind == "M":
+        values = values.astype("datetime64[ns]")
+        result = values[leading]
+        low = values[leading[between]]
+        difference = (values[trailing[between]] - low).astype("int64")
+        result[between] = low + numpy.rint(difference * ratio).astype("int64").astype("timedelta64[ns]")
+        return result
+    values = values.astype("float64", copy=False)
+    result = values[leading]
+    low = values[leading[between]]
+    result[between] = low + (values[trailing[between]] - low) * ratio
+    return result
+
+def _withMissing(values, missing):
+    if not missing.any():
+        return values
+    kind = values.dtype.kind
+    if kind == "f" or kind == "M":
+        values = values.copy()
+    elif kind in "iu":
+        values = values.astype("float64")
+    else:
+        values = values.astype("object")
+    values[missing] = numpy.datetime64("NaT") if kind == "M" else numpy.nan if kind in "iuf" else None
+    return values
@@ -0,0 +1,85 @@
+"""The JSON implementation used by QiClient and the model classes. The fastest one installed is
+picked on import: orjson, then ujson, then the standard library's json; useBackend switches
+between them. Call the functions through the module (QiJson.dumps) so a switch is seen.
+
+    dumps(obj, default=None)      JSON text as str
+    dumpBytes(obj, default=None)  UTF-8 JSON as bytes, for request bodies
+    loads(data)                   parses str or bytes
+
+'default' is called with objects the backend cannot encode and returns something it can."""
+
+import json
+
+_preference = ("orjson", "ujson", "json")
+
+backendName = None
+
+
+def _stdlib():
+    def dumps(obj, default=None):
+        return json.dumps(obj, default=default)
+
+    def dumpBytes(obj, default=None):
+        # json.dumps escapes non-ASCII characters, so the text is ASCII
+        return json.dumps(obj, default=default).encode("ascii")
+
+    return dumps, dumpBytes, json.loads
+
+
+def _orjson():
+    import orjson
+
+    def dumps(obj, default=None):
+        return orjson.dumps(obj, default=default).decode("utf-8")
+
+    def dumpBytes(obj, default=None):
+        return orjson.dumps(obj, default=default)
+
+    return dumps, dumpBytes, orjson.loads
+
+
+def _ujson():
+    import ujson
+
+    def dumps(obj, default=None):
+        if default is None:
+            return ujson.dumps(obj)
+        return ujson.dumps(obj, default=default)
+
+    def dumpBytes(obj, default=None):
+        return dumps(obj, default).encode("utf-8")
+
+    return dumps, dumpBytes, ujson.loads
+
+
+_backends = {"orjson": _orjson, "ujson": _ujson, "json": _stdlib}
+
+
+def useBackend(name):
+    """Switches to the backend 'name' ("orjson", "ujson" or "json"); raises ImportError if it is not installed"""
+    global backendName, dumps, dumpBytes, loads
+    if name not in _backends:
+        raise ValueError("Unknown JSON backend {name}, expected one of {names}".format(
+            name=name, names=", ".join(_preference)))
+    dumps, dumpBytes, loads = _backends[name]()
+    backendName = name
+
+
+def availableBackends():
+    """Returns the names of the installed backends, fastest first"""
+    names = []
+    for name in _preference:
+        try:
+            _backends[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+for _name in _preference:
+    try:
+        useBackend(_name)
+        break
+    except ImportError:
+        pass
@@ -0,0 +1,217 @@
+import concurrent.futures
+import heapq
+import random
+import threading
+import time
+
+
+class _QiPolledStream(object):
+
+    def __init__(self, stream_id, interval):
+        self.id = stream_id
+        self.value = None
+        self.content = None
+        self.changed = None
+        self.polled = None
+        self.interval = interval
+        self.error = None
+        self.polling = False
+        # bumped when the stream is removed or polled out of turn, so its scheduled poll is dropped
+        self.turn = 0
+
+
+class QiLastValuePoller(object):
+    """Keeps the last value of each of a set of streams, refreshed from 'workers' threads by getLastValue.
+    A stream whose value changed is polled again after 'minInterval' seconds; each poll that finds it
+    unchanged multiplies the wait by 'backoff', up to 'maxInterval', so idle streams are polled rarely.
+    'onChange(stream_id, previous, value)' is called, from a worker thread, when a stream's value
+    changes (previous is None on its first poll) and 'onError(stream_id, error)' when a poll fails;
+    failed streams are retried as if they were unchanged."""
+
+    def __init__(self, client, namespace_id, value_class, stream_ids=(), view_id="", minInterval=1.0,
+                 maxInterval=60.0, backoff=2.0, workers=16, onChange=None, onError=None):
+        if client is None:
+            raise TypeError
+        if namespace_id is None:
+            raise TypeError
+        if value_class is None:
+            raise TypeError
+        if minInterval <= 0 or maxInterval < minInterval:
+            raise ValueError("intervals must be positive and maxInterval at least minInterval")
+        if backoff < 1:
+            raise ValueError("backoff must be at least 1")
+
+        self.__client = client
+        self.__namespace = namespace_id
+        self.__valueClass = value_class
+        self.__viewId = view_id
+        self.__minInterval = minInterval
+        self.__maxInterval = maxInterval
+        self.__backoff = backoff
+        self.__workers = workers
+        self.__onChange = onChange
+        self.__onError = onError
+
+        self.__lock = threading.Lock()
+        self.__changed = threading.Condition(self.__lock)
+        self.__streams = {}
+        self.__schedule = []
+        self.__polls = 0
+        self.__changes = 0
+        self.__errors = 0
+        self.__executor = None
+        self.__thread = None
+        self.__stopping = False
+
+        for stream_id in stream_ids:
+            self.add(stream_id)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    @property
+    def StreamIds(self):
+        with self.__lock:
+            return list(self.__streams.keys())
+
+    def add(self, stream_id):
+        """Starts polling the stream; the first polls of the streams added are spread over 'minInterval'"""
+        with self.__changed:
+            if stream_id in self.__streams:
+                return
+            stream = self.__streams[stream_id] = _QiPolledStream(stream_id, self.__minInterval)
+            heapq.heappush(self.__schedule, (time.monotonic() + random.uniform(0, self.__minInterval), stream_id, stream.turn))
+            self.__changed.notify_all()
+
+    def remove(self, stream_id):
+        with self.__changed:
+            stream = self.__streams.pop(stream_id, None)
+            if stream is not None:
+                stream.turn += 1
+
+    def get(self, stream_id):
+        """Returns the last value polled from the stream, or None"""
+        with self.__lock:
+            stream = self.__streams.get(stream_id)
+            return None if stream is None else stream.value
+
+    def table(self):
+        """Returns a snapshot of every stream's last value, keyed by stream id"""
+        with self.__lock:
+            return dict((stream_id, stream.value) for stream_id, stream in self.__streams.items())
+
+    def status(self, stream_id):
+        """Returns when the stream was last polled and last changed (time.monotonic() values), its current
+        polling interval and the error of its last poll"""
+        with self.__lock:
+            stream = self.__streams[stream_id]
+            return {"polled": stream.polled, "changed": stream.changed, "interval": stream.interval,
+                    "error": stream.error}
+
+    def stats(self):
+        with self.__lock:
+            return {"streams": len(self.__streams), "polls": self.__polls, "changes": self.__changes,
+                    "errors": self.__errors}
+
+    def refresh(self, stream_ids=None):
+        """Polls the streams (all of them by default) now, on the calling thread, and returns the table;
+        their scheduled polls start over with the shortest interval"""
+        with self.__lock:
+            streams = [self.__streams[stream_id] for stream_id in (stream_ids if stream_ids is not None else self.__streams)
+                       if stream_id in self.__streams]
+            for stream in streams:
+                stream.turn += 1
+                stream.interval = self.__minInterval
+        for stream in streams:
+            self.__poll(stream, stream.turn, reschedule=False)
+        with self.__changed:
+            now = time.monotonic()
+            for stream in streams:
+                if self.__streams.get(stream.id) is stream:
+                    heapq.heappush(self.__schedule, (now + stream.interval, stream.id, stream.turn))
+            self.__changed.notify_all()
+        return self.table()
+
+    def start(self):
+        """Starts polling on a background thread"""
+        with self.__lock:
+            if self.__thread is not None:
+                return self
+            self.__stopping = False
+            self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.__workers)
+            self.__thread = threading.Thread(target=self.__run, name="QiLastValuePoller")
+            self.__thread.daemon = True
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stops polling and waits for the polls in progress"""
+        with self.__changed:
+            thread = self.__thread
+            if thread is None:
+                return
+            self.__stopping = True
+            self.__changed.notify_all()
+        thread.join()
+        self.__executor.shutdown(wait=True)
+        with self.__lock:
+            self.__thread = None
+            self.__executor = None
+
+    def __run(self):
+        with self.__changed:
+            while not self.__stopping:
+                now = time.monotonic()
+                while self.__schedule and self.__schedule[0][0] <= now:
+                    due, stream_id, turn = heapq.heappop(self.__schedule)
+                    stream = self.__streams.get(stream_id)
+                    if stream is None or stream.turn != turn or stream.polling:
+                        continue
+                    stream.polling = True
+                    self.__executor.submit(self.__poll, stream, turn)
+                wait = self.__schedule[0][0] - now if self.__schedule else None
+                self.__changed.wait(wait)
+
+    def __poll(self, stream, turn, reschedule=True):
+        value = None
+        content = None
+        error = None
+        try:
+            value = self.__client.getLastValue(self.__namespace, stream.id, self.__valueClass, self.__viewId)
+            content = value.toDictionary() if callable(getattr(value, "toDictionary", None)) else value
+        except Exception as e:
+            error = e
+
+        with self.__changed:
+            self.__polls += 1
+            stream.polling = False
+            stream.polled = time.monotonic()
+            stream.error = error
+            previous = stream.value
+            changed = error is None and (stream.changed is None or content != stream.content)
+            if error is not None:
+                self.__errors += 1
+                stream.interval = min(self.__maxInterval, stream.interval * self.__backoff)
+            elif changed:
+                self.__changes += 1
+                stream.value = value
+                stream.content = content
+                stream.changed = stream.polled
+                stream.interval = self.__minInterval
+            else:
+                stream.interval = min(self.__maxInterval, stream.interval * self.__backoff)
+            if reschedule and stream.turn == turn and self.__streams.get(stream.id) is stream:
+                heapq.heappush(self.__schedule, (stream.polled + stream.interval, stream.id, turn))
+                self.__changed.notify_all()
+
+        try:
+            if error is not None and self.__onError is not None:
+                self.__onError(stream.id, error)
+            elif changed and self.__onChange is not None:
+                self.__onChange(stream.id, previous, value)
+        except Exception:
+            pass
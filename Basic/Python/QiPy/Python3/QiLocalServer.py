@@ -0,0 +1,545 @@
+import bisect
+import gzip
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+from QiBoundaryType import QiBoundaryType
+from QiStreamMode import QiStreamMode
+
+# type codes whose values are numbers, and those of them a view converts to integers
+_integerCodes = set([5, 6, 7, 8, 9, 10, 11, 12, 105, 106, 107, 108, 109, 110, 111, 112,
+                     605, 606, 607, 608, 609, 610, 611, 612])
+_numericCodes = _integerCodes | set([13, 14, 15, 113, 114, 115])
+
+_route = re.compile(r"^/api/Tenants/([^/]+)/Namespaces/([^/]+)/(Types|Behaviors|Views|Streams)(?:/([^/]+)(?:/(.+))?)?$")
+
+
+class _QiJson(str):
+    """JSON text that is sent as it is"""
+
+
+class _QiNotFound(Exception):
+    pass
+
+
+class _QiConflict(Exception):
+    pass
+
+
+class _QiStreamData(object):
+    """The events of one stream, kept sorted by their key. Each event is a [dictionary, JSON text] pair
+    whose text is encoded on its first read and then reused"""
+
+    def __init__(self, keyId, numeric):
+        self.keyId = keyId
+        self.numeric = numeric
+        self.keys = []
+        self.events = []
+
+    def parseIndex(self, text):
+        if not self.numeric:
+            return text
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+
+    @staticmethod
+    def toJson(events):
+        texts = []
+        for event in events:
+            text = event[1]
+            if text is None:
+                text = event[1] = json.dumps(event[0])
+            texts.append(text)
+        return "[" + ",".join(texts) + "]"
+
+    def find(self, key):
+        pos = bisect.bisect_left(self.keys, key)
+        return pos, pos < len(self.keys) and self.keys[pos] == key
+
+    def put(self, key, event):
+        # events usually arrive in key order, so appending is the common case
+        keys = self.keys
+        if len(keys) == 0 or key > keys[-1]:
+            keys.append(key)
+            self.events.append(event)
+            return
+        pos, exists = self.find(key)
+        if exists:
+            self.events[pos] = event
+        else:
+            keys.insert(pos, key)
+            self.events.insert(pos, event)
+
+
+class QiLocalServer(object):
+    """In-process stand-in for the Qi Service, serving the REST routes QiClient uses from an in-memory
+    store, so the client can be benchmarked and load tested without a tenant. Any tenant and namespace
+    is accepted and no token is checked. Calculated values follow the stream behavior's mode, with
+    continuous values interpolated linearly between numeric keys; extrapolation settings and overrides
+    are ignored. Request bodies may be gzip-compressed; responses of at least 'compressionThreshold'
+    bytes are compressed for clients that accept gzip, None never compresses them."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0, compressionThreshold=None):
+        self.__latency = latency
+        self.__compressionThreshold = compressionThreshold
+        self.__lock = threading.RLock()
+        self.__namespaces = {}
+        self.__requestCount = 0
+
+        self.__httpServer = ThreadingHTTPServer((host, port), _QiRequestHandler)
+        self.__httpServer.daemon_threads = True
+        self.__httpServer.qi = self
+        self.__thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def Url(self):
+        host, port = self.__httpServer.server_address[:2]
+        return "http://{host}:{port}".format(host=host, port=port)
+
+    @property
+    def Latency(self):
+        return self.__latency
+    @Latency.setter
+    def Latency(self, latency):
+        self.__latency = latency
+
+    @property
+    def CompressionThreshold(self):
+        return self.__compressionThreshold
+    @CompressionThreshold.setter
+    def CompressionThreshold(self, compressionThreshold):
+        self.__compressionThreshold = compressionThreshold
+
+    @property
+    def RequestCount(self):
+        return self.__requestCount
+
+    def start(self):
+        """Starts serving on a background thread"""
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__httpServer.serve_forever, name="QiLocalServer", daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the listening socket"""
+        if self.__thread is not None:
+            self.__httpServer.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__httpServer.server_close()
+
+    def serveForever(self):
+        """Serves on the calling thread until interrupted"""
+        self.__httpServer.serve_forever()
+
+    def reset(self):
+        """Drops every type, behavior, view, stream and event"""
+        with self.__lock:
+            self.__namespaces.clear()
+            self.__requestCount = 0
+
+    def dispatch(self, method, path, body=None):
+        """Handles one REST call and returns the status code and the JSON text of the response (or None)"""
+        with self.__lock:
+            self.__requestCount += 1
+        if self.__latency > 0:
+            time.sleep(self.__latency)
+
+        parts = urlsplit(path)
+        match = _route.match(parts.path)
+        if match is None:
+            return 404, None
+        tenant, namespace_id, collection, id, action = match.groups()
+        query = dict(parse_qsl(parts.query, keep_blank_values=True))
+
+        try:
+            if isinstance(body, bytes):
+                body = body.decode("utf-8")
+            with self.__lock:
+                namespace = self.__namespace(tenant, namespace_id)
+                if id is None:
+                    if method != "GET":
+                        return 405, None
+                    status, content = 200, self.__list(namespace, collection, query)
+                elif collection == "Streams" and action is not None and action.startswith("Data/"):
+                    status, content = self.__data(namespace, id, method, action[5:], query, body)
+                else:
+                    status, content = self.__metadata(namespace, collection, id, action, method,
+                                                      json.loads(body) if body else None)
+        except _QiNotFound as e:
+            status, content = 404, str(e)
+        except _QiConflict as e:
+            status, content = 409, str(e)
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            status, content = 400, str(e)
+
+        if status == 204 or (content is None and status >= 400):
+            return status, None
+        if isinstance(content, _QiJson):
+            return status, content
+        return status, json.dumps(content)
+
+    # metadata
+
+    def __namespace(self, tenant, namespace_id):
+        key = (tenant, namespace_id)
+        namespace = self.__namespaces.get(key)
+        if namespace is None:
+            namespace = {"Types": {}, "Behaviors": {}, "Views": {}, "Streams": {}, "Data": {}}
+            self.__namespaces[key] = namespace
+        return namespace
+
+    def __list(self, namespace, collection, query):
+        items = list(namespace[collection].values())
+        if collection == "Streams" and query.get("query"):
+            text = query["query"].lower()
+            items = [item for item in items
+                     if any(text in str(item.get(field, "")).lower() for field in ("Id", "Name", "Description"))]
+        skip = int(query.get("skip", 0))
+        count = int(query.get("count", 100))
+        return items[skip:skip + count]
+
+    def __metadata(self, namespace, collection, id, action, method, content):
+        items = namespace[collection]
+
+        if action is not None:
+            if method != "GET":
+                return 405, None
+            if action == "ReferenceCount" and collection in ("Types", "Behaviors"):
+                self.__get(items, collection, id)
+                field = "TypeId" if collection == "Types" else "BehaviorId"
+                return 200, sum(1 for stream in namespace["Streams"].values() if stream.get(field) == id)
+            if action == "Map" and collection == "Views":
+                return 200, self.__viewMap(namespace, self.__get(items, collection, id))
+            if action == "Type" and collection == "Streams":
+                return 200, self.__get(namespace["Types"], "Types", self.__get(items, collection, id)["TypeId"])
+            return 404, None
+
+        if method == "GET":
+            return 200, self.__get(items, collection, id)
+
+        if method == "DELETE":
+            self.__get(items, collection, id)
+            if collection in ("Types", "Behaviors"):
+                field = "TypeId" if collection == "Types" else "BehaviorId"
+                if any(stream.get(field) == id for stream in namespace["Streams"].values()):
+                    raise _QiConflict("{id} is referenced by a stream".format(id=id))
+            del items[id]
+            if collection == "Streams":
+                namespace["Data"].pop(id, None)
+            return 204, None
+
+        if content is None:
+            raise ValueError("missing {collection} definition".format(collection=collection))
+        content["Id"] = id
+        if collection == "Streams":
+            self.__get(namespace["Types"], "Types", content.get("TypeId"))
+
+        if method == "POST":
+            existing = items.get(id)
+            if existing is not None:
+                if existing != content:
+                    raise _QiConflict("{id} already exists with a different definition".format(id=id))
+                return 200, existing
+            self.__store(namespace, collection, id, content)
+            return 201, content
+
+        if method == "PUT":
+            self.__store(namespace, collection, id, content)
+            return 204, None
+
+        return 405, None
+
+    def __store(self, namespace, collection, id, content):
+        namespace[collection][id] = content
+        if collection == "Streams":
+            data = namespace["Data"].get(id)
+            keyId, numeric = self.__keyOf(namespace, content["TypeId"])
+            if data is None or data.keyId != keyId:
+                namespace["Data"][id] = _QiStreamData(keyId, numeric)
+
+    @staticmethod
+    def __get(items, collection, id):
+        item = items.get(id)
+        if item is None:
+            raise _QiNotFound("{collection} {id} not found".format(collection=collection, id=id))
+        return item
+
+    def __keyOf(self, namespace, type_id):
+        qiType = self.__get(namespace["Types"], "Types", type_id)
+        for prop in qiType.get("Properties", []):
+            if prop.get("IsKey"):
+                code = prop.get("QiType", {}).get("QiTypeCode")
+                return prop["Id"], code in _numericCodes
+        raise ValueError("QiType {type_id} has no key property".format(type_id=type_id))
+
+    # views
+
+    def __viewMap(self, namespace, view):
+        source = self.__get(namespace["Types"], "Types", view["SourceTypeId"])
+        target = self.__get(namespace["Types"], "Types", view["TargetTypeId"])
+        # like the service, every source property is listed, mapped or not
+        targets = dict((sourceId, targetId) for targetId, sourceId, _ in self.__projection(view, source, target))
+        properties = []
+        for prop in source.get("Properties", []):
+            mapping = {"SourceId": prop["Id"]}
+            if prop["Id"] in targets:
+                mapping["TargetId"] = targets[prop["Id"]]
+            properties.append(mapping)
+        return {"SourceTypeId": view["SourceTypeId"], "TargetTypeId": view["TargetTypeId"], "Properties": properties}
+
+    @staticmethod
+    def __projection(view, source, target):
+        # explicit view properties win, then properties with the same id, then, as an automatic view
+        # over types of the same shape, the source property in the same position
+        explicit = dict((prop["TargetId"], prop["SourceId"]) for prop in view.get("Properties") or [])
+        sourceProperties = source.get("Properties", [])
+        sourceIds = set(prop["Id"] for prop in sourceProperties)
+        targetProperties = target.get("Properties", [])
+        sameShape = len(sourceProperties) == len(targetProperties)
+
+        projection = []
+        for position, prop in enumerate(targetProperties):
+            if prop["Id"] in explicit:
+                sourceId = explicit[prop["Id"]]
+            elif prop["Id"] in sourceIds:
+                sourceId = prop["Id"]
+            elif sameShape and len(explicit) == 0:
+                sourceId = sourceProperties[position]["Id"]
+            else:
+                continue
+            projection.append((prop["Id"], sourceId, prop.get("QiType", {}).get("QiTypeCode") in _integerCodes))
+        return projection
+
+    def __projector(self, namespace, stream, view_id):
+        if not view_id:
+            return None
+        view = self.__get(namespace["Views"], "Views", view_id)
+        source = self.__get(namespace["Types"], "Types", stream["TypeId"])
+        target = self.__get(namespace["Types"], "Types", view["TargetTypeId"])
+        projection = self.__projection(view, source, target)
+
+        def project(event):
+            event = event[0]
+            result = {}
+            for targetId, sourceId, integer in projection:
+                value = event.get(sourceId)
+                if integer and value is not None:
+                    value = int(value)
+                result[targetId] = value
+            return result
+        return project
+
+    # data
+
+    def __data(self, namespace, stream_id, method, action, query, body):
+        stream = self.__get(namespace["Streams"], "Streams", stream_id)
+        data = namespace["Data"][stream_id]
+        behavior = namespace["Behaviors"].get(stream.get("BehaviorId"))
+        mode = behavior.get("Mode", 0) if behavior is not None else 0
+
+        if method == "GET":
+            if action == "GetValue":
+                event = self.__valueAt(data, data.parseIndex(query["index"]), mode)
+                events = [event] if event is not None else []
+            elif action == "GetFirstValue":
+                events = data.events[:1]
+            elif action == "GetLastValue":
+                events = data.events[-1:]
+            elif action == "GetWindowValues":
+                start = bisect.bisect_left(data.keys, data.parseIndex(query["startIndex"]))
+                end = bisect.bisect_right(data.keys, data.parseIndex(query["endIndex"]))
+                events = data.events[start:end]
+            elif action == "GetRangeValues":
+                events = self.__range(data, data.parseIndex(query["startIndex"]), int(query.get("skip", 0)),
+                                      int(query.get("count", 100)), query.get("reversed", "False").lower() == "true",
+                                      QiBoundaryType(int(query.get("boundaryType", 0))), mode)
+            else:
+                return 404, None
+
+            project = self.__projector(namespace, stream, query.get("viewId"))
+            if project is not None:
+                events = [project(event) for event in events]
+                if action in ("GetValue", "GetFirstValue", "GetLastValue"):
+                    return 200, events[0] if len(events) > 0 else None
+                return 200, events
+
+            if action in ("GetValue", "GetFirstValue", "GetLastValue"):
+                return 200, _QiJson(data.toJson(events)[1:-1] if len(events) > 0 else "null")
+            return 200, _QiJson(data.toJson(events))
+
+        if method == "DELETE":
+            if action == "RemoveValue":
+                pos, exists = data.find(data.parseIndex(query["index"]))
+                if not exists:
+                    raise _QiNotFound("no event at {index}".format(index=query["index"]))
+                del data.keys[pos]
+                del data.events[pos]
+            elif action == "RemoveWindowValues":
+                start = bisect.bisect_left(data.keys, data.parseIndex(query["startIndex"]))
+                end = bisect.bisect_right(data.keys, data.parseIndex(query["endIndex"]))
+                del data.keys[start:end]
+                del data.events[start:end]
+            else:
+                return 404, None
+            return 204, None
+
+        if not body:
+            raise ValueError("missing events")
+        content = json.loads(body)
+        if action in ("InsertValue", "UpdateValue", "ReplaceValue"):
+            content = [content]
+        keyId = data.keyId
+        keyed = [(event[keyId], [event, None]) for event in content]
+
+        # the whole call fails without writing anything when one event is rejected
+        if action in ("InsertValue", "InsertValues") and method == "POST":
+            seen = set()
+            for key, _ in keyed:
+                if key in seen or data.find(key)[1]:
+                    raise _QiConflict("an event already exists at {index}".format(index=key))
+                seen.add(key)
+        elif action in ("ReplaceValue", "ReplaceValues") and method == "PUT":
+            for key, _ in keyed:
+                if not data.find(key)[1]:
+                    raise _QiNotFound("no event at {index}".format(index=key))
+        elif action not in ("UpdateValue", "UpdateValues") or method != "PUT":
+            return 404, None
+
+        for key, event in keyed:
+            data.put(key, event)
+        return 204, None
+
+    def __range(self, data, start, skip, count, reverse, boundary, mode):
+        keys = data.keys
+        events = []
+        if not reverse:
+            pos = bisect.bisect_left(keys, start)
+            exact = pos < len(keys) and keys[pos] == start
+            if not exact:
+                if boundary == QiBoundaryType.Outside and pos > 0:
+                    pos -= 1
+                elif boundary == QiBoundaryType.ExactOrCalculated:
+                    events = [event for event in [self.__valueAt(data, start, mode)] if event is not None]
+            # the skipped events may include the calculated one
+            begin = pos + max(0, skip - len(events))
+            events = events[skip:] + data.events[begin:begin + count]
+        else:
+            pos = bisect.bisect_right(keys, start) - 1
+            exact = pos >= 0 and keys[pos] == start
+            if not exact:
+                if boundary == QiBoundaryType.Outside and pos + 1 < len(keys):
+                    pos += 1
+                elif boundary == QiBoundaryType.ExactOrCalculated:
+                    events = [event for event in [self.__valueAt(data, start, mode)] if event is not None]
+            begin = pos - max(0, skip - len(events))
+            end = max(begin - count, -1)
+            events = events[skip:] + [data.events[i] for i in range(begin, end, -1)]
+        return events[:count]
+
+    @staticmethod
+    def __valueAt(data, index, mode):
+        # the stored event at 'index', otherwise one calculated from its neighbours as the stream
+        # mode says (or extrapolated from the nearest) with its key set to 'index'
+        pos, exists = data.find(index)
+        if exists:
+            return data.events[pos]
+        if len(data.keys) == 0 or mode == QiStreamMode.Discrete.value:
+            return None
+        if pos == 0 or pos == len(data.keys):
+            event = dict(data.events[0 if pos == 0 else -1][0])
+        elif mode == QiStreamMode.StepwiseContinuousLeading.value:
+            event = dict(data.events[pos - 1][0])
+        elif mode == QiStreamMode.StepwiseContinuousTrailing.value:
+            event = dict(data.events[pos][0])
+        else:
+            before, after = data.events[pos - 1][0], data.events[pos][0]
+            event = dict(before)
+            if data.numeric:
+                ratio = (index - data.keys[pos - 1]) / (data.keys[pos] - data.keys[pos - 1])
+                for name, value in before.items():
+                    other = after.get(name)
+                    if isinstance(value, (int, float)) and not isinstance(value, bool) \
+                            and isinstance(other, (int, float)) and not isinstance(other, bool):
+                        event[name] = value + (other - value) * ratio
+        event[data.keyId] = index
+        return [event, None]
+
+
+class _QiRequestHandler(BaseHTTPRequestHandler):
+    """Reads one request at a time off a keep-alive connection and hands it to QiLocalServer.dispatch"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def __handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length > 0 else None
+        status, content = None, None
+        if body is not None and self.headers.get("Content-Encoding", "").lower() == "gzip":
+            try:
+                body = gzip.decompress(body)
+            except (OSError, EOFError, zlib.error) as e:
+                status, content = 400, json.dumps("Invalid gzip request body: {error}".format(error=e))
+
+        if status is None:
+            status, content = self.server.qi.dispatch(self.command, self.path, body)
+
+        payload = content.encode("utf-8") if content is not None else b""
+        threshold = self.server.qi.CompressionThreshold
+        compress = threshold is not None and len(payload) >= threshold and len(payload) > 0 and \
+            "gzip" in self.headers.get("Accept-Encoding", "").lower()
+        if compress:
+            payload = gzip.compress(payload, 1)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if len(payload) > 0:
+            self.wfile.write(payload)
+
+    do_GET = __handle
+    do_POST = __handle
+    do_PUT = __handle
+    do_DELETE = __handle
+
+    def log_message(self, format, *args):
+        # one line per request would cost more than serving it
+        pass
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serves the Qi REST API from memory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0, help="seconds added to every request")
+    parser.add_argument("--compression-threshold", type=int,
+                        help="gzip responses of at least this many bytes for clients that accept it")
+    args = parser.parse_args()
+
+    server = QiLocalServer(args.host, args.port, args.latency, args.compression_threshold)
+    print("Qi stand-in listening at {url}".format(url=server.Url))
+    try:
+        server.serveForever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
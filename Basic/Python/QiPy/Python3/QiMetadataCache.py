@@ -0,0 +1,81 @@
+import collections
+import threading
+import time
+
+class QiMetadataCache(object):
+    """In-process cache of Qi metadata (types, behaviors, views and streams) with a time to live
+    and least recently used eviction; with a 'ttl' of None entries never expire. Cached objects are
+    shared, so callers should not modify them."""
+
+    def __init__(self, maxSize=1024, ttl=300, clock=time.monotonic):
+        if maxSize < 1:
+            raise ValueError("maxSize must be at least 1")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive, or None for entries that never expire")
+        self.__maxSize = maxSize
+        self.__ttl = ttl
+        self.__clock = clock
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    @property
+    def Hits(self):
+        return self.__hits
+
+    @property
+    def Misses(self):
+        return self.__misses
+
+    @property
+    def Evictions(self):
+        return self.__evictions
+
+    @property
+    def Size(self):
+        return len(self.__entries)
+
+    def get(self, kind, namespace_id, id):
+        """Returns the cached object, or None when it is missing or expired"""
+        key = (kind, namespace_id, id)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] <= self.__clock()):
+                if entry is not None:
+                    del self.__entries[key]
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry[1]
+
+    def put(self, kind, namespace_id, id, value):
+        if value is None:
+            return
+        key = (kind, namespace_id, id)
+        with self.__lock:
+            self.__entries[key] = (None if self.__ttl is None else self.__clock() + self.__ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__maxSize:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def invalidate(self, kind, namespace_id, id=None):
+        """Removes the cached object, or every object of 'kind' in the namespace when 'id' is None"""
+        with self.__lock:
+            if id is not None:
+                self.__entries.pop((kind, namespace_id, id), None)
+                return
+            for key in [k for k in self.__entries if k[0] == kind and k[1] == namespace_id]:
+                del self.__entries[key]
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        with self.__lock:
+            return {"hits": self.__hits, "misses": self.__misses, "evictions": self.__evictions,
+                    "size": len(self.__entries)}
@@ -0,0 +1,285 @@
+import bisect
+import contextlib
+import math
+import threading
+import time
+
+# upper bounds of the latency buckets in seconds: 50 microseconds doubling up to about 100 seconds
+_bounds = tuple(0.00005 * 2 ** i for i in range(22))
+
+_phases = ("url", "serialize", "token", "network", "deserialize")
+
+_active = threading.local()
+
+
+def _stack():
+    stack = getattr(_active, "stack", None)
+    if stack is None:
+        stack = _active.stack = []
+    return stack
+
+
+def currentSample():
+    """Returns the sample of the operation running on this thread, or None when it is not measured"""
+    stack = getattr(_active, "stack", None)
+    return stack[-1] if stack else None
+
+
+@contextlib.contextmanager
+def attachSample(sample):
+    """Attributes the requests made on this thread to 'sample', for work an operation hands to other threads"""
+    if sample is None:
+        yield None
+        return
+    stack = _stack()
+    stack.append(sample)
+    try:
+        yield sample
+    finally:
+        stack.pop()
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if len(ordered) == 0:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(math.ceil(fraction * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class QiHistogram(object):
+    """Latency histogram with exponential buckets; percentiles are estimated from the bucket bounds"""
+
+    def __init__(self):
+        self.__counts = [0] * (len(_bounds) + 1)
+        self.__count = 0
+        self.__total = 0.0
+        self.__min = None
+        self.__max = None
+
+    @property
+    def Count(self):
+        return self.__count
+
+    def add(self, seconds):
+        low = bisect.bisect_left(_bounds, seconds)
+        self.__counts[low] += 1
+        self.__count += 1
+        self.__total += seconds
+        if self.__min is None or seconds < self.__min:
+            self.__min = seconds
+        if self.__max is None or seconds > self.__max:
+            self.__max = seconds
+
+    def percentile(self, fraction):
+        if self.__count == 0:
+            return 0.0
+        rank = fraction * self.__count
+        seen = 0
+        for i, count in enumerate(self.__counts):
+            seen += count
+            if seen >= rank and count > 0:
+                bound = _bounds[i] if i < len(_bounds) else self.__max
+                return min(bound, self.__max)
+        return self.__max
+
+    def toDictionary(self):
+        return {"count": self.__count,
+                "total": self.__total,
+                "mean": self.__total / self.__count if self.__count > 0 else 0.0,
+                "min": self.__min or 0.0,
+                "max": self.__max or 0.0,
+                "p50": self.percentile(0.50),
+                "p95": self.percentile(0.95),
+                "p99": self.percentile(0.99),
+                "buckets": [(_bounds[i] if i < len(_bounds) else None, count)
+                            for i, count in enumerate(self.__counts) if count > 0]}
+
+
+class QiSample(object):
+    """Timings and sizes of one QiClient operation, filled in while it runs"""
+
+    def __init__(self, operation):
+        self.__operation = operation
+        self.__started = time.perf_counter()
+        self.__ended = None
+        self.__phases = dict((phase, 0.0) for phase in _phases)
+        self.__requests = 0
+        self.__bytesSent = 0
+        self.__bytesReceived = 0
+        self.__bytesSaved = 0
+        self.__statusCode = None
+        self.__error = None
+        self.__firstRequest = None
+        self.__lastResponse = None
+        self.__urlBeforeRequest = 0.0
+        self.__lock = threading.Lock()
+
+    @property
+    def Operation(self):
+        return self.__operation
+
+    @property
+    def Duration(self):
+        return (self.__ended if self.__ended is not None else time.perf_counter()) - self.__started
+
+    @property
+    def Phases(self):
+        """Seconds spent in each phase; serialize and deserialize are known once the operation finished"""
+        return self.__phases
+
+    @property
+    def Requests(self):
+        return self.__requests
+
+    @property
+    def BytesSent(self):
+        return self.__bytesSent
+
+    @property
+    def BytesReceived(self):
+        return self.__bytesReceived
+
+    @property
+    def BytesSaved(self):
+        """Bytes compression kept off the wire, requests and responses together"""
+        return self.__bytesSaved
+
+    @property
+    def StatusCode(self):
+        return self.__statusCode
+
+    @property
+    def Error(self):
+        return self.__error
+
+    def addPhase(self, phase, seconds):
+        with self.__lock:
+            self.__phases[phase] += seconds
+            if phase == "url" and self.__firstRequest is None:
+                self.__urlBeforeRequest += seconds
+
+    def addRequest(self, started, ended, statusCode, sent, received, saved=0):
+        """Records one round trip, retries included"""
+        with self.__lock:
+            if self.__firstRequest is None or started < self.__firstRequest:
+                self.__firstRequest = started
+            if self.__lastResponse is None or ended > self.__lastResponse:
+                self.__lastResponse = ended
+            self.__requests += 1
+            self.__statusCode = statusCode
+            self.__bytesSent += sent
+            self.__bytesReceived += received
+            self.__bytesSaved += saved
+
+    def addReceived(self, received):
+        """Adds bytes of a streamed response read after its request was recorded"""
+        with self.__lock:
+            self.__bytesReceived += received
+
+    def finish(self, error=None):
+        self.__ended = time.perf_counter()
+        self.__error = error
+        # what happens before the first request, other than building the url, is serializing the payload,
+        # and what happens after the last response is turning it into objects
+        if self.__firstRequest is not None:
+            self.__phases["serialize"] = max(0.0, self.__firstRequest - self.__started - self.__urlBeforeRequest)
+            self.__phases["deserialize"] = max(0.0, self.__ended - self.__lastResponse)
+
+    def toDictionary(self):
+        return {"operation": self.__operation,
+                "duration": self.Duration,
+                "phases": dict(self.__phases),
+                "requests": self.__requests,
+                "bytesSent": self.__bytesSent,
+                "bytesReceived": self.__bytesReceived,
+                "bytesSaved": self.__bytesSaved,
+                "statusCode": self.__statusCode,
+                "error": None if self.__error is None else repr(self.__error)}
+
+
+class _QiMeasurement(object):
+
+    def __init__(self, metrics, operation):
+        self.__metrics = metrics
+        self.__sample = QiSample(operation)
+
+    def __enter__(self):
+        _stack().append(self.__sample)
+        return self.__sample
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _stack().pop()
+        self.__sample.finish(exc_value)
+        self.__metrics.record(self.__sample)
+        return False
+
+
+class QiMetrics(object):
+    """Opt-in instrumentation for QiClient: per-operation counts, error rates, request and response sizes
+    (as sent, compressed or not, with the bytes compression saved) and latency histograms, in total and split by phase (url, serialize, token, network, deserialize).
+    'exporter', when given, is called with every finished sample; its errors are ignored so they
+    cannot fail the call being measured."""
+
+    def __init__(self, exporter=None):
+        self.__exporter = exporter
+        self.__lock = threading.Lock()
+        self.__operations = {}
+
+    @property
+    def Exporter(self):
+        return self.__exporter
+    @Exporter.setter
+    def Exporter(self, exporter):
+        self.__exporter = exporter
+
+    def measure(self, operation):
+        """Returns a context manager that measures 'operation' on the calling thread"""
+        return _QiMeasurement(self, operation)
+
+    def record(self, sample):
+        with self.__lock:
+            stats = self.__operations.get(sample.Operation)
+            if stats is None:
+                stats = {"count": 0, "errors": 0, "requests": 0, "bytesSent": 0, "bytesReceived": 0, "bytesSaved": 0,
+                         "latency": QiHistogram(), "phases": dict((phase, QiHistogram()) for phase in _phases)}
+                self.__operations[sample.Operation] = stats
+            stats["count"] += 1
+            if sample.Error is not None:
+                stats["errors"] += 1
+            stats["requests"] += sample.Requests
+            stats["bytesSent"] += sample.BytesSent
+            stats["bytesReceived"] += sample.BytesReceived
+            stats["bytesSaved"] += sample.BytesSaved
+            stats["latency"].add(sample.Duration)
+            if sample.Requests > 0:
+                for phase, seconds in sample.Phases.items():
+                    stats["phases"][phase].add(seconds)
+
+        exporter = self.__exporter
+        if exporter is not None:
+            try:
+                exporter(sample.toDictionary())
+            except Exception:
+                pass
+
+    def stats(self):
+        """Returns a snapshot of the metrics per operation"""
+        with self.__lock:
+            snapshot = {}
+            for operation, stats in self.__operations.items():
+                snapshot[operation] = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "errorRate": stats["errors"] / stats["count"] if stats["count"] > 0 else 0.0,
+                    "requests": stats["requests"],
+                    "bytesSent": stats["bytesSent"],
+                    "bytesReceived": stats["bytesReceived"],
+                    "bytesSaved": stats["bytesSaved"],
+                    "latency": stats["latency"].toDictionary(),
+                    "phases": dict((phase, histogram.toDictionary()) for phase, histogram in stats["phases"].items())}
+            return snapshot
+
+    def reset(self):
+        with self.__lock:
+            self.__operations.clear()
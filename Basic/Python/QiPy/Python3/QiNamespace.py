@@ -1,4 +1,4 @@
-import json
+import QiJson
 
 class QiNamespace(object):
     """description of class"""
@@ -11,7 +11,7 @@ class QiNamespace(object):
         self.__id = id
 
     def toString(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
 
     def toDictionary(self):
         # required properties
@@ -21,7 +21,7 @@ class QiNamespace(object):
 
     @staticmethod
     def fromString(content):
-         dictionary = json.loads(content)
+         dictionary = QiJson.loads(content)
          return QiNamespace.fromDictionary(dictionary)
 
     @staticmethod
@@ -0,0 +1,66 @@
+import email.utils
+import random
+import time
+
+import requests
+
+
+class QiRetryPolicy(object):
+    """Decides whether a failed request to the Qi Service is sent again and how long to wait first.
+    Idempotent requests (GET, PUT, DELETE and get-or-create POSTs) are retried on connection errors and
+    on the statuses in 'retryStatuses'; other POSTs only when the service refused them outright
+    (429, 503 or a failed connect), since the service may otherwise have applied them already."""
+
+    def __init__(self, maxRetries=3, backoffFactor=0.5, maxBackoff=30, jitter=True,
+                 retryStatuses=(429, 500, 502, 503, 504), respectRetryAfter=True, maxRetryAfter=120):
+        self.__maxRetries = maxRetries
+        self.__backoffFactor = backoffFactor
+        self.__maxBackoff = maxBackoff
+        self.__jitter = jitter
+        self.__retryStatuses = frozenset(retryStatuses)
+        self.__respectRetryAfter = respectRetryAfter
+        self.__maxRetryAfter = maxRetryAfter
+
+    @property
+    def MaxRetries(self):
+        return self.__maxRetries
+
+    def shouldRetry(self, attempt, idempotent, statusCode=None, error=None):
+        """Returns whether a request that failed on its 'attempt'-th try (counting from 0) should be sent again"""
+        if attempt >= self.__maxRetries:
+            return False
+
+        if error is not None:
+            if isinstance(error, requests.exceptions.ConnectTimeout):
+                return True
+            if idempotent and isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+                return True
+            return False
+
+        if statusCode not in self.__retryStatuses:
+            return False
+        return idempotent or statusCode in (429, 503)
+
+    def delay(self, attempt, retryAfter=None):
+        """Returns the seconds to wait before sending the request again, honoring a Retry-After header value"""
+        backoff = min(self.__maxBackoff, self.__backoffFactor * (2 ** attempt))
+        if self.__jitter:
+            backoff = random.uniform(0, backoff)
+
+        if self.__respectRetryAfter and retryAfter is not None:
+            wait = self.__parseRetryAfter(retryAfter)
+            if wait is not None:
+                backoff = max(backoff, min(wait, self.__maxRetryAfter))
+        return backoff
+
+    @staticmethod
+    def __parseRetryAfter(retryAfter):
+        # Retry-After is either a number of seconds or an HTTP date
+        try:
+            return max(0.0, float(retryAfter))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(retryAfter).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
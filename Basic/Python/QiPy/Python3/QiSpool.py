@@ -0,0 +1,310 @@
+import json
+import os
+import threading
+import time
+
+import QiJson
+from QiError import QiError
+from QiRetryPolicy import QiRetryPolicy
+
+
+_suffix = ".spool"
+_checkpoint = "checkpoint"
+
+
+class QiSpool(object):
+    """Append-only on-disk spool in front of insertValues. insertValues(namespace_id, stream_id, values)
+    only appends the values to the current segment file in 'directory' and returns; a background thread
+    replays the records to 'client' in the order they were written, retrying failures with the
+    back-off of 'retryPolicy' until they succeed, and deletes segments once all of their records are
+    acknowledged. What was not acknowledged is replayed when a spool is opened on the same directory
+    again, so a record can be sent twice if the process stops between sending and acknowledging it.
+    'fsync' is "always" (every record is synced before insertValues returns), "interval" (at most
+    'fsyncInterval' seconds of records can be lost) or "never" (left to the operating system).
+    A record the service rejects outright (a 4xx status other than 408 and 429), or that failed
+    'maxAttempts' times, is passed to 'onError(namespace_id, stream_id, payload, error)' and skipped;
+    by default other failures are retried forever. A record replayed from before the spool was opened
+    that is refused with 409 Conflict was inserted before, and counts as sent."""
+
+    def __init__(self, client, directory, segmentBytes=64*1024*1024, fsync="interval", fsyncInterval=1.0,
+                 retryPolicy=None, maxAttempts=None, onError=None):
+        if client is None:
+            raise TypeError
+        if directory is None:
+            raise TypeError
+        if fsync not in ("always", "interval", "never"):
+            raise ValueError("fsync must be 'always', 'interval' or 'never'")
+
+        self.__client = client
+        self.__directory = directory
+        self.__segmentBytes = segmentBytes
+        self.__fsync = fsync
+        self.__fsyncInterval = fsyncInterval
+        self.__retryPolicy = retryPolicy if retryPolicy is not None else QiRetryPolicy(maxBackoff=30)
+        self.__maxAttempts = maxAttempts
+        self.__onError = onError
+
+        self.__lock = threading.Lock()
+        self.__changed = threading.Condition(self.__lock)
+        self.__closed = False
+        self.__lastError = None
+        self.__sentRecords = 0
+        self.__failedRecords = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.__segments = self.__recover()
+        self.__readSegment, self.__readOffset = self.__loadCheckpoint()
+
+        # appends always go to a new segment, a torn record at the end of an old one is never extended
+        self.__writeSegment = self.__segments[-1] + 1 if len(self.__segments) > 0 else 1
+        # records in the segments before this one may have been sent before the spool was opened
+        self.__firstNewSegment = self.__writeSegment
+        self.__openSegment(self.__writeSegment)
+        if self.__readSegment not in self.__segments:
+            self.__readSegment = self.__segments[0]
+            self.__readOffset = 0
+        self.__lastSync = time.monotonic()
+
+        self.__thread = threading.Thread(target=self.__drain, name="QiSpool")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @property
+    def Directory(self):
+        return self.__directory
+
+    @property
+    def BacklogBytes(self):
+        """Bytes spooled but not yet acknowledged"""
+        with self.__lock:
+            return self.__backlog()
+
+    @property
+    def SentRecords(self):
+        return self.__sentRecords
+
+    @property
+    def FailedRecords(self):
+        return self.__failedRecords
+
+    @property
+    def LastError(self):
+        """The last error replaying a record, or None once a record was replayed after it"""
+        return self.__lastError
+
+    def insertValues(self, namespace_id, stream_id, values):
+        """Spools the values, defined by the list 'values' or JSON text, for the stream specified by 'stream_id'"""
+        if namespace_id is None:
+            raise TypeError
+        if stream_id is None:
+            raise TypeError
+        if values is None:
+            raise TypeError
+
+        if isinstance(values, bytes):
+            payload = values
+        elif isinstance(values, str):
+            payload = values.encode("utf-8")
+        else:
+            events = []
+            for value in values:
+                events.append(value.toDictionary() if callable(getattr(value, "toDictionary", None)) else value)
+            payload = QiJson.dumpBytes(events)
+        header = json.dumps([namespace_id, stream_id, len(payload)]).encode("utf-8")
+        record = header + b"\n" + payload + b"\n"
+
+        with self.__changed:
+            if self.__closed:
+                raise QiError("QiSpool is closed")
+            if self.__sizes[self.__writeSegment] > 0 and self.__sizes[self.__writeSegment] + len(record) > self.__segmentBytes:
+                self.__roll()
+            self.__file.write(record)
+            self.__file.flush()
+            if self.__fsync == "always" or (self.__fsync == "interval" and
+                                            time.monotonic() - self.__lastSync >= self.__fsyncInterval):
+                os.fsync(self.__file.fileno())
+                self.__lastSync = time.monotonic()
+            self.__sizes[self.__writeSegment] += len(record)
+            self.__changed.notify_all()
+
+    def drain(self, timeout=None):
+        """Waits until every record spooled so far is acknowledged; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__changed:
+            while self.__backlog() > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.__changed.wait(remaining)
+        return True
+
+    def close(self, timeout=0):
+        """Waits at most 'timeout' seconds (None for no limit) for the backlog to drain, then stops
+        the background thread; what is left is replayed the next time the directory is opened"""
+        with self.__changed:
+            if self.__closed:
+                return
+        if timeout != 0:
+            self.drain(timeout)
+        with self.__changed:
+            self.__closed = True
+            self.__changed.notify_all()
+        self.__thread.join()
+        with self.__lock:
+            if self.__fsync != "never":
+                os.fsync(self.__file.fileno())
+            self.__file.close()
+
+    def __path(self, segment):
+        return os.path.join(self.__directory, "{segment:016d}{suffix}".format(segment=segment, suffix=_suffix))
+
+    def __recover(self):
+        # drops what follows the last complete record of each segment, left there by a crash mid-append
+        self.__sizes = {}
+        segments = []
+        for name in os.listdir(self.__directory):
+            if name.endswith(_suffix) and name[:-len(_suffix)].isdigit():
+                segments.append(int(name[:-len(_suffix)]))
+        segments.sort()
+        for segment in segments:
+            path = self.__path(segment)
+            with open(path, "rb") as file:
+                end = 0
+                while True:
+                    record = self.__readRecord(file)
+                    if record is None:
+                        break
+                    end = file.tell()
+            if end < os.path.getsize(path):
+                with open(path, "r+b") as file:
+                    file.truncate(end)
+            self.__sizes[segment] = end
+        return segments
+
+    def __loadCheckpoint(self):
+        try:
+            with open(os.path.join(self.__directory, _checkpoint)) as file:
+                segment, offset = file.read().split()
+                return int(segment), int(offset)
+        except (IOError, ValueError):
+            return 0, 0
+
+    def __saveCheckpoint(self, segment, offset):
+        path = os.path.join(self.__directory, _checkpoint)
+        with open(path + ".tmp", "w") as file:
+            file.write("{segment} {offset}".format(segment=segment, offset=offset))
+            file.flush()
+            if self.__fsync == "always":
+                os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+
+    def __openSegment(self, segment):
+        self.__file = open(self.__path(segment), "ab")
+        self.__sizes[segment] = 0
+        self.__segments.append(segment)
+
+    def __roll(self):
+        if self.__fsync != "never":
+            os.fsync(self.__file.fileno())
+        self.__file.close()
+        self.__writeSegment += 1
+        self.__openSegment(self.__writeSegment)
+
+    def __backlog(self):
+        return sum(size for segment, size in self.__sizes.items() if segment > self.__readSegment) + \
+            self.__sizes.get(self.__readSegment, 0) - self.__readOffset
+
+    @staticmethod
+    def __readRecord(file):
+        # returns (namespace_id, stream_id, payload) or None at the end or at an incomplete record
+        header = file.readline()
+        if not header.endswith(b"\n"):
+            return None
+        try:
+            namespace_id, stream_id, length = json.loads(header.decode("utf-8"))
+        except ValueError:
+            return None
+        payload = file.read(length + 1)
+        if len(payload) != length + 1 or payload[-1:] != b"\n":
+            return None
+        return namespace_id, stream_id, payload[:-1]
+
+    def __nextPosition(self):
+        # called with the lock held; deletes the segments that were read to the end
+        while True:
+            if self.__readOffset < self.__sizes[self.__readSegment]:
+                return self.__readSegment, self.__readOffset
+            if self.__readSegment == self.__writeSegment:
+                return None
+            os.remove(self.__path(self.__readSegment))
+            del self.__sizes[self.__readSegment]
+            self.__segments.remove(self.__readSegment)
+            self.__readSegment = self.__segments[0]
+            self.__readOffset = 0
+            self.__saveCheckpoint(self.__readSegment, self.__readOffset)
+
+    def __read(self, segment, offset):
+        # the bytes up to the segment's recorded size are complete records, appends only go past them
+        with open(self.__path(segment), "rb") as file:
+            file.seek(offset)
+            record = self.__readRecord(file)
+            if record is None:
+                raise QiError("Corrupt record in spool segment {path} at {offset}".
+                              format(path=self.__path(segment), offset=offset))
+            return record, file.tell()
+
+    def __drain(self):
+        attempt = 0
+        while True:
+            with self.__changed:
+                position = self.__nextPosition()
+                while position is None and not self.__closed:
+                    self.__changed.wait(self.__fsyncInterval if self.__fsync == "interval" else None)
+                    if self.__fsync == "interval" and time.monotonic() - self.__lastSync >= self.__fsyncInterval:
+                        os.fsync(self.__file.fileno())
+                        self.__lastSync = time.monotonic()
+                    position = self.__nextPosition()
+                if self.__closed:
+                    return
+            (namespace_id, stream_id, payload), end = self.__read(*position)
+
+            error = None
+            try:
+                self.__client.insertValues(namespace_id, stream_id, payload.decode("utf-8"))
+            except Exception as e:
+                error = e
+            statusCode = getattr(error, "StatusCode", None)
+            if statusCode == 409 and position[0] < self.__firstNewSegment:
+                # the replayed events are already in the stream
+                error = None
+
+            if error is not None:
+                self.__lastError = error
+                attempt += 1
+                permanent = statusCode is not None and 400 <= statusCode < 500 and statusCode not in (408, 429)
+                if not permanent and (self.__maxAttempts is None or attempt < self.__maxAttempts):
+                    with self.__changed:
+                        self.__changed.wait(self.__retryPolicy.delay(min(attempt - 1, 16)))
+                    continue
+                if self.__onError is not None:
+                    try:
+                        self.__onError(namespace_id, stream_id, payload, error)
+                    except Exception:
+                        pass
+                self.__failedRecords += 1
+            else:
+                self.__lastError = None
+                self.__sentRecords += 1
+
+            attempt = 0
+            with self.__changed:
+                self.__readOffset = end
+                self.__saveCheckpoint(self.__readSegment, self.__readOffset)
+                self.__changed.notify_all()
@@ -0,0 +1,17 @@
+class QiStaticTokenProvider(object):
+    """Hands QiClient a fixed bearer token instead of acquiring one from AAD, for use against
+    QiLocalServer or with a token obtained elsewhere"""
+
+    def __init__(self, token="local"):
+        self.__headers = {"Authorization": "bearer %s" % token}
+
+    @property
+    def Expiration(self):
+        return float("inf")
+
+    def getHeaders(self):
+        """Returns the authorization header; callers must not modify it"""
+        return self.__headers
+
+    def close(self):
+        pass
@@ -1,4 +1,4 @@
-﻿import json
+﻿import QiJson
 from QiStreamIndex import QiStreamIndex
 
 class QiStream(object):
@@ -46,7 +46,7 @@ class QiStream(object):
         self.__indexes = indexes 
 
     def toJson(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
 
     def toDictionary(self):
         # required properties
@@ -1,5 +1,5 @@
 from enum import Enum
-import json
+import QiJson
 from QiStreamMode import QiStreamMode
 from QiStreamExtrapolation import QiStreamExtrapolation
 from QiStreamBehaviorOverride import QiStreamBehaviorOverride
@@ -47,7 +47,7 @@ class QiStreamBehavior(object):
         self.__overrides = overrides
 
     def toJson(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
 
     def toDictionary(self):
         # required properties
@@ -88,7 +88,7 @@ class QiStreamBehavior(object):
         if 'ExtrapolationMode' in content:
             behavior.ExtrapolationMode = QiStreamExtrapolation(content['ExtrapolationMode'])
         
-        if 'BehaviorId' in content:
+        if 'Overrides' in content:
             overrides = content['Overrides']
             if overrides is not None and len(overrides) > 0:
                 behavior.Overrides = []
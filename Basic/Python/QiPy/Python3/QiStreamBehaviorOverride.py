@@ -1,5 +1,5 @@
 from enum import Enum
-import json
+import QiJson
 from QiStreamMode import QiStreamMode
 
 class QiStreamBehaviorOverride(object):
@@ -23,15 +23,15 @@ class QiStreamBehaviorOverride(object):
         self.__qiTypePropertyId = qiTypePropertyId
 
     def toJson(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
 
     def toDictionary(self):
-        dictionary = { 'Mode' : self.Mode }
+        dictionary = { 'Mode' : self.Mode.value }
         
         if hasattr(self, 'QiTypePropertyId'):
             dictionary['QiTypePropertyId'] = self.QiTypePropertyId
 
-        return json.loads(dictionary)
+        return dictionary
 
     @staticmethod
     def fromDictionary(content):
@@ -41,9 +41,9 @@ class QiStreamBehaviorOverride(object):
             return streamBehaviorOverride
 
         if 'Mode' in content:
-            streamBehaviorOverride.Mode = content['Mode']
+            streamBehaviorOverride.Mode = QiStreamMode(content['Mode'])
 
         if 'QiTypePropertyId' in content:
-            stream.QiTypePropertyId = content['QiTypePropertyId']
+            streamBehaviorOverride.QiTypePropertyId = content['QiTypePropertyId']
             
-        return stream
\ No newline at end of file
+        return streamBehaviorOverride
\ No newline at end of file
@@ -1,3 +1,5 @@
+import QiJson
+
 class QiStreamIndex(object):
     """Qi Stream Index definitions"""
 
@@ -9,13 +11,13 @@ class QiStreamIndex(object):
         self.__qiTypePropertyId = qiTypePropertyId
 
     def toJson(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
     
     def toDictionary(self):
         # required properties
         dictionary = { 'QiTypePropertyId' : self.QiTypePropertyId }
 
-        return json.loads(dictionary)
+        return dictionary
 
     @staticmethod
     def fromDictionary(content):
@@ -0,0 +1,152 @@
+import threading
+import time
+
+import adal as adal
+
+# the shortest wait before refreshing a token, and the longest between retries of a failing refresh
+_minimumDelay = 5
+_maximumBackoff = 5*60
+
+
+class QiTokenProvider(object):
+    """Acquires AAD bearer tokens for a tenant and caches the authorization header, refreshing it
+    ahead of expiry on a background thread. One provider can be shared by many QiClients.
+
+    A token is refreshed 'refreshMargin' seconds before it expires, or half way through its lifetime
+    if that is later, so tokens shorter lived than the margin are not refreshed continually. Failed
+    refreshes are retried with a growing delay, and the cached token is used until it expires."""
+
+    __shared = {}
+    __sharedLock = threading.Lock()
+
+    def __init__(self, resource, authority, clientId, clientSecret, refreshMargin=5*60, backgroundRefresh=True):
+        self.__resource = resource
+        self.__authority = authority
+        self.__clientId = clientId
+        self.__clientSecret = clientSecret
+        self.__refreshMargin = refreshMargin
+        self.__backgroundRefresh = backgroundRefresh
+
+        self.__context = None
+        self.__headers = None
+        self.__expiration = 0
+        self.__refreshAt = 0
+        self.__lock = threading.Lock()
+        self.__timer = None
+        self.__closed = False
+        self.__lastError = None
+        # after a failed refresh the cached token is used without retrying until then
+        self.__retryAt = 0
+        self.__failures = 0
+
+    @staticmethod
+    def shared(resource, authority, clientId, clientSecret, **options):
+        """Returns the provider for these credentials, creating it on first use, so clients
+        for the same tenant share one token"""
+        key = (resource, authority, clientId)
+        with QiTokenProvider.__sharedLock:
+            provider = QiTokenProvider.__shared.get(key)
+            if provider is None or provider.__closed:
+                provider = QiTokenProvider(resource, authority, clientId, clientSecret, **options)
+                QiTokenProvider.__shared[key] = provider
+            return provider
+
+    @property
+    def Expiration(self):
+        return self.__expiration
+
+    @property
+    def LastError(self):
+        """The error of the last failed refresh, or None once a refresh succeeded after it"""
+        return self.__lastError
+
+    def getHeaders(self):
+        """Returns the cached authorization header; callers must not modify it"""
+        headers = self.__headers
+        remaining = self.__expiration - time.time()
+        if headers is not None:
+            if time.time() < self.__refreshAt:
+                return headers
+            # the background refresh is already on its way, keep using the token while it is valid
+            if self.__backgroundRefresh and self.__timer is not None and remaining > 30:
+                return headers
+
+        with self.__lock:
+            # another thread may have refreshed the token while this one waited
+            now = time.time()
+            if self.__headers is not None and now < self.__refreshAt:
+                return self.__headers
+            if self.__headers is not None and self.__expiration > now and now < self.__retryAt:
+                return self.__headers
+            try:
+                return self.__refresh()
+            except Exception as e:
+                # a token that has not expired yet is still good, only fail once it has
+                if self.__headers is None or self.__expiration <= time.time():
+                    raise
+                self.__failed(e)
+                return self.__headers
+
+    def close(self):
+        """Stops the background refresh"""
+        with self.__lock:
+            self.__closed = True
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+
+    # private methods
+
+    def __refresh(self):
+        # called with the lock held
+        if self.__context is None:
+            self.__context = adal.AuthenticationContext(self.__authority, validate_authority=True)
+        token = self.__context.acquire_token_with_client_credentials(self.__resource, self.__clientId, self.__clientSecret)
+
+        if token is None:
+            raise Exception("Failed to retrieve AAD Token")
+
+        now = time.time()
+        expiresIn = float(token['expiresIn'])
+        delay = max(expiresIn - self.__refreshMargin, expiresIn / 2, min(_minimumDelay, expiresIn))
+        self.__expiration = now + expiresIn
+        self.__refreshAt = now + delay
+        self.__headers = {"Authorization": "bearer %s" % token['accessToken']}
+        self.__lastError = None
+        self.__retryAt = 0
+        self.__failures = 0
+        self.__schedule(delay)
+        return self.__headers
+
+    def __schedule(self, delay):
+        if not self.__backgroundRefresh or self.__closed:
+            return
+        if self.__timer is not None:
+            self.__timer.cancel()
+        self.__timer = threading.Timer(delay, self.__refreshInBackground)
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def __refreshInBackground(self):
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__timer = None
+            try:
+                self.__refresh()
+            except Exception as e:
+                # requests keep using the current token until it runs out
+                self.__failed(e)
+
+    def __failed(self, error):
+        # called with the lock held; tries again after a delay that doubles with each failure in a row,
+        # but within the remaining lifetime of a token that is still valid
+        self.__lastError = error
+        self.__failures += 1
+        delay = min(_maximumBackoff, _minimumDelay * 2 ** (self.__failures - 1))
+        remaining = self.__expiration - time.time()
+        if remaining > 0:
+            delay = min(delay, max(_minimumDelay, remaining / 2))
+        self.__retryAt = time.time() + delay
+        if self.__timer is None:
+            self.__schedule(delay)
@@ -1,6 +1,6 @@
 ﻿from enum import Enum
 from JsonEncoder import Encoder
-import json
+import QiJson
 import inspect
 from QiTypeCode import QiTypeCode
 from QiTypeProperty import QiTypeProperty
@@ -53,7 +53,7 @@ class QiType(object):
         self.__properties = properties
 
     def toJson(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
 
     def toDictionary(self):
         # required properties
@@ -1,5 +1,5 @@
 from JsonEncoder import Encoder
-import json
+import QiJson
 import inspect
 from QiViewProperty import QiViewProperty
 
@@ -28,7 +28,7 @@ class QiViewMap(object):
         self.__properties = properties
 
     def toJson(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
 
     def toDictionary(self):
         # required properties
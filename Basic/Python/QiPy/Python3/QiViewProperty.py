@@ -1,4 +1,4 @@
-import json
+import QiJson
 import QiView
 
 class QiViewProperty(object):
@@ -25,7 +25,7 @@ class QiViewProperty(object):
         self.__qiView = description
         
     def toJson(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
 
     def toDictionary(self):
         # required properties
@@ -0,0 +1,282 @@
+import bisect
+import collections
+import re
+import threading
+
+_isoTime = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?Z?$")
+
+
+def indexKey(index):
+    """Returns a sortable form of the stream index 'index', or None when the cache cannot order it;
+    numbers and UTC ISO 8601 times are supported"""
+    if isinstance(index, bool):
+        return None
+    if isinstance(index, (int, float)):
+        return index
+    if isinstance(index, str):
+        match = _isoTime.match(index)
+        if match is not None:
+            # the fraction is compared as nanoseconds so "00:00:00Z" sorts before "00:00:00.5Z"
+            return match.group(1), int((match.group(2) or "0")[:9].ljust(9, "0"))
+    return None
+
+
+class _QiWindowEntry(object):
+    """The events of one stream (or view of it) held locally and the index intervals they cover"""
+
+    def __init__(self, keyId):
+        self.keyId = keyId
+        self.keys = []
+        self.contents = []
+        self.sizes = []
+        # disjoint, sorted [low key, low index, high key, high index]; every event in them is held
+        self.intervals = []
+        self.size = 0
+
+    def covering(self, key):
+        """Returns the interval containing 'key', or None"""
+        for interval in self.intervals:
+            if interval[0] <= key <= interval[2]:
+                return interval
+            if interval[0] > key:
+                break
+        return None
+
+    def put(self, low, lowIndex, high, highIndex, keys, contents, sizes):
+        # what the service returned for [low, high] replaces what was held there
+        first = bisect.bisect_left(self.keys, low)
+        last = bisect.bisect_right(self.keys, high)
+        self.size += sum(sizes) - sum(self.sizes[first:last])
+        self.keys[first:last] = keys
+        self.contents[first:last] = contents
+        self.sizes[first:last] = sizes
+
+        merged = [low, lowIndex, high, highIndex]
+        intervals = []
+        for interval in self.intervals:
+            if interval[2] < merged[0] or interval[0] > merged[2]:
+                intervals.append(interval)
+                continue
+            if interval[0] < merged[0]:
+                merged[0:2] = interval[0:2]
+            if interval[2] > merged[2]:
+                merged[2:4] = interval[2:4]
+        intervals.append(merged)
+        intervals.sort(key=lambda interval: interval[0])
+        self.intervals = intervals
+
+
+class QiWindowCache(object):
+    """In-process cache of stream events for QiClient's getWindowValues and getRangeValues. For each
+    stream (and view) it remembers which index intervals are held, so a window that is partly held
+    only fetches the missing parts; adjacent and overlapping intervals are merged. Streams are evicted,
+    least recently used first, to keep the events within 'maxBytes' of JSON; a read larger than that is
+    not cached. Writes made through the client drop the stream's events; writes made elsewhere are not
+    seen, so the cache suits history that does not change. Only streams with a single numeric or DateTime
+    key are cached, and only events that carry the key."""
+
+    def __init__(self, maxBytes=64*1024*1024):
+        if maxBytes < 1:
+            raise ValueError("maxBytes must be at least 1")
+        self.__maxBytes = maxBytes
+        self.__entries = collections.OrderedDict()
+        self.__generations = {}
+        # the key property of each stream (and view) cached so far, kept when its events are evicted
+        self.__keyIds = {}
+        self.__size = 0
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__fetches = 0
+        self.__evictions = 0
+
+    @property
+    def Hits(self):
+        return self.__hits
+
+    @property
+    def Misses(self):
+        return self.__misses
+
+    @property
+    def Evictions(self):
+        return self.__evictions
+
+    @property
+    def Size(self):
+        """Bytes of JSON held"""
+        return self.__size
+
+    def generation(self, namespace_id, stream_id):
+        """Returns a number that changes whenever the stream's events are invalidated; pass it to the
+        put methods so what was read before a write is not cached after it"""
+        with self.__lock:
+            return self.__generations.get((namespace_id, stream_id), 0)
+
+    def keyId(self, namespace_id, stream_id, view_id):
+        """Returns the key property of the stream, or None when nothing was cached for it since it last
+        changed"""
+        with self.__lock:
+            return self.__keyIds.get((namespace_id, stream_id, view_id))
+
+    def getWindow(self, namespace_id, stream_id, view_id, start, end, record=True):
+        """Returns the event dictionaries from 'start' to 'end', or None when they are not all held"""
+        low, high = indexKey(start), indexKey(end)
+        with self.__lock:
+            entry = self.__entries.get((namespace_id, stream_id, view_id))
+            interval = entry.covering(low) if entry is not None and low is not None else None
+            if interval is None or high is None or interval[2] < high:
+                if record:
+                    self.__misses += 1
+                return None
+            self.__entries.move_to_end((namespace_id, stream_id, view_id))
+            if record:
+                self.__hits += 1
+            return entry.contents[bisect.bisect_left(entry.keys, low):bisect.bisect_right(entry.keys, high)]
+
+    def held(self, namespace_id, stream_id, view_id, start, end):
+        """Returns the event dictionaries held from 'start' to 'end', which may leave gaps; see missing"""
+        low, high = indexKey(start), indexKey(end)
+        with self.__lock:
+            entry = self.__entries.get((namespace_id, stream_id, view_id))
+            if entry is None or low is None or high is None:
+                return []
+            return entry.contents[bisect.bisect_left(entry.keys, low):bisect.bisect_right(entry.keys, high)]
+
+    def missing(self, namespace_id, stream_id, view_id, start, end):
+        """Returns the (start, end) windows to fetch so that all of 'start' to 'end' is held; they
+        include the ends of the held intervals they join, so nothing between them is left out"""
+        low, high = indexKey(start), indexKey(end)
+        with self.__lock:
+            entry = self.__entries.get((namespace_id, stream_id, view_id))
+            intervals = [] if entry is None else [interval for interval in entry.intervals
+                                                  if interval[2] >= low and interval[0] <= high]
+        windows = []
+        position, positionIndex = low, start
+        for interval in intervals:
+            if interval[0] > position:
+                windows.append((positionIndex, interval[1]))
+            if interval[2] > position:
+                position, positionIndex = interval[2], interval[3]
+        if position < high or len(intervals) == 0:
+            windows.append((positionIndex, end))
+        return windows
+
+    def putWindow(self, namespace_id, stream_id, view_id, generation, keyId, start, end, contents, size):
+        """Holds 'contents', the events the service returned from 'start' to 'end' in 'size' bytes;
+        returns False when they were not kept because the stream was written to since 'generation'"""
+        return self.__put(namespace_id, stream_id, view_id, generation, keyId, start, end, contents, size)
+
+    def getRange(self, namespace_id, stream_id, view_id, start, skip, count, reverse):
+        """Returns 'count' event dictionaries after skipping 'skip' from 'start' on, in index order or
+        backwards when 'reverse', or None when they are not all held"""
+        key = indexKey(start)
+        with self.__lock:
+            entry = self.__entries.get((namespace_id, stream_id, view_id))
+            interval = entry.covering(key) if entry is not None and key is not None else None
+            contents = None
+            if interval is not None and not reverse:
+                first = bisect.bisect_left(entry.keys, key) + skip
+                if bisect.bisect_right(entry.keys, interval[2]) - first >= count:
+                    contents = entry.contents[first:first + count]
+            elif interval is not None:
+                last = bisect.bisect_right(entry.keys, key) - skip
+                if last - bisect.bisect_left(entry.keys, interval[0]) >= count:
+                    contents = entry.contents[last - count:last][::-1]
+            if contents is None:
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end((namespace_id, stream_id, view_id))
+            self.__hits += 1
+            return contents
+
+    def putRange(self, namespace_id, stream_id, view_id, generation, keyId, start, skip, reverse, contents, size):
+        """Holds 'contents', the events the service returned for a range from 'start'; see putWindow"""
+        if len(contents) == 0:
+            return True
+        first, last = contents[0].get(keyId), contents[-1].get(keyId)
+        if first is None or last is None:
+            return False
+        if reverse:
+            first, last = last, first
+            contents = contents[::-1]
+        # the events skipped over were not returned, so the interval starts at the first one that was
+        low = start if skip == 0 and not reverse else first
+        high = start if skip == 0 and reverse else last
+        return self.__put(namespace_id, stream_id, view_id, generation, keyId, low, high, contents, size)
+
+    def invalidate(self, namespace_id, stream_id=None):
+        """Drops the events of the stream, and of the views of it, or of every stream in the namespace
+        when 'stream_id' is None"""
+        with self.__lock:
+            for key in [k for k in self.__entries if k[0] == namespace_id and (stream_id is None or k[1] == stream_id)]:
+                self.__remove(key)
+            for key in [k for k in self.__keyIds if k[0] == namespace_id and (stream_id is None or k[1] == stream_id)]:
+                del self.__keyIds[key]
+            if stream_id is None:
+                for key in [k for k in self.__generations if k[0] == namespace_id]:
+                    self.__generations[key] += 1
+            else:
+                key = (namespace_id, stream_id)
+                self.__generations[key] = self.__generations.get(key, 0) + 1
+
+    def invalidateView(self, namespace_id, view_id):
+        """Drops the events read through the view 'view_id' in the namespace"""
+        with self.__lock:
+            for key in [k for k in self.__entries if k[0] == namespace_id and k[2] == view_id]:
+                self.__remove(key)
+                self.__generations[key[:2]] = self.__generations.get(key[:2], 0) + 1
+            for key in [k for k in self.__keyIds if k[0] == namespace_id and k[2] == view_id]:
+                del self.__keyIds[key]
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__keyIds.clear()
+            self.__size = 0
+            for key in self.__generations:
+                self.__generations[key] += 1
+
+    def stats(self):
+        with self.__lock:
+            return {"hits": self.__hits, "misses": self.__misses, "fetches": self.__fetches,
+                    "evictions": self.__evictions, "streams": len(self.__entries), "bytes": self.__size}
+
+    def __put(self, namespace_id, stream_id, view_id, generation, keyId, start, end, contents, size):
+        low, high = indexKey(start), indexKey(end)
+        # an event without its key cannot be placed, so nothing read with it is held
+        keys = [indexKey(content.get(keyId)) for content in contents]
+        key = (namespace_id, stream_id, view_id)
+        with self.__lock:
+            self.__fetches += 1
+            if self.__generations.get((namespace_id, stream_id), 0) != generation:
+                return False
+            self.__keyIds[key] = keyId
+        if low is None or high is None or None in keys or high < low or size > self.__maxBytes:
+            return False
+        if any(keys[i] > keys[i + 1] for i in range(len(keys) - 1)):
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            keys = [keys[i] for i in order]
+            contents = [contents[i] for i in order]
+        sizes = [size // len(contents)] * len(contents) if len(contents) > 0 else []
+
+        with self.__lock:
+            if self.__generations.get((namespace_id, stream_id), 0) != generation:
+                return False
+            entry = self.__entries.get(key)
+            if entry is None or entry.keyId != keyId:
+                if entry is not None:
+                    self.__remove(key)
+                entry = self.__entries[key] = _QiWindowEntry(keyId)
+            before = entry.size
+            entry.put(low, start, high, end, keys, contents, sizes)
+            self.__size += entry.size - before
+            self.__entries.move_to_end(key)
+            while self.__size > self.__maxBytes and len(self.__entries) > 0:
+                self.__remove(next(iter(self.__entries)))
+                self.__evictions += 1
+            return key in self.__entries
+
+    def __remove(self, key):
+        entry = self.__entries.pop(key)
+        self.__size -= entry.size
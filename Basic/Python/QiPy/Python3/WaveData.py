@@ -1,7 +1,7 @@
 import datetime
 import math
-import json
-import inspect
+import QiJson
+from QiCodec import QiCodec
 
 class WaveData:
     """Represents a data point to be injected into Qi Service"""
@@ -84,15 +84,10 @@ class WaveData:
         return isinstance(v, property)
 
     def toJson(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
 
     def toDictionary(self):
-        dictionary = { }
-        for prop in inspect.getmembers(type(self), lambda v : isinstance(v, property)):
-            if hasattr(self, prop[0]):
-                dictionary[prop[0]] = prop[1].fget(self)
-
-        return dictionary
+        return QiCodec.forClass(type(self)).toDictionary(self)
 
     @staticmethod
     def fromJson(jsonObj):
@@ -100,22 +95,11 @@ class WaveData:
 
     @staticmethod
     def fromDictionary(content):
-        wave = WaveData()
-
         if len(content) == 0:
-            return wave
-
-        for prop in inspect.getmembers(type(wave), lambda v : isinstance(v, property)):
-            # Pre-Assign the default
-            prop[1].fset(wave, 0)
+            return WaveData()
 
-            # If found in JSON object, then set
-            if prop[0] in content:
-                value = content[prop[0]]
-                if value is not None:
-                    prop[1].fset(wave, value)
-
-        return wave
+        # Pre-Assigns the default to properties missing from the JSON object
+        return QiCodec.forClass(WaveData).fromDictionary(content, default=0)
 
 
 
@@ -160,15 +144,10 @@ class WaveDataInteger:
         return isinstance(v, property)
 
     def toJson(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
 
     def toDictionary(self):
-        dictionary = { }
-        for prop in inspect.getmembers(type(self), lambda v : isinstance(v, property)):
-            if hasattr(self, prop[0]):
-                dictionary[prop[0]] = prop[1].fget(self)
-
-        return dictionary
+        return QiCodec.forClass(type(self)).toDictionary(self)
 
     @staticmethod
     def fromJson(jsonObj):
@@ -176,21 +155,11 @@ class WaveDataInteger:
 
     @staticmethod
     def fromDictionary(content):
-        wave = WaveDataInteger()
-
         if len(content) == 0:
-            return wave
+            return WaveDataInteger()
 
-        for prop in inspect.getmembers(type(wave), lambda v : isinstance(v, property)):
-            # Pre-Assign the default
-            prop[1].fset(wave, 0)
-
-            # If found in JSON object, then set
-            if prop[0] in content:
-                value = content[prop[0]]
-                if value is not None:
-                    prop[1].fset(wave, value)
-        return wave
+        # Pre-Assigns the default to properties missing from the JSON object
+        return QiCodec.forClass(WaveDataInteger).fromDictionary(content, default=0)
 
 
 class WaveDataTarget:
@@ -274,15 +243,10 @@ class WaveDataTarget:
         return isinstance(v, property)
 
     def toJson(self):
-        return json.dumps(self.toDictionary())
+        return QiJson.dumps(self.toDictionary())
 
     def toDictionary(self):
-        dictionary = { }
-        for prop in inspect.getmembers(type(self), lambda v : isinstance(v, property)):
-            if hasattr(self, prop[0]):
-                dictionary[prop[0]] = prop[1].fget(self)
-
-        return dictionary
+        return QiCodec.forClass(type(self)).toDictionary(self)
 
     @staticmethod
     def fromJson(jsonObj):
@@ -290,19 +254,8 @@ class WaveDataTarget:
 
     @staticmethod
     def fromDictionary(content):
-        wave = WaveDataTarget()
-
         if len(content) == 0:
-            return wave
-
-        for prop in inspect.getmembers(type(wave), lambda v : isinstance(v, property)):
-            # Pre-Assign the default
-            prop[1].fset(wave, 0)
-
-            # If found in JSON object, then set
-            if prop[0] in content:
-                value = content[prop[0]]
-                if value is not None:
-                    prop[1].fset(wave, value)
+            return WaveDataTarget()
 
-        return wave
+        # Pre-Assigns the default to properties missing from the JSON object
+        return QiCodec.forClass(WaveDataTarget).fromDictionary(content, default=0)
@@ -0,0 +1,69 @@
+import datetime
+
+import QiJson
+from WaveData import WaveData
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# the WaveData properties in the order they are generated
+properties = ("Order", "Tau", "Radians", "Sin", "Cos", "Tan", "Sinh", "Cosh", "Tanh")
+
+_millisecondsPerDay = 24 * 60 * 60 * 1000
+
+def _requireNumpy():
+    if numpy is None:
+        raise ImportError("numpy is required to generate waves in bulk, install it with 'pip install numpy'")
+
+def _millisecondsOfDay(time):
+    return (time - time.replace(hour=0, minute=0, second=0, microsecond=0)) / datetime.timedelta(milliseconds=1)
+
+def waveColumns(start, interval, multiplier, count, order=0, step=datetime.timedelta(seconds=0.2)):
+    """Returns 'count' WaveData events as a dictionary of numpy arrays keyed by property name. The events
+    are those program.nextWave builds for the times start, start + step, ... and orders order, order + 1, ...;
+    'interval' is the period of the wave as a time of day"""
+    _requireNumpy()
+    intervalMilliseconds = _millisecondsOfDay(interval)
+    if intervalMilliseconds <= 0:
+        raise ValueError("interval must be after midnight")
+
+    times = numpy.arange(count, dtype="float64")
+    times *= step / datetime.timedelta(milliseconds=1)
+    times += _millisecondsOfDay(start)
+    # like nextWave, the time of day starts over at midnight
+    numpy.remainder(times, _millisecondsPerDay, out=times)
+    radians = numpy.remainder(times, intervalMilliseconds, out=times)
+    radians *= 2 * numpy.pi / intervalMilliseconds
+
+    columns = {"Order": numpy.arange(order, order + count, dtype="int64"),
+               "Tau": radians / (2 * numpy.pi),
+               "Radians": radians}
+    for name, function in (("Sin", numpy.sin), ("Cos", numpy.cos), ("Tan", numpy.tan),
+                           ("Sinh", numpy.sinh), ("Cosh", numpy.cosh), ("Tanh", numpy.tanh)):
+        column = function(radians)
+        column *= multiplier
+        columns[name] = column
+    return columns
+
+def waveDictionaries(columns):
+    """Converts the columns from waveColumns to a list of event dictionaries"""
+    rows = zip(*[columns[name].tolist() for name in properties])
+    return [dict(zip(properties, row)) for row in rows]
+
+def waveEvents(start, interval, multiplier, count, order=0, step=datetime.timedelta(seconds=0.2)):
+    """Returns 'count' WaveData objects, see waveColumns; building the objects costs far more than
+    computing the columns, use those or wavePayload where the objects are not needed"""
+    columns = waveColumns(start, interval, multiplier, count, order, step)
+    events = []
+    for row in zip(*[columns[name].tolist() for name in properties]):
+        wave = WaveData()
+        wave.Order, wave.Tau, wave.Radians, wave.Sin, wave.Cos, wave.Tan, wave.Sinh, wave.Cosh, wave.Tanh = row
+        events.append(wave)
+    return events
+
+def wavePayload(start, interval, multiplier, count, order=0, step=datetime.timedelta(seconds=0.2)):
+    """Returns 'count' WaveData events as the UTF-8 JSON insertValues, updateValues and replaceValues
+    accept in place of a list of values, see waveColumns"""
+    return QiJson.dumpBytes(waveDictionaries(waveColumns(start, interval, multiplier, count, order, step)))
@@ -0,0 +1,66 @@
+"""The WaveData type, events and streams shared by the benchmarks and the load generator."""
+
+import math
+
+from QiStream import QiStream
+from QiType import QiType
+from QiTypeCode import QiTypeCode
+from QiTypeProperty import QiTypeProperty
+from WaveData import WaveData
+
+
+def waveDataType(typeId="WaveData_SampleType"):
+    intType = QiType()
+    intType.Id = "intType"
+    intType.QiTypeCode = QiTypeCode.Int32
+
+    doubleType = QiType()
+    doubleType.Id = "doubleType"
+    doubleType.QiTypeCode = QiTypeCode.Double
+
+    properties = []
+    for name in ["Order", "Tau", "Radians", "Sin", "Cos", "Tan", "Sinh", "Cosh", "Tanh"]:
+        prop = QiTypeProperty()
+        prop.Id = name
+        prop.QiType = intType if name == "Order" else doubleType
+        prop.IsKey = name == "Order"
+        properties.append(prop)
+
+    wave = QiType()
+    wave.Id = typeId
+    wave.Name = "WaveDataSample"
+    wave.QiTypeCode = QiTypeCode.Object
+    wave.Properties = properties
+    return wave
+
+
+def waves(count, start=0):
+    events = []
+    for order in range(start, start + count):
+        radians = (order % 360) * math.pi / 180
+        wave = WaveData()
+        wave.Order = order
+        wave.Radians = radians
+        wave.Tau = radians / (2 * math.pi)
+        wave.Sin = 2.0 * math.sin(radians)
+        wave.Cos = 2.0 * math.cos(radians)
+        wave.Tan = 2.0 * math.tan(radians)
+        wave.Sinh = 2.0 * math.sinh(radians)
+        wave.Cosh = 2.0 * math.cosh(radians)
+        wave.Tanh = 2.0 * math.tanh(radians)
+        events.append(wave)
+    return events
+
+
+def createWaveStreams(client, namespace_id, stream_ids, description=None):
+    """Creates the WaveData type and a stream of it for each of 'stream_ids'; returns the type"""
+    qiType = client.getOrCreateType(namespace_id, waveDataType())
+    for stream_id in stream_ids:
+        stream = QiStream()
+        stream.Id = stream_id
+        stream.TypeId = qiType.Id
+        if description is not None:
+            stream.Name = stream_id
+            stream.Description = description
+        client.createOrUpdateStream(namespace_id, stream)
+    return qiType
@@ -0,0 +1,314 @@
+"""Generates synthetic WaveData load against Qi: creates a number of streams, then writes to and
+reads from them at a target aggregate event rate with a mix of operations, reporting the rate
+achieved and the latency of every operation.
+
+    python loadGenerator.py
+    python loadGenerator.py --streams 100 --rate 50000 --batch-size 500 --duration 60
+    python loadGenerator.py --mix insert=60,update=20,replace=10,read=10 --url http://localhost:8080
+    python loadGenerator.py --config config.ini --namespace LoadTest
+
+Without --url or --config a QiLocalServer is started in this process. --config reads the
+endpoint and credentials from the sample's config.ini. Calls are scheduled at fixed times, one
+every batch-size / rate seconds, and spread over the streams in turn; latency is measured from
+the time a call was due, so the wait for a free worker counts when the client falls behind. At
+most twice --concurrency calls wait for a worker; calls that come due while that many are
+waiting are skipped and reported as missed rather than queued without bound.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import configparser
+import datetime
+import json
+import random
+import sys
+import threading
+import time
+
+from QiBoundaryType import QiBoundaryType
+from QiClient import QiClient
+from QiLocalServer import QiLocalServer
+from QiStaticTokenProvider import QiStaticTokenProvider
+from WaveData import WaveData
+import WaveGenerator
+from QiMetrics import percentile
+from WaveSamples import createWaveStreams, waves
+
+
+_operations = ["insert", "update", "replace", "read"]
+
+
+class LoadStream(object):
+    """The orders written to one stream so far, so updates, replaces and reads go to existing events"""
+
+    def __init__(self, stream_id):
+        self.__id = stream_id
+        self.__lock = threading.Lock()
+        self.__next = 0
+        # every order below this was inserted; batches that finished past it wait in __finished by first order
+        self.__written = 0
+        self.__finished = {}
+
+    @property
+    def Id(self):
+        return self.__id
+
+    def reserve(self, count):
+        """Returns the first order of 'count' new events"""
+        with self.__lock:
+            order = self.__next
+            self.__next += count
+            return order
+
+    def written(self, order, count):
+        """Records that the batch of 'count' events from 'order' was inserted; a batch that failed is never
+        recorded, so the orders after it are not used by other operations"""
+        with self.__lock:
+            self.__finished[order] = count
+            while self.__written in self.__finished:
+                self.__written += self.__finished.pop(self.__written)
+
+    def existing(self, count):
+        """Returns the first order of 'count' events already written, or None"""
+        with self.__lock:
+            if self.__written < count:
+                return None
+            return random.randrange(0, self.__written - count + 1)
+
+
+class LoadStats(object):
+    """Latencies and counts per operation, for the whole run and for the current report interval"""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__total = collections.defaultdict(list)
+        self.__interval = collections.defaultdict(list)
+        self.__events = collections.defaultdict(int)
+        self.__errors = collections.defaultdict(int)
+        self.__missed = 0
+        self.__lastError = None
+
+    def record(self, operation, latency, events, error=None):
+        with self.__lock:
+            if error is not None:
+                self.__errors[operation] += 1
+                self.__lastError = error
+                return
+            self.__total[operation].append(latency)
+            self.__interval[operation].append(latency)
+            self.__events[operation] += events
+
+    def miss(self):
+        with self.__lock:
+            self.__missed += 1
+
+    def takeInterval(self):
+        with self.__lock:
+            interval = self.__interval
+            self.__interval = collections.defaultdict(list)
+            return interval
+
+    def summary(self, seconds):
+        with self.__lock:
+            results = []
+            for operation in _operations:
+                latencies = sorted(self.__total.get(operation, []))
+                results.append({
+                    "operation": operation, "calls": len(latencies), "events": self.__events.get(operation, 0),
+                    "errors": self.__errors.get(operation, 0),
+                    "eventsPerSecond": self.__events.get(operation, 0) / seconds if seconds > 0 else 0.0,
+                    "p50": percentile(latencies, 0.50), "p95": percentile(latencies, 0.95),
+                    "p99": percentile(latencies, 0.99), "max": latencies[-1] if latencies else 0.0})
+            return results, self.__missed, self.__lastError
+
+
+def parseMix(text):
+    mix = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        operation, _, weight = item.partition("=")
+        operation = operation.strip()
+        if operation not in _operations:
+            raise argparse.ArgumentTypeError("unknown operation {operation}".format(operation=operation))
+        mix[operation] = float(weight or 1)
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("the mix needs at least one operation with a positive weight")
+    return mix
+
+
+def createClient(args):
+    """Returns the client, its namespace and the local server started for it, if any"""
+    if args.config:
+        config = configparser.ConfigParser()
+        config.read(args.config)
+        client = QiClient(config.get("Access", "Tenant"), config.get("Access", "Address"),
+                          config.get("Credentials", "Resource"), config.get("Credentials", "Authority"),
+                          config.get("Credentials", "ClientId"), config.get("Credentials", "ClientSecret"),
+                          poolMaxSize=args.concurrency)
+        return client, args.namespace or config.get("Configurations", "Namespace"), None
+
+    server = None
+    url = args.url
+    if url is None:
+        server = QiLocalServer(latency=args.latency).start()
+        url = server.Url
+    client = QiClient("load", url, None, None, None, None, poolMaxSize=args.concurrency,
+                      tokenProvider=QiStaticTokenProvider())
+    return client, args.namespace or "LoadTest", server
+
+
+def createStreams(client, namespace_id, count, prefix):
+    ids = ["{prefix}_{i}".format(prefix=prefix, i=i) for i in range(count)]
+    qiType = createWaveStreams(client, namespace_id, ids, "Synthetic WaveData load")
+    return qiType, [LoadStream(stream_id) for stream_id in ids]
+
+
+def makeEvents(start, count, order, multiplier):
+    # NumPy makes generating the events cheap enough not to skew the load; without it the scalar path is used
+    if WaveGenerator.numpy is not None:
+        return WaveGenerator.wavePayload(start, datetime.datetime(2017, 1, 1, 0, 1), multiplier, count, order)
+    return waves(count, order)
+
+
+def runCall(client, namespace_id, operation, stream, batchSize, start):
+    if operation != "insert":
+        order = stream.existing(batchSize)
+        if order is None:
+            operation = "insert"
+    if operation == "insert":
+        order = stream.reserve(batchSize)
+        client.insertValues(namespace_id, stream.Id, makeEvents(start, batchSize, order, 2.0))
+        stream.written(order, batchSize)
+    elif operation == "update":
+        client.updateValues(namespace_id, stream.Id, makeEvents(start, batchSize, order, 4.0))
+    elif operation == "replace":
+        client.replaceValues(namespace_id, stream.Id, makeEvents(start, batchSize, order, 10.0))
+    elif operation == "read":
+        if random.random() < 0.5:
+            client.getWindowValues(namespace_id, stream.Id, WaveData, order, order + batchSize - 1)
+        else:
+            client.getRangeValues(namespace_id, stream.Id, WaveData, order, 0, batchSize, False, QiBoundaryType.Exact)
+    return operation
+
+
+def report(stats, elapsed, interval):
+    parts = []
+    total = 0
+    for operation in _operations:
+        latencies = sorted(interval.get(operation, []))
+        if len(latencies) == 0:
+            continue
+        total += len(latencies)
+        parts.append("{operation} {calls} p50 {p50:.1f} p99 {p99:.1f} ms".format(
+            operation=operation, calls=len(latencies), p50=percentile(latencies, 0.50) * 1000,
+            p99=percentile(latencies, 0.99) * 1000))
+    print("[{elapsed:6.1f}s] {calls} calls: {parts}".format(elapsed=elapsed, calls=total, parts=", ".join(parts)))
+
+
+def run(client, namespace_id, streams, args):
+    mix = parseMix(args.mix)
+    operations = list(mix.keys())
+    weights = [mix[operation] for operation in operations]
+    period = args.batch_size / float(args.rate)
+    stats = LoadStats()
+    pending = threading.Semaphore(args.concurrency * 2)
+    start = datetime.datetime(2017, 1, 1)
+
+    def call(operation, stream, due):
+        try:
+            done = runCall(client, namespace_id, operation, stream, args.batch_size, start)
+            stats.record(done, time.perf_counter() - due, args.batch_size)
+        except Exception as e:
+            stats.record(operation, time.perf_counter() - due, 0, e)
+        finally:
+            pending.release()
+
+    began = time.perf_counter()
+    nextReport = began + args.report_interval
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        i = 0
+        while True:
+            due = began + i * period
+            if due - began >= args.duration:
+                break
+            now = time.perf_counter()
+            if now >= nextReport:
+                report(stats, now - began, stats.takeInterval())
+                while nextReport <= now:
+                    nextReport += args.report_interval
+            if due > now:
+                time.sleep(min(due, nextReport) - now)
+                continue
+            if pending.acquire(blocking=False):
+                executor.submit(call, random.choices(operations, weights)[0], streams[i % len(streams)], due)
+            else:
+                stats.miss()
+            i += 1
+    elapsed = time.perf_counter() - began
+    return stats.summary(elapsed) + (elapsed,)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generates synthetic WaveData load against Qi")
+    parser.add_argument("--url", help="Qi endpoint used with a static token; a QiLocalServer is started when "
+                                      "neither --url nor --config is given")
+    parser.add_argument("--config", help="read the endpoint and credentials from this config.ini")
+    parser.add_argument("--latency", type=float, default=0, help="seconds the local server adds to every request")
+    parser.add_argument("--namespace", help="namespace to use, the one in --config or LoadTest by default")
+    parser.add_argument("--streams", type=int, default=10, help="number of WaveData streams")
+    parser.add_argument("--stream-prefix", default="WaveData_LoadStream")
+    parser.add_argument("--rate", type=float, default=10000, help="target events per second over all streams")
+    parser.add_argument("--batch-size", type=int, default=100, help="events per call")
+    parser.add_argument("--mix", default="insert=70,update=10,replace=10,read=10",
+                        help="relative weights of the operations")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads issuing calls")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run for")
+    parser.add_argument("--report-interval", type=float, default=5, help="seconds between progress lines")
+    parser.add_argument("--keep", action="store_true", help="keep the streams and type after the run")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+    parseMix(args.mix)
+
+    client, namespace_id, server = createClient(args)
+    try:
+        qiType, streams = createStreams(client, namespace_id, args.streams, args.stream_prefix)
+        print("Writing {rate:,.0f} events/s to {streams} streams in {namespace} at {url}".format(
+            rate=args.rate, streams=len(streams), namespace=namespace_id, url=client.Uri))
+        results, missed, lastError, elapsed = run(client, namespace_id, streams, args)
+
+        print()
+        print("{op:<8} {calls:>8} {events:>10} {errors:>7} {rate:>12} {p50:>9} {p95:>9} {p99:>9} {max:>9}".format(
+            op="op", calls="calls", events="events", errors="errors", rate="events/s", p50="p50 ms",
+            p95="p95 ms", p99="p99 ms", max="max ms"))
+        for result in results:
+            print(("{operation:<8} {calls:>8} {events:>10} {errors:>7} {rate:>12,.0f} {p50:>9.2f} {p95:>9.2f} "
+                   "{p99:>9.2f} {max:>9.2f}").format(
+                operation=result["operation"], calls=result["calls"], events=result["events"],
+                errors=result["errors"], rate=result["eventsPerSecond"], p50=result["p50"] * 1000,
+                p95=result["p95"] * 1000, p99=result["p99"] * 1000, max=result["max"] * 1000))
+        achieved = sum(result["eventsPerSecond"] for result in results)
+        print("achieved {achieved:,.0f} of {rate:,.0f} events/s in {elapsed:.1f}s, {missed} calls missed".format(
+            achieved=achieved, rate=args.rate, elapsed=elapsed, missed=missed))
+        if lastError is not None:
+            print("last error: {error}".format(error=lastError))
+
+        if args.save:
+            with open(args.save, "w") as file:
+                json.dump({"rate": args.rate, "achieved": achieved, "seconds": elapsed, "missed": missed,
+                           "operations": results}, file, indent=2)
+
+        if not args.keep:
+            for stream in streams:
+                client.deleteStream(namespace_id, stream.Id)
+            client.deleteType(namespace_id, qiType.Id)
+    finally:
+        client.close()
+        if server is not None:
+            server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
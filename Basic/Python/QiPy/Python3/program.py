@@ -212,18 +212,7 @@ def toString(event):
 def toWaveData(jsonObj):
     # Many JSON implementations leave default values out.  We compensate for WaveData, knowing
     # that all values should be filled in
-    wave = WaveData()
-    properties = inspect.getmembers(type(wave), isprop)
-    for prop in properties:
-        # Pre-Assign the default
-        prop[1].fset(wave, 0)
-
-        # 
-        if prop[0] in jsonObj:
-            value = jsonObj[prop[0]]
-            if value is not None:
-                prop[1].fset(wave, value)
-    return wave
+    return QiCodec.forClass(WaveData).fromDictionary(jsonObj, default=0)
 
 
 ######################################################################################################
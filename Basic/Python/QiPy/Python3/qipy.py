@@ -1,6 +1,14 @@
 ﻿# qipy.py
 
 from QiClient import QiClient
+from AsyncQiClient import AsyncQiClient
+from QiBufferedWriter import QiBufferedWriter
+from QiSpool import QiSpool
+from QiLastValuePoller import QiLastValuePoller
+from QiTokenProvider import QiTokenProvider
+from QiRetryPolicy import QiRetryPolicy
+from QiStaticTokenProvider import QiStaticTokenProvider
+from QiLocalServer import QiLocalServer
 from QiType import QiType
 from QiTypeCode import QiTypeCode
 from QiTypeProperty import QiTypeProperty
@@ -12,5 +20,11 @@ from QiView import QiView
 from QiViewMap import QiViewMap
 from QiViewProperty import QiViewProperty
 from QiError import QiError
+from QiMetadataCache import QiMetadataCache
+from QiWindowCache import QiWindowCache
+from QiInterpolator import QiInterpolator
+from QiMetrics import QiMetrics
 from WaveData import WaveData, WaveDataInteger, WaveDataTarget
 from JsonEncoder import Encoder
+from QiCodec import QiCodec
+from QiEventClass import createEventClass
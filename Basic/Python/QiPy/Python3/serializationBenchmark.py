@@ -0,0 +1,326 @@
+"""Measures the serialization hot path of the Qi client: value classes to and from dictionaries,
+JSON encoding and decoding, and QiType/QiStream metadata conversion.
+
+    python serializationBenchmark.py
+    python serializationBenchmark.py --sizes 1,1000 --save baseline.json
+    python serializationBenchmark.py --baseline baseline.json --tolerance 0.15
+
+Every case is run for each batch size and reports items/s (best of the repeats), the peak
+memory traced while converting one batch and the allocations still held by its result.
+With --baseline the run fails when a case is slower than the saved one by more than the
+tolerance, so regressions are caught before they reach the client.
+"""
+
+import argparse
+import datetime
+import gc
+import inspect
+import json
+import sys
+import time
+import tracemalloc
+
+from JsonEncoder import Encoder
+import QiJson
+from QiCodec import QiCodec
+from QiEventClass import createEventClass
+from QiStream import QiStream
+from QiType import QiType
+from QiTypeCode import QiTypeCode
+from QiTypeProperty import QiTypeProperty
+from WaveData import WaveData
+import WaveGenerator
+from WaveSamples import waveDataType, waves
+
+
+_cases = []
+
+
+def case(group, backend, sizes="events"):
+    """Registers a benchmark; the decorated function takes a batch size and returns the callable to time"""
+    def register(setup):
+        _cases.append({"name": setup.__name__, "group": group, "backend": backend, "sizes": sizes, "setup": setup})
+        return setup
+    return register
+
+
+# data
+
+def waveDictionaries(count):
+    return [wave.toDictionary() for wave in waves(count)]
+
+
+def wideType(typeId, width, depth):
+    """A QiType with 'width' properties, every fourth of them a nested type of the same shape down to 'depth'"""
+    codes = [QiTypeCode.Double, QiTypeCode.Int32, QiTypeCode.String, QiTypeCode.DateTime]
+    qiType = QiType()
+    qiType.Id = typeId
+    qiType.Name = typeId
+    qiType.Description = "Benchmark type with {width} properties".format(width=width)
+    qiType.QiTypeCode = QiTypeCode.Object
+    qiType.Properties = []
+    for i in range(width):
+        prop = QiTypeProperty()
+        prop.Id = "Property{i}".format(i=i)
+        prop.Name = prop.Id
+        prop.IsKey = i == 0
+        if depth > 0 and i % 4 == 3:
+            prop.QiType = wideType("{typeId}_{i}".format(typeId=typeId, i=i), width, depth - 1)
+        else:
+            prop.QiType = QiType()
+            prop.QiType.Id = codes[i % 4].name
+            prop.QiType.QiTypeCode = codes[i % 4]
+        qiType.Properties.append(prop)
+    return qiType
+
+
+def streamDictionaries(count):
+    return [{"Id": "Stream{i}".format(i=i), "Name": "Stream {i}".format(i=i), "Description": "Benchmark stream",
+             "TypeId": "WaveData_SampleType", "BehaviorId": "Continuous",
+             "Indexes": [{"QiTypePropertyId": "Radians"}]} for i in range(count)]
+
+
+def reflectionToDictionary(value):
+    # how value classes were converted before QiCodec: the properties are looked up for every event
+    return dict((name, prop.fget(value)) for name, prop in inspect.getmembers(type(value), lambda v: isinstance(v, property)))
+
+
+def reflectionFromDictionary(valueClass, content):
+    value = valueClass()
+    for name, prop in inspect.getmembers(valueClass, lambda v: isinstance(v, property)):
+        prop.fset(value, content.get(name, 0))
+    return value
+
+
+# generating events
+
+@case("generate", "scalar")
+def generateWaves(size):
+    return lambda: waves(size)
+
+
+if WaveGenerator.numpy is not None:
+    @case("generate", "numpy")
+    def generateWaveColumns(size):
+        start = datetime.datetime(2017, 1, 1)
+        interval = datetime.datetime(2017, 1, 1, 0, 6)
+        return lambda: WaveGenerator.waveColumns(start, interval, 2.0, size)
+
+    @case("generate", "numpy-events")
+    def generateWaveEvents(size):
+        start = datetime.datetime(2017, 1, 1)
+        interval = datetime.datetime(2017, 1, 1, 0, 6)
+        return lambda: WaveGenerator.waveEvents(start, interval, 2.0, size)
+
+
+# value classes to and from dictionaries
+
+@case("toDictionary", "codec")
+def waveDataToDictionary(size):
+    events = waves(size)
+    return lambda: [event.toDictionary() for event in events]
+
+
+@case("toDictionary", "eventclass")
+def eventClassToDictionary(size):
+    eventClass = createEventClass(waveDataType())
+    events = eventClass.fromDictionaries(waveDictionaries(size))
+    return lambda: eventClass.toDictionaries(events)
+
+
+@case("toDictionary", "reflection")
+def reflectionWaveToDictionary(size):
+    events = waves(size)
+    return lambda: [reflectionToDictionary(event) for event in events]
+
+
+@case("fromDictionary", "codec")
+def waveDataFromDictionary(size):
+    contents = waveDictionaries(size)
+    return lambda: [WaveData.fromDictionary(content) for content in contents]
+
+
+@case("fromDictionary", "codec-batch")
+def codecFromDictionaries(size):
+    codec = QiCodec.forClass(WaveData)
+    contents = waveDictionaries(size)
+    return lambda: codec.fromDictionaries(contents, default=0)
+
+
+@case("fromDictionary", "eventclass")
+def eventClassFromDictionary(size):
+    eventClass = createEventClass(waveDataType())
+    contents = waveDictionaries(size)
+    return lambda: eventClass.fromDictionaries(contents)
+
+
+@case("fromDictionary", "reflection")
+def reflectionWaveFromDictionary(size):
+    contents = waveDictionaries(size)
+    return lambda: [reflectionFromDictionary(WaveData, content) for content in contents]
+
+
+# JSON text
+
+@case("encode", "Encoder")
+def jsonEncoderWaves(size):
+    events = waves(size)
+    return lambda: json.dumps(events, cls=Encoder)
+
+
+@case("encode", "json")
+def jsonDumpsWaves(size):
+    # what insertValues sends: the events' dictionaries encoded in one call
+    events = waves(size)
+    return lambda: json.dumps([event.toDictionary() for event in events])
+
+
+@case("decode", "json")
+def jsonLoadsWaves(size):
+    text = json.dumps(waveDictionaries(size))
+    return lambda: [WaveData.fromDictionary(content) for content in json.loads(text)]
+
+
+def jsonBackendCases(name):
+    # each installed QiJson backend is measured on the payloads the client sends and parses
+    def dumpBytesWaves(size):
+        events = waves(size)
+        QiJson.useBackend(name)
+        return lambda: QiJson.dumpBytes([event.toDictionary() for event in events])
+    dumpBytesWaves.__name__ = "dumpBytesWaves_" + name
+    case("encode", "QiJson:" + name)(dumpBytesWaves)
+
+    def loadsWaves(size):
+        text = json.dumps(waveDictionaries(size)).encode("utf-8")
+        QiJson.useBackend(name)
+        return lambda: [WaveData.fromDictionary(content) for content in QiJson.loads(text)]
+    loadsWaves.__name__ = "loadsWaves_" + name
+    case("decode", "QiJson:" + name)(loadsWaves)
+
+
+for _backend in QiJson.availableBackends():
+    jsonBackendCases(_backend)
+
+
+# metadata
+
+@case("QiType.toDictionary", "model", sizes="metadata")
+def qiTypeToDictionary(size):
+    types = [wideType("Wide{i}".format(i=i), 32, 1) for i in range(size)]
+    return lambda: [qiType.toDictionary() for qiType in types]
+
+
+@case("QiType.fromDictionary", "model", sizes="metadata")
+def qiTypeFromDictionary(size):
+    contents = [wideType("Wide{i}".format(i=i), 32, 1).toDictionary() for i in range(size)]
+    return lambda: [QiType.fromDictionary(content) for content in contents]
+
+
+@case("QiStream.fromDictionary", "model", sizes="metadata")
+def qiStreamFromDictionary(size):
+    contents = streamDictionaries(size)
+    return lambda: [QiStream.fromDictionary(content) for content in contents]
+
+
+# runner
+
+def measure(setup, size, minTime, repeats):
+    backend = QiJson.backendName
+    try:
+        return measureCase(setup, size, minTime, repeats)
+    finally:
+        QiJson.useBackend(backend)
+
+
+def measureCase(setup, size, minTime, repeats):
+    run = setup(size)
+    run()
+
+    best = None
+    for _ in range(repeats):
+        iterations = 0
+        start = time.perf_counter()
+        elapsed = 0
+        while iterations == 0 or elapsed < minTime:
+            run()
+            iterations += 1
+            elapsed = time.perf_counter() - start
+        rate = size * iterations / elapsed
+        best = rate if best is None else max(best, rate)
+
+    # memory is traced separately, tracing slows the code down too much to time it
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    before = tracemalloc.get_traced_memory()[0]
+    result = run()
+    retained = sys.getallocatedblocks() - blocks
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    del result
+
+    return {"itemsPerSecond": best, "peakBytes": peak, "retainedBlocks": retained}
+
+
+def compare(results, baseline, tolerance):
+    """Returns the cases slower than 'baseline' by more than 'tolerance'"""
+    saved = dict(((item["name"], item["size"]), item) for item in baseline)
+    regressions = []
+    for item in results:
+        previous = saved.get((item["name"], item["size"]))
+        if previous is not None and item["itemsPerSecond"] < previous["itemsPerSecond"] * (1 - tolerance):
+            regressions.append((item, previous))
+    return regressions
+
+
+def parseSizes(text):
+    return [int(size) for size in text.split(",") if size.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks Qi serialization")
+    parser.add_argument("--sizes", default="1,1000,100000", help="event batch sizes, comma separated")
+    parser.add_argument("--metadata-sizes", default="1,10,100", help="QiType/QiStream batch sizes, comma separated")
+    parser.add_argument("--backend", action="append", help="only run these backends (repeatable)")
+    parser.add_argument("--group", action="append", help="only run these groups (repeatable)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds each repeat runs for at least")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    sizes = {"events": parseSizes(args.sizes), "metadata": parseSizes(args.metadata_sizes)}
+    results = []
+    print("{group:<24} {backend:<14} {size:>8} {rate:>14} {peak:>12} {blocks:>10}".format(
+        group="case", backend="backend", size="batch", rate="items/s", peak="peak KiB", blocks="retained"))
+    for item in _cases:
+        if args.backend and item["backend"] not in args.backend:
+            continue
+        if args.group and item["group"] not in args.group:
+            continue
+        for size in sizes[item["sizes"]]:
+            result = measure(item["setup"], size, args.min_time, args.repeats)
+            result.update(name=item["name"], group=item["group"], backend=item["backend"], size=size)
+            results.append(result)
+            print("{group:<24} {backend:<14} {size:>8} {rate:>14,.0f} {peak:>12,.1f} {blocks:>10,}".format(
+                group=item["group"], backend=item["backend"], size=size, rate=result["itemsPerSecond"],
+                peak=result["peakBytes"] / 1024, blocks=result["retainedBlocks"]))
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for item, previous in regressions:
+            print("REGRESSION {name} [{size}]: {rate:,.0f} items/s, baseline {previous:,.0f}".format(
+                name=item["name"], size=item["size"], rate=item["itemsPerSecond"], previous=previous["itemsPerSecond"]))
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
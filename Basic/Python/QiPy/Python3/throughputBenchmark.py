@@ -0,0 +1,193 @@
+"""Drives QiClient end to end against a Qi stand-in and reports throughput, latency and bytes
+on the wire for insertValues, getWindowValues, getRangeValues, updateValues and removeWindowValues.
+
+    python throughputBenchmark.py
+    python throughputBenchmark.py --batch-sizes 1000,10000 --concurrency 1,8,32 --streams 1,16
+    python throughputBenchmark.py --url http://localhost:8080 --save results.json
+
+Without --url a QiLocalServer is started in this process, where it shares the interpreter lock
+with the client; run "python QiLocalServer.py" separately and pass --url to keep them apart. Every combination of batch size,
+concurrency and stream count gets its own namespace. Each operation is run on every batch of
+every stream from a pool of 'concurrency' threads sharing one QiClient.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import sys
+import threading
+import time
+
+import requests
+
+from QiBoundaryType import QiBoundaryType
+from QiClient import QiClient
+from QiLocalServer import QiLocalServer
+from QiStaticTokenProvider import QiStaticTokenProvider
+from WaveData import WaveData
+from QiMetrics import percentile
+from WaveSamples import createWaveStreams, waves
+
+
+_operations = ["insertValues", "getWindowValues", "getRangeValues", "updateValues", "removeWindowValues"]
+
+
+class WireCounter(object):
+    """Counts the bytes a requests.Session sends and receives, headers included"""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__sent = 0
+        self.__received = 0
+
+    @property
+    def Sent(self):
+        return self.__sent
+
+    @property
+    def Received(self):
+        return self.__received
+
+    def reset(self):
+        with self.__lock:
+            self.__sent = 0
+            self.__received = 0
+
+    def hook(self, response, *args, **kwargs):
+        request = response.request
+        sent = len(request.method) + len(request.path_url) + 12
+        sent += sum(len(name) + len(value) + 4 for name, value in request.headers.items())
+        body = request.body
+        if body is not None:
+            sent += len(body.encode("utf-8") if isinstance(body, str) else body)
+
+        received = 17 + len(response.reason or "")
+        received += sum(len(name) + len(value) + 4 for name, value in response.headers.items())
+        received += int(response.headers.get("Content-Length") or 0)
+
+        with self.__lock:
+            self.__sent += sent
+            self.__received += received
+
+
+def runOperation(client, namespace_id, operation, streams, batches, batchSize, pool):
+    calls = []
+    for stream_id in streams:
+        for batch in range(batches):
+            calls.append((stream_id, batch * batchSize))
+
+    def call(stream_id, start):
+        end = start + batchSize - 1
+        began = time.perf_counter()
+        if operation == "insertValues":
+            client.insertValues(namespace_id, stream_id, waves(batchSize, start))
+        elif operation == "updateValues":
+            client.updateValues(namespace_id, stream_id, waves(batchSize, start))
+        elif operation == "getWindowValues":
+            client.getWindowValues(namespace_id, stream_id, WaveData, start, end)
+        elif operation == "getRangeValues":
+            client.getRangeValues(namespace_id, stream_id, WaveData, start, 0, batchSize, False, QiBoundaryType.Exact)
+        elif operation == "removeWindowValues":
+            client.removeWindowValues(namespace_id, stream_id, start, end)
+        return time.perf_counter() - began
+
+    # events are generated inside the timed call on purpose: building them is part of the client's cost
+    started = time.perf_counter()
+    latencies = list(pool.map(lambda item: call(*item), calls))
+    elapsed = time.perf_counter() - started
+    return len(calls) * batchSize, elapsed, sorted(latencies)
+
+
+def runScenario(url, batchSize, concurrency, streamCount, batches, operations):
+    namespace_id = "Benchmark_{batch}_{concurrency}_{streams}".format(batch=batchSize, concurrency=concurrency,
+                                                                       streams=streamCount)
+    counter = WireCounter()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.hooks["response"].append(counter.hook)
+
+    results = []
+    with QiClient("benchmark", url, None, None, None, None, session=session,
+                  tokenProvider=QiStaticTokenProvider()) as client, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        streams = ["Benchmark_{i}".format(i=i) for i in range(streamCount)]
+        qiType = createWaveStreams(client, namespace_id, streams)
+
+        for operation in operations:
+            counter.reset()
+            events, elapsed, latencies = runOperation(client, namespace_id, operation, streams, batches, batchSize, pool)
+            results.append({
+                "operation": operation, "batchSize": batchSize, "concurrency": concurrency, "streams": streamCount,
+                "calls": len(latencies), "events": events, "seconds": elapsed,
+                "eventsPerSecond": events / elapsed if elapsed > 0 else 0.0,
+                "p50": percentile(latencies, 0.50), "p95": percentile(latencies, 0.95), "p99": percentile(latencies, 0.99),
+                "bytesSent": counter.Sent, "bytesReceived": counter.Received})
+
+        for stream_id in streams:
+            client.deleteStream(namespace_id, stream_id)
+        client.deleteType(namespace_id, qiType.Id)
+    session.close()
+    return results
+
+
+def formatRow(result):
+    return ("{operation:<20} {batchSize:>7} {concurrency:>5} {streams:>7} {rate:>12,.0f} {p50:>9.2f} {p95:>9.2f} "
+            "{p99:>9.2f} {sent:>10.2f} {received:>10.2f}").format(
+        operation=result["operation"], batchSize=result["batchSize"], concurrency=result["concurrency"],
+        streams=result["streams"], rate=result["eventsPerSecond"], p50=result["p50"] * 1000,
+        p95=result["p95"] * 1000, p99=result["p99"] * 1000, sent=result["bytesSent"] / 1048576.0,
+        received=result["bytesReceived"] / 1048576.0)
+
+
+def parseList(text):
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks QiClient throughput against a Qi stand-in")
+    parser.add_argument("--url", help="Qi endpoint; a QiLocalServer is started when omitted")
+    parser.add_argument("--latency", type=float, default=0, help="seconds the local server adds to every request")
+    parser.add_argument("--batch-sizes", default="100,1000,10000", help="events per call, comma separated")
+    parser.add_argument("--concurrency", default="1,4,16", help="threads issuing calls, comma separated")
+    parser.add_argument("--streams", default="1,8", help="stream counts, comma separated")
+    parser.add_argument("--batches", type=int, default=8, help="batches per stream and operation")
+    parser.add_argument("--operation", action="append", choices=_operations,
+                        help="only run these operations (repeatable); inserts always run first")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    operations = _operations
+    if args.operation:
+        operations = [operation for operation in _operations if operation in args.operation or operation == "insertValues"]
+
+    server = None
+    url = args.url
+    if url is None:
+        server = QiLocalServer(latency=args.latency).start()
+        url = server.Url
+
+    results = []
+    print("{op:<20} {batch:>7} {conc:>5} {streams:>7} {rate:>12} {p50:>9} {p95:>9} {p99:>9} {sent:>10} {received:>10}".format(
+        op="operation", batch="batch", conc="conc", streams="streams", rate="events/s",
+        p50="p50 ms", p95="p95 ms", p99="p99 ms", sent="sent MiB", received="recv MiB"))
+    try:
+        for batchSize in parseList(args.batch_sizes):
+            for concurrency in parseList(args.concurrency):
+                for streamCount in parseList(args.streams):
+                    for result in runScenario(url, batchSize, concurrency, streamCount, args.batches, operations):
+                        results.append(result)
+                        print(formatRow(result))
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())